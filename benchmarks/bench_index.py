@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+"""Benchmark: busca linear x índice hash (create_index) em database.py.
+
+Uso: python benchmarks/bench_index.py
+
+Mede só o custo em memória da busca; o download do banco que a busca linear
+exige a cada chamada (get_all_data) não entra na conta, então a diferença real
+em produção é ainda maior.
+"""
+
+SIZES = (100, 10_000, 100_000)
+LOOKUPS = 1_000
+
+def _linear(data, key, value):
+    # O que find_data/find_index faziam após baixar o banco inteiro
+    return [item for item in data if item.get(key) == value]
+
+def _prime(db_name, data, key):
+    # Preenche o snapshot e a cópia local sem acessar o Supabase
+    database._snapshot_store({'id': db_name, 'name': db_name, 'updated_at': 'bench', 'data': data})
+    database._indexes[db_name] = {}
+    database._index_data[db_name] = data
+    database.create_index(db_name, key)
+
+def _per_call(fn, values) -> float:
+    start = time.perf_counter()
+    for value in values:
+        fn(value)
+    return (time.perf_counter() - start) / len(values) * 1e6
+
+def main():
+    print(f"{'linhas':>8} | {'linear (µs)':>12} | {'índice (µs)':>12} | {'build (ms)':>10} | {'ganho':>8}")
+    for size in SIZES:
+        db_name = f"bench_{size}"
+        data = [{'user_id': str(i), 'balance': i} for i in range(size)]
+        values = [str(random.randrange(size)) for _ in range(LOOKUPS)]
+
+        start = time.perf_counter()
+        _prime(db_name, data, 'user_id')
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        # Limita a busca linear para não levar minutos em 100k linhas
+        linear = _per_call(lambda v: _linear(data, 'user_id', v), values[:max(10, LOOKUPS * 100 // size)])
+        indexed = _per_call(lambda v: database.find_data(db_name, 'user_id', v), values)
+        print(f"{size:>8} | {linear:>12.2f} | {indexed:>12.2f} | {build_ms:>10.2f} | {linear / indexed:>7.0f}x")
+
+if __name__ == '__main__':
+    main()
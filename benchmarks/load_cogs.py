@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from tools.webhook_server import WebhookServer
+from utils.database import db
+from utils.manager import db as manager_db
+from utils.http import pool
+from utils.journal import journal
+from commands.economy import Economy
+from commands.moderation import Moderation
+
+"""Teste de carga das cogs de economia e moderação.
+
+Uso: python benchmarks/load_cogs.py --users 10,100,1000 --latency 30 --output resultado.json
+
+Chama os callbacks dos comandos com Context/Interaction falsos contra o
+tools.webhook_server (com latência injetada), N usuários ao mesmo tempo por
+comando. Para cada N mede a latência p50/p95/p99 de cada comando, quantas
+requisições ao banco cada comando gerou e o atraso do event loop, e imprime
+tudo em JSON para comparar execuções antes/depois de mudanças no banco.
+"""
+
+# 🎭 OBJETOS FALSOS DO DISCORD
+
+class FakeMember:
+    def __init__(self, user_id: int, top_role: int = 1):
+        self.id = user_id
+        self.bot = False
+        self.name = self.display_name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+        self.status = discord.Status.online
+        self.top_role = top_role
+        self.avatar = types.SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+
+    async def ban(self, reason=None):
+        pass
+
+    async def kick(self, reason=None):
+        pass
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.owner_id = 0
+
+    async def unban(self, user, reason=None):
+        pass
+
+class FakeContext:
+    def __init__(self, author: FakeMember, guild: FakeGuild):
+        self.author = author
+        self.guild = guild
+        self.interaction = None
+
+    async def send(self, content=None, **kwargs):
+        pass
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def send_message(self, content=None, **kwargs):
+        self.done = True
+
+class FakeFollowup:
+    async def send(self, content=None, **kwargs):
+        pass
+
+class FakeInteraction:
+    def __init__(self, user: FakeMember, guild: FakeGuild):
+        self.id = random.getrandbits(63)
+        self.user = user
+        self.guild = guild
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        self.extras = {}
+
+# 📏 MEDIÇÃO
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+    pick = lambda p: round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 3)}
+
+async def _loop_lag(samples, interval: float = 0.01):
+    # Quanto cada sleep passou do previsto = tempo em que o loop ficou ocupado
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval) * 1e3)
+
+async def _phase(server: WebhookServer, calls) -> dict:
+    """Roda todas as chamadas de um comando ao mesmo tempo"""
+    latencies, errors = [], []
+    before = len(server.requests)
+
+    async def timed(call):
+        start = time.perf_counter()
+        try:
+            await call
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        latencies.append((time.perf_counter() - start) * 1e3)
+
+    await asyncio.gather(*(timed(call) for call in calls))
+    requests = len(server.requests) - before
+    return {
+        "latency_ms": _percentiles(latencies),
+        "db_requests": requests,
+        "db_requests_per_command": round(requests / len(latencies), 3),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None
+    }
+
+async def run(server: WebhookServer, users: int) -> dict:
+    """Executa o roteiro completo com `users` usuários simultâneos em uma guild nova"""
+    guild = FakeGuild(users)
+    members = [FakeMember(user_id) for user_id in range(1, users + 1)]
+    moderator = FakeMember(10 ** 9, top_role=10)
+    contexts = [FakeContext(member, guild) for member in members]
+    target = lambda index: members[(index + 1) % users]
+
+    economy = Economy(bot=None)
+    moderation = Moderation(bot=None)
+    await economy.cog_load()
+
+    lag = []
+    monitor = asyncio.create_task(_loop_lag(lag))
+    started = time.perf_counter()
+    phases = {
+        "balance": lambda: (Economy.balance.callback(economy, ctx) for ctx in contexts),
+        "daily": lambda: (Economy.daily.callback(economy, ctx) for ctx in contexts),
+        "work": lambda: (Economy.work.callback(economy, ctx) for ctx in contexts),
+        "deposit": lambda: (Economy.deposit.callback(economy, ctx, 100) for ctx in contexts),
+        "withdraw": lambda: (Economy.withdraw.callback(economy, ctx, 50) for ctx in contexts),
+        "pay": lambda: (Economy.pay.callback(economy, ctx, target(i), 10) for i, ctx in enumerate(contexts)),
+        "rob": lambda: (Economy.rob.callback(economy, ctx, target(i)) for i, ctx in enumerate(contexts)),
+        "leaderboard": lambda: (Economy.leaderboard_command.callback(economy, ctx) for ctx in contexts),
+        "ban": lambda: (Moderation.ban.callback(moderation, FakeInteraction(moderator, guild), member, "benchmark")
+                        for member in members),
+        "kick": lambda: (Moderation.kick.callback(moderation, FakeInteraction(moderator, guild), member, "benchmark")
+                         for member in members),
+        "unban": lambda: (Moderation.unban.callback(moderation, FakeInteraction(moderator, guild), str(member.id), "benchmark")
+                          for member in members),
+    }
+    commands = {}
+    for name, calls in phases.items():
+        commands[name] = await _phase(server, list(calls()))
+
+    # Gravação final do cache write-back e do journal de auditoria (entram na conta de requisições ao banco)
+    before = len(server.requests)
+    await economy.cog_unload()
+    while len(journal) and await journal.flush():
+        pass
+    flush_requests = len(server.requests) - before
+
+    duration = time.perf_counter() - started
+    monitor.cancel()
+    return {
+        "users": users,
+        "duration_s": round(duration, 3),
+        "commands": commands,
+        "flush_db_requests": flush_requests,
+        "total_db_requests": sum(phase["db_requests"] for phase in commands.values()) + flush_requests,
+        "loop_lag_ms": _percentiles(lag)
+    }
+
+async def main(args):
+    random.seed(args.seed)
+    server = WebhookServer(latency=args.latency / 1000, jitter=args.jitter / 1000)
+    url = await server.start()
+    db.url = url
+    manager_db.webhook_url, manager_db.bot_id = url, "benchmark"
+    journal.path = os.path.join(tempfile.mkdtemp(), "audit.jsonl")
+    await pool.start()
+    journal.start()
+    try:
+        results = []
+        for users in args.users:
+            results.append(await run(server, users))
+    finally:
+        await journal.stop()
+        await pool.close()
+        await server.stop()
+    return {
+        "backend": type(db).__name__,
+        "latency_ms": args.latency,
+        "jitter_ms": args.jitter,
+        "pool_limit": int(os.environ.get('HTTP_POOL_LIMIT', '20')),
+        "results": results
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga das cogs")
+    parser.add_argument('--users', default="10,100,1000", type=lambda value: [int(n) for n in value.split(',')])
+    parser.add_argument('--latency', type=float, default=30.0, help="Latência simulada do webhook (ms)")
+    parser.add_argument('--jitter', type=float, default=10.0, help="Variação aleatória da latência (ms)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Arquivo para gravar o JSON (além da saída padrão)")
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(main(args)), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
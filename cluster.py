@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import logging
+import math
+import os
+import re
+import signal
+import sys
+import time
+from typing import Dict, List, Optional
+import aiohttp
+
+"""Launcher de clusters: divide os shards do bot entre vários processos do main.py"""
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s | launcher | %(levelname)s | %(message)s')
+log = logging.getLogger('bot')
+
+GATEWAY_URL = 'https://discord.com/api/v10/gateway/bot'
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+# Um processo que ficou de pé por este tempo volta ao backoff mínimo se cair
+STABLE_AFTER = 60
+MAX_RESTART_DELAY = 60
+
+async def recommended_shards(token: str) -> Dict:
+    """Contagem de shards e concorrência de IDENTIFY recomendadas pelo Discord"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={'Authorization': f'Bot {token}'}) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return {"shards": data["shards"], "max_concurrency": data["session_start_limit"]["max_concurrency"]}
+
+def shard_ranges(shard_count: int, clusters: int) -> List[List[int]]:
+    """Faixas contíguas de shards, uma por cluster"""
+    per_cluster = math.ceil(shard_count / clusters)
+    return [list(range(start, min(start + per_cluster, shard_count))) for start in range(0, shard_count, per_cluster)]
+
+def _suffixed(path: str, cluster_id: int) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.{cluster_id}{extension}"
+
+def cluster_env(cluster_id: int, shard_ids: List[int], shard_count: int) -> Dict[str, str]:
+    """
+    Ambiente de um cluster. Cada guild vive em um único shard, então o estado
+    por guild (caches, locks, ranking, cooldowns) fica todo no mesmo processo;
+    só os arquivos locais e a porta de métricas precisam ser separados.
+    """
+    env = dict(os.environ)
+    env.update({
+        'CLUSTER_ID': str(cluster_id),
+        'SHARD_IDS': ",".join(str(shard) for shard in shard_ids),
+        'SHARD_COUNT': str(shard_count),
+        'COOLDOWN_STORE_PATH': _suffixed(os.environ.get('COOLDOWN_STORE_PATH', 'data/cooldowns.json'), cluster_id),
+        'AUDIT_JOURNAL_PATH': _suffixed(os.environ.get('AUDIT_JOURNAL_PATH', 'data/audit.jsonl'), cluster_id),
+    })
+    metrics_port = int(os.environ.get('METRICS_PORT', '9091') or 0)
+    env['METRICS_PORT'] = str(metrics_port + cluster_id if metrics_port else 0)
+    return env
+
+def adopt_orphaned_journals(cluster_ids: List[int], target_id: int) -> int:
+    """
+    Junta ao journal de auditoria de `target_id` os journals que nenhum cluster
+    vai reler: os de clusters que deixaram de existir (CLUSTER_COUNT diminuiu)
+    e o de uma execução sem clusters. Retorna quantas linhas foram movidas.
+    """
+    base = os.environ.get('AUDIT_JOURNAL_PATH', 'data/audit.jsonl')
+    root, extension = os.path.splitext(base)
+    directory = os.path.dirname(base) or '.'
+    pattern = re.compile(re.escape(os.path.basename(root)) + r'\.(\d+)' + re.escape(extension) + '$')
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return 0
+    orphans = [base] if os.path.exists(base) else []
+    for name in names:
+        match = pattern.match(name)
+        if match and int(match.group(1)) not in cluster_ids:
+            orphans.append(os.path.join(directory, name))
+    target = _suffixed(base, target_id)
+    moved = 0
+    for path in orphans:
+        with open(path) as f:
+            # Uma linha cortada por queda ganha seu "\n" e é descartada no replay, sem estragar a próxima
+            lines = [line if line.endswith("\n") else line + "\n" for line in f if line.strip()]
+        if lines:
+            with open(target, 'a') as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        # Se cair entre o append e o remove, o replay descarta os audit_id repetidos
+        os.remove(path)
+        moved += len(lines)
+        log.info(f'📒 {len(lines)} registros de auditoria de {path} movidos para {target}')
+    return moved
+
+class Cluster:
+    """Um processo main.py com uma faixa de shards, reiniciado com backoff se cair."""
+
+    def __init__(self, cluster_id: int, shard_ids: List[int], shard_count: int):
+        self.id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+
+    async def run(self, stopping: asyncio.Event):
+        delay = 1.0
+        while not stopping.is_set():
+            started = time.monotonic()
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, MAIN, env=cluster_env(self.id, self.shard_ids, self.shard_count))
+            log.info(f'🚀 Cluster {self.id} (shards {self.shard_ids[0]}-{self.shard_ids[-1]}) iniciado, pid {self.process.pid}')
+            code = await self.process.wait()
+            if stopping.is_set():
+                break
+            if code == 0:
+                log.info(f'🛑 Cluster {self.id} encerrou normalmente')
+                break
+            self.restarts += 1
+            if time.monotonic() - started >= STABLE_AFTER:
+                delay = 1.0
+            log.error(f'💥 Cluster {self.id} saiu com código {code}; reiniciando em {delay:.0f}s')
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(MAX_RESTART_DELAY, delay * 2)
+
+    def terminate(self):
+        # SIGINT: o bot.run trata como Ctrl+C e fecha com Bot.close (salva cooldowns, drena o journal)
+        if self.process is not None and self.process.returncode is None:
+            self.process.send_signal(signal.SIGINT)
+
+    def kill(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+async def main(args):
+    token = os.environ.get('BOT_TOKEN')
+    max_concurrency = 1
+    shard_count = args.shards
+    if not shard_count:
+        if not token:
+            log.error('❌ BOT_TOKEN não configurado e SHARD_COUNT não informado!')
+            return 1
+        recommended = await recommended_shards(token)
+        shard_count, max_concurrency = recommended["shards"], recommended["max_concurrency"]
+        log.info(f'📐 Discord recomenda {shard_count} shards (max_concurrency {max_concurrency})')
+    elif args.only:
+        log.warning('⚠️ Com --only, passe também --shards: todas as máquinas precisam da mesma contagem')
+    if args.only and os.environ.get('DATABASE_BACKEND', 'webhook').lower() == 'sqlite':
+        # O arquivo SQLite é local: clusters em máquinas diferentes não enxergariam os dados uns dos outros
+        log.warning('⚠️ DATABASE_BACKEND=sqlite com --only/CLUSTER_IDS: cada máquina terá um banco próprio; '
+                    'para várias máquinas use o webhook')
+    ranges = shard_ranges(shard_count, args.clusters)
+    selected = set(args.only) if args.only else set(range(len(ranges)))
+    clusters = [Cluster(cluster_id, shard_ids, shard_count) for cluster_id, shard_ids in enumerate(ranges)
+                if cluster_id in selected]
+    if not clusters:
+        log.error('❌ Nenhum cluster selecionado')
+        return 1
+    adopt_orphaned_journals(list(range(len(ranges))), clusters[0].id)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    # Cada IDENTIFY ocupa ~5 s por balde de concorrência: escalona os clusters para não disputar
+    tasks = []
+    for cluster in clusters:
+        tasks.append(asyncio.create_task(cluster.run(stopping)))
+        if cluster is not clusters[-1]:
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=5 * math.ceil(len(cluster.shard_ids) / max_concurrency))
+            except asyncio.TimeoutError:
+                pass
+
+    # Até um sinal ou até todos os clusters encerrarem normalmente
+    waiter = asyncio.create_task(stopping.wait())
+    await asyncio.wait([waiter, asyncio.gather(*tasks)], return_when=asyncio.FIRST_COMPLETED)
+    waiter.cancel()
+    stopping.set()
+    log.info('🛑 Encerrando clusters...')
+    for cluster in clusters:
+        cluster.terminate()
+    _, pending = await asyncio.wait(tasks, timeout=args.shutdown_timeout)
+    if pending:
+        for cluster in clusters:
+            cluster.kill()
+        await asyncio.wait(pending)
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Roda o bot em vários processos, cada um com uma faixa de shards.')
+    parser.add_argument('--clusters', type=int, default=int(os.environ.get('CLUSTER_COUNT', os.cpu_count() or 1)),
+                        help='Número total de clusters (todas as máquinas somadas)')
+    parser.add_argument('--shards', type=int, default=int(os.environ.get('SHARD_COUNT') or 0),
+                        help='Total de shards (padrão: o recomendado pelo Discord)')
+    parser.add_argument('--only', type=int, nargs='*', default=[int(cluster) for cluster in os.environ.get('CLUSTER_IDS', '').split(',') if cluster.strip()],
+                        help='Clusters que esta máquina roda (padrão: todos)')
+    parser.add_argument('--shutdown-timeout', type=float, default=30, help='Segundos para os clusters encerrarem')
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -1,31 +1,68 @@
 import discord
 from discord.ext import commands
 import random
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime
 from utils.database import db
+from utils.cache import EconomyCache
+from utils.ledger import Ledger
+from utils.locks import KeyedLock
+from utils.leaderboard import Leaderboard
+from utils.cooldowns import cooldowns
+from utils.interactions import auto_defer
 
 class Economy(commands.Cog):
     """Classe Economy."""
     def __init__(self, bot):
         self.bot = bot
+        # Saldos = snapshot em "economy" + lançamentos de "economy_ledger" ainda não compactados
+        self.ledger = Ledger("economy", "economy_ledger")
+        self.cache = EconomyCache("economy", on_change=self.on_account_change, ledger=self.ledger)
+        self.locks = KeyedLock()
+        self.leaderboard = Leaderboard("economy", overlay=self.cache.accounts, rows=self.ledger.balances)
+        cooldowns.register("daily", 86400) # 24 horas
+        cooldowns.register("work", 3600) # 1 hora
+        cooldowns.register("rob", 10800) # 3 horas
+
+    async def cog_load(self):
+        self.cache.start()
+        self.ledger.start()
+
+    async def cog_unload(self):
+        await self.ledger.stop()
+        await self.cache.stop()
+
+    def on_account_change(self, guild_id, user_id, user_data):
+        """Mantém o ranking em dia a cada alteração de conta."""
+        self.leaderboard.update(guild_id, user_id, user_data)
+
+    def account_lock(self, guild_id, *user_ids):
+        """Serializa alterações nas contas envolvidas sem bloquear as demais."""
+        return self.locks.acquire(*((str(guild_id), str(user_id)) for user_id in user_ids))
 
     async def get_user_economy(self, user_id, guild_id):
         """Retorna os dados de economia de um usuário ou cria se não existir."""
-        user_data = await db.find_one("economy", {"user_id": str(user_id), "guild_id": str(guild_id)})
-        if not user_data:
-            user_data = {
-                "user_id": str(user_id),
-                "guild_id": str(guild_id),
-                "wallet": 0,
-                "bank": 0,
-                "last_daily": None,
-                "last_work": None,
-                "cooldown_rob": None
-            }
-            await db.insert("economy", user_data)
-        return user_data
+        user_data = self.cache.get(guild_id, user_id)
+        if user_data:
+            return user_data
+        # Snapshot + cauda do ledger; comandos simultâneos de um usuário novo criam uma única conta
+        user_data = await self.ledger.load(guild_id, user_id, {
+            "wallet": 0,
+            "bank": 0,
+            "last_daily": None,
+            "last_work": None,
+            "cooldown_rob": None
+        })
+        # Outro comando pode ter colocado a conta no cache enquanto esperávamos
+        return self.cache.get(guild_id, user_id) or self.cache.put(guild_id, user_id, user_data)
+
+    def transfer_wallet(self, guild_id, from_user_id, to_user_id, amount, kind):
+        """Move moedas entre carteiras: um lançamento de saída e um de entrada (chamar com as duas contas travadas)."""
+        self.cache.add(guild_id, from_user_id, {"wallet": -amount}, kind=kind, counterparty_id=to_user_id)
+        self.cache.add(guild_id, to_user_id, {"wallet": amount}, kind=kind, counterparty_id=from_user_id)
 
     @commands.hybrid_command(name="balance", description="Verifica seu saldo.")
+    @auto_defer()
     async def balance(self, ctx: commands.Context):
         user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
         
@@ -38,134 +75,106 @@ class Economy(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.hybrid_command(name="daily", description="Colete sua recompensa diária!")
-    @commands.cooldown(1, 86400, commands.BucketType.user) # 24 horas (86400 segundos)
+    @auto_defer()
     async def daily(self, ctx: commands.Context):
-        user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
-        
-        last_daily_str = user_data["last_daily"]
-        if last_daily_str:
-            last_daily = datetime.fromisoformat(last_daily_str)
-            if datetime.utcnow() < last_daily + timedelta(days=1):
-                # Calcular tempo restante para o usuário
-                next_daily_time = last_daily + timedelta(days=1)
-                time_diff = next_daily_time - datetime.utcnow()
-                hours, remainder = divmod(int(time_diff.total_seconds()), 3600)
-                minutes, seconds = divmod(remainder, 60)
-                await ctx.send(f"⏰ Você já coletou sua recompensa diária! Tente novamente em {hours}h {minutes}m.")
-                self.daily.reset_cooldown(ctx) # Resetar o cooldown se for muito cedo
-                return
-        
-        reward = random.randint(500, 1500)
-        user_data["wallet"] += reward
-        user_data["last_daily"] = datetime.utcnow().isoformat()
+        # Rejeita spam direto da memória, antes de qualquer acesso ao banco
+        cooldowns.check("daily", ctx.guild.id, ctx.author.id)
+        async with self.account_lock(ctx.guild.id, ctx.author.id):
+            user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
+            cooldowns.hydrate("daily", ctx.guild.id, ctx.author.id, user_data["last_daily"])
+            cooldowns.check("daily", ctx.guild.id, ctx.author.id)
         
-        await db.update("economy", 
-                        {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                        {"wallet": user_data["wallet"], "last_daily": user_data["last_daily"]})
+            reward = random.randint(500, 1500)
+            self.cache.add(ctx.guild.id, ctx.author.id, {"wallet": reward}, {"last_daily": datetime.utcnow().isoformat()}, kind="daily")
+            cooldowns.trigger("daily", ctx.guild.id, ctx.author.id)
         
-        embed = discord.Embed(
-            title="🎁 Recompensa Diária Coletada!",
-            description=f"Você recebeu **{reward:,} 🪙** na sua carteira!",
-            color=discord.Color.green()
-        )
-        embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar.url)
-        await ctx.send(embed=embed)
+            embed = discord.Embed(
+                title="🎁 Recompensa Diária Coletada!",
+                description=f"Você recebeu **{reward:,} 🪙** na sua carteira!",
+                color=discord.Color.green()
+            )
+            embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar.url)
+            await ctx.send(embed=embed)
 
     @commands.hybrid_command(name="work", description="Trabalhe para ganhar dinheiro!")
-    @commands.cooldown(1, 3600, commands.BucketType.user) # 1 hora
+    @auto_defer()
     async def work(self, ctx: commands.Context):
-        user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
-
-        last_work_str = user_data["last_work"]
-        if last_work_str:
-            last_work = datetime.fromisoformat(last_work_str)
-            if datetime.utcnow() < last_work + timedelta(hours=1):
-                next_work_time = last_work + timedelta(hours=1)
-                time_diff = next_work_time - datetime.utcnow()
-                minutes, seconds = divmod(int(time_diff.total_seconds()), 60)
-                await ctx.send(f"⏰ Você já trabalhou recentemente! Tente novamente em {minutes}m {seconds}s.")
-                self.work.reset_cooldown(ctx)
-                return
-
-        rewards = {
-            "Programador": random.randint(150, 400),
-            "Gamer Profissional": random.randint(100, 300),
-            "Designer de Emojis": random.randint(120, 350),
-            "Caçador de Bugs": random.randint(200, 500),
-            "Testador de Bots": random.randint(180, 450)
-        }
+        cooldowns.check("work", ctx.guild.id, ctx.author.id)
+        async with self.account_lock(ctx.guild.id, ctx.author.id):
+            user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
+            cooldowns.hydrate("work", ctx.guild.id, ctx.author.id, user_data["last_work"])
+            cooldowns.check("work", ctx.guild.id, ctx.author.id)
+
+            rewards = {
+                "Programador": random.randint(150, 400),
+                "Gamer Profissional": random.randint(100, 300),
+                "Designer de Emojis": random.randint(120, 350),
+                "Caçador de Bugs": random.randint(200, 500),
+                "Testador de Bots": random.randint(180, 450)
+            }
         
-        job = random.choice(list(rewards.keys()))
-        amount = rewards[job]
+            job = random.choice(list(rewards.keys()))
+            amount = rewards[job]
         
-        user_data["wallet"] += amount
-        user_data["last_work"] = datetime.utcnow().isoformat()
-
-        await db.update("economy",
-                        {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                        {"wallet": user_data["wallet"], "last_work": user_data["last_work"]})
+            self.cache.add(ctx.guild.id, ctx.author.id, {"wallet": amount}, {"last_work": datetime.utcnow().isoformat()}, kind="work")
+            cooldowns.trigger("work", ctx.guild.id, ctx.author.id)
         
-        embed = discord.Embed(
-            title=f"💼 Você trabalhou como {job}!",
-            description=f"Você ganhou **{amount:,} 🪙** na sua carteira!",
-            color=discord.Color.blue()
-        )
-        embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar.url)
-        await ctx.send(embed=embed)
+            embed = discord.Embed(
+                title=f"💼 Você trabalhou como {job}!",
+                description=f"Você ganhou **{amount:,} 🪙** na sua carteira!",
+                color=discord.Color.blue()
+            )
+            embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar.url)
+            await ctx.send(embed=embed)
 
     @commands.hybrid_command(name="deposit", description="Deposita dinheiro da sua carteira para o banco.")
+    @auto_defer()
     async def deposit(self, ctx: commands.Context, amount: int):
         if amount <= 0:
             return await ctx.send("Você precisa depositar um valor positivo!")
 
-        user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
+        async with self.account_lock(ctx.guild.id, ctx.author.id):
+            user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
 
-        if user_data["wallet"] < amount:
-            return await ctx.send(f"Você não tem **{amount:,} 🪙** na sua carteira para depositar.")
+            if user_data["wallet"] < amount:
+                return await ctx.send(f"Você não tem **{amount:,} 🪙** na sua carteira para depositar.")
         
-        user_data["wallet"] -= amount
-        user_data["bank"] += amount
-
-        await db.update("economy",
-                        {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                        {"wallet": user_data["wallet"], "bank": user_data["bank"]})
+            self.cache.add(ctx.guild.id, ctx.author.id, {"wallet": -amount, "bank": amount}, kind="deposit")
         
-        embed = discord.Embed(
-            title="🏦 Depósito Realizado",
-            description=f"Você depositou **{amount:,} 🪙** no seu banco.",
-            color=discord.Color.blue()
-        )
-        embed.add_field(name="Carteira Atual", value=f"{user_data['wallet']:,} 🪙")
-        embed.add_field(name="Banco Atual", value=f"{user_data['bank']:,} 🪙")
-        await ctx.send(embed=embed)
+            embed = discord.Embed(
+                title="🏦 Depósito Realizado",
+                description=f"Você depositou **{amount:,} 🪙** no seu banco.",
+                color=discord.Color.blue()
+            )
+            embed.add_field(name="Carteira Atual", value=f"{user_data['wallet']:,} 🪙")
+            embed.add_field(name="Banco Atual", value=f"{user_data['bank']:,} 🪙")
+            await ctx.send(embed=embed)
 
     @commands.hybrid_command(name="withdraw", description="Retira dinheiro do seu banco para a carteira.")
+    @auto_defer()
     async def withdraw(self, ctx: commands.Context, amount: int):
         if amount <= 0:
             return await ctx.send("Você precisa retirar um valor positivo!")
 
-        user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
+        async with self.account_lock(ctx.guild.id, ctx.author.id):
+            user_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
 
-        if user_data["bank"] < amount:
-            return await ctx.send(f"Você não tem **{amount:,} 🪙** no seu banco para retirar.")
+            if user_data["bank"] < amount:
+                return await ctx.send(f"Você não tem **{amount:,} 🪙** no seu banco para retirar.")
         
-        user_data["bank"] -= amount
-        user_data["wallet"] += amount
-
-        await db.update("economy",
-                        {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                        {"wallet": user_data["wallet"], "bank": user_data["bank"]})
+            self.cache.add(ctx.guild.id, ctx.author.id, {"wallet": amount, "bank": -amount}, kind="withdraw")
         
-        embed = discord.Embed(
-            title="💸 Retirada Realizada",
-            description=f"Você retirou **{amount:,} 🪙** do seu banco.",
-            color=discord.Color.red()
-        )
-        embed.add_field(name="Carteira Atual", value=f"{user_data['wallet']:,} 🪙")
-        embed.add_field(name="Banco Atual", value=f"{user_data['bank']:,} 🪙")
-        await ctx.send(embed=embed)
+            embed = discord.Embed(
+                title="💸 Retirada Realizada",
+                description=f"Você retirou **{amount:,} 🪙** do seu banco.",
+                color=discord.Color.red()
+            )
+            embed.add_field(name="Carteira Atual", value=f"{user_data['wallet']:,} 🪙")
+            embed.add_field(name="Banco Atual", value=f"{user_data['bank']:,} 🪙")
+            await ctx.send(embed=embed)
 
     @commands.hybrid_command(name="pay", description="Transfere dinheiro para outro usuário.")
+    @auto_defer()
     async def pay(self, ctx: commands.Context, member: discord.Member, amount: int):
         if amount <= 0:
             return await ctx.send("Você precisa enviar um valor positivo!")
@@ -174,127 +183,117 @@ class Economy(commands.Cog):
         if member.id == ctx.author.id:
             return await ctx.send("Você não pode pagar a si mesmo!")
 
-        sender_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
-        receiver_data = await self.get_user_economy(member.id, ctx.guild.id)
+        async with self.account_lock(ctx.guild.id, ctx.author.id, member.id):
+            sender_data, receiver_data = await asyncio.gather(self.get_user_economy(ctx.author.id, ctx.guild.id),
+                                                              self.get_user_economy(member.id, ctx.guild.id))
 
-        if sender_data["wallet"] < amount:
-            return await ctx.send(f"Você não tem **{amount:,} 🪙** na sua carteira para enviar.")
+            if sender_data["wallet"] < amount:
+                return await ctx.send(f"Você não tem **{amount:,} 🪙** na sua carteira para enviar.")
 
-        sender_data["wallet"] -= amount
-        receiver_data["wallet"] += amount
-
-        await db.update("economy",
-                        {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                        {"wallet": sender_data["wallet"]})
-        await db.update("economy",
-                        {"user_id": str(member.id), "guild_id": str(ctx.guild.id)},
-                        {"wallet": receiver_data["wallet"]})
+            # As duas contas estão travadas e em cache: o saldo local é o atual
+            self.transfer_wallet(ctx.guild.id, ctx.author.id, member.id, amount, "pay")
         
-        embed = discord.Embed(
-            title="🤝 Transferência Realizada",
-            description=f"Você enviou **{amount:,} 🪙** para **{member.display_name}**.",
-            color=discord.Color.green()
-        )
-        embed.add_field(name="Sua Carteira", value=f"{sender_data['wallet']:,} 🪙")
-        embed.add_field(name="Carteira de {member.display_name}", value=f"{receiver_data['wallet']:,} 🪙")
-        await ctx.send(embed=embed)
+            embed = discord.Embed(
+                title="🤝 Transferência Realizada",
+                description=f"Você enviou **{amount:,} 🪙** para **{member.display_name}**.",
+                color=discord.Color.green()
+            )
+            embed.add_field(name="Sua Carteira", value=f"{sender_data['wallet']:,} 🪙")
+            embed.add_field(name="Carteira de {member.display_name}", value=f"{receiver_data['wallet']:,} 🪙")
+            await ctx.send(embed=embed)
 
     @commands.hybrid_command(name="rob", description="Tente roubar dinheiro de outro usuário. Cuidado!")
-    @commands.cooldown(1, 10800, commands.BucketType.user) # 3 horas de cooldown
+    @auto_defer()
     async def rob(self, ctx: commands.Context, member: discord.Member):
+        cooldowns.check("rob", ctx.guild.id, ctx.author.id)
         if member.bot:
             await ctx.send("Você não pode roubar bots, eles não têm carteira!")
-            self.rob.reset_cooldown(ctx)
             return
         if member.id == ctx.author.id:
             await ctx.send("Você não pode roubar a si mesmo, seria autodestrutivo!")
-            self.rob.reset_cooldown(ctx)
             return
         
         if member.status == discord.Status.offline:
             await ctx.send("Não é possível roubar usuários offline. Eles estão escondendo seus bens!")
-            self.rob.reset_cooldown(ctx)
             return
 
-        robber_data = await self.get_user_economy(ctx.author.id, ctx.guild.id)
-        victim_data = await self.get_user_economy(member.id, ctx.guild.id)
-
-        # Cooldown para roubo
-        cooldown_rob_str = robber_data["cooldown_rob"]
-        if cooldown_rob_str:
-            cooldown_rob = datetime.fromisoformat(cooldown_rob_str)
-            if datetime.utcnow() < cooldown_rob + timedelta(hours=3):
-                next_rob_time = cooldown_rob + timedelta(hours=3)
-                time_diff = next_rob_time - datetime.utcnow()
-                hours, remainder = divmod(int(time_diff.total_seconds()), 3600)
-                minutes, seconds = divmod(remainder, 60)
-                await ctx.send(f"🚓 Você precisa esperar para tentar outro roubo! Tente novamente em {hours}h {minutes}m {seconds}s.")
-                return # Não resetar cooldown da cog se for cooldown do DB
-
-        if victim_data["wallet"] < 500: # Não roubar se a vítima tiver pouco dinheiro
-            await ctx.send(f"🕵️ {member.display_name} tem muito pouco dinheiro na carteira (<500 🪙). Não vale a pena o risco!")
-            return
+        async with self.account_lock(ctx.guild.id, ctx.author.id, member.id):
+            robber_data, victim_data = await asyncio.gather(self.get_user_economy(ctx.author.id, ctx.guild.id),
+                                                            self.get_user_economy(member.id, ctx.guild.id))
 
-        success_chance = random.randint(1, 100)
-        
-        # Obter ou criar dados para o leaderboard_stats antes de atualizar
-        robber_stats = await db.find_one("leaderboard_stats", {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)})
-        if not robber_stats:
-            await db.insert("leaderboard_stats", {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id), "total_money": 0, "items_owned": 0, "rob_success": 0, "rob_fails": 0})
-            robber_stats = await db.find_one("leaderboard_stats", {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)}) # Fetch again after insertion
-
-        if success_chance <= 60: # 60% de chance de sucesso
-            amount_robbed = random.randint(int(victim_data["wallet"] * 0.1), int(victim_data["wallet"] * 0.4)) # Rouba entre 10% e 40%
-            
-            robber_data["wallet"] += amount_robbed
-            victim_data["wallet"] -= amount_robbed
-            robber_data["cooldown_rob"] = datetime.utcnow().isoformat()
-
-            await db.update("economy",
-                            {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                            {"wallet": robber_data["wallet"], "cooldown_rob": robber_data["cooldown_rob"]})
-            await db.update("economy",
-                            {"user_id": str(member.id), "guild_id": str(ctx.guild.id)},
-                            {"wallet": victim_data["wallet"]})
-            
-            # Atualizar rob_success no leaderboard_stats
-            await db.update("leaderboard_stats",
-                            {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                            {"rob_success": robber_stats["rob_success"] + 1})
+            # Cooldown para roubo
+            cooldowns.hydrate("rob", ctx.guild.id, ctx.author.id, robber_data["cooldown_rob"])
+            cooldowns.check("rob", ctx.guild.id, ctx.author.id)
 
+            if victim_data["wallet"] < 500: # Não roubar se a vítima tiver pouco dinheiro
+                await ctx.send(f"🕵️ {member.display_name} tem muito pouco dinheiro na carteira (<500 🪙). Não vale a pena o risco!")
+                return
 
-            embed = discord.Embed(
-                title="✅ Roubo Bem Sucedido!",
-                description=f"Você conseguiu roubar **{amount_robbed:,} 🪙** de {member.display_name}!",
-                color=discord.Color.green()
-            )
-            embed.add_field(name="Sua Carteira", value=f"{robber_data['wallet']:,} 🪙")
-            embed.add_field(name="Carteira de {member.display_name}", value=f"{victim_data['wallet']:,} 🪙")
-            await ctx.send(embed=embed)
-        else: # Falha
-            fine_amount = random.randint(int(robber_data["wallet"] * 0.05), int(robber_data["wallet"] * 0.2)) # Multa entre 5% e 20%
-            if fine_amount > robber_data["wallet"]: # Não deixar o usuário ficar com saldo negativo na carteira por multa
-                fine_amount = robber_data["wallet"]
-            
-            robber_data["wallet"] -= fine_amount
-            robber_data["cooldown_rob"] = datetime.utcnow().isoformat()
+            success_chance = random.randint(1, 100)
+            stats_filters = {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)}
+            # Valores iniciais caso o usuário ainda não tenha registro no leaderboard_stats.
+            # A linha é da guild, e cada guild vive em um único processo (mesmo com clusters),
+            # então o fallback do db.increment, atômico só dentro do processo, basta aqui.
+            stats_defaults = {"total_money": 0, "items_owned": 0, "rob_success": 0, "rob_fails": 0}
 
-            await db.update("economy",
-                            {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                            {"wallet": robber_data["wallet"], "cooldown_rob": robber_data["cooldown_rob"]})
+            if success_chance <= 60: # 60% de chance de sucesso
+                amount_robbed = random.randint(int(victim_data["wallet"] * 0.1), int(victim_data["wallet"] * 0.4)) # Rouba entre 10% e 40%
             
-            # Atualizar rob_fails no leaderboard_stats
-            await db.update("leaderboard_stats",
-                            {"user_id": str(ctx.author.id), "guild_id": str(ctx.guild.id)},
-                            {"rob_fails": robber_stats["rob_fails"] + 1})
+                self.transfer_wallet(ctx.guild.id, member.id, ctx.author.id, amount_robbed, "rob")
+                self.cache.add(ctx.guild.id, ctx.author.id, {}, {"cooldown_rob": datetime.utcnow().isoformat()})
+                cooldowns.trigger("rob", ctx.guild.id, ctx.author.id)
             
-            embed = discord.Embed(
-                title="❌ Roubo Fracassado!",
-                description=f"Você foi pego tentando roubar {member.display_name} e foi multado em **{fine_amount:,} 🪙**!",
-                color=discord.Color.red()
-            )
-            embed.add_field(name="Sua Carteira", value=f"{robber_data['wallet']:,} 🪙")
-            await ctx.send(embed=embed)
+                # Atualizar rob_success no leaderboard_stats
+                await db.increment("leaderboard_stats", stats_filters, {"rob_success": 1}, defaults=stats_defaults)
+
+
+                embed = discord.Embed(
+                    title="✅ Roubo Bem Sucedido!",
+                    description=f"Você conseguiu roubar **{amount_robbed:,} 🪙** de {member.display_name}!",
+                    color=discord.Color.green()
+                )
+                embed.add_field(name="Sua Carteira", value=f"{robber_data['wallet']:,} 🪙")
+                embed.add_field(name="Carteira de {member.display_name}", value=f"{victim_data['wallet']:,} 🪙")
+                await ctx.send(embed=embed)
+            else: # Falha
+                fine_amount = random.randint(int(robber_data["wallet"] * 0.05), int(robber_data["wallet"] * 0.2)) # Multa entre 5% e 20%
+                if fine_amount > robber_data["wallet"]: # Não deixar o usuário ficar com saldo negativo na carteira por multa
+                    fine_amount = robber_data["wallet"]
+            
+                self.cache.add(ctx.guild.id, ctx.author.id, {"wallet": -fine_amount}, {"cooldown_rob": datetime.utcnow().isoformat()}, kind="rob_fine")
+                cooldowns.trigger("rob", ctx.guild.id, ctx.author.id)
+            
+                # Atualizar rob_fails no leaderboard_stats
+                await db.increment("leaderboard_stats", stats_filters, {"rob_fails": 1}, defaults=stats_defaults)
+            
+                embed = discord.Embed(
+                    title="❌ Roubo Fracassado!",
+                    description=f"Você foi pego tentando roubar {member.display_name} e foi multado em **{fine_amount:,} 🪙**!",
+                    color=discord.Color.red()
+                )
+                embed.add_field(name="Sua Carteira", value=f"{robber_data['wallet']:,} 🪙")
+                await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="leaderboard", description="Mostra os mais ricos do servidor.")
+    @auto_defer()
+    async def leaderboard_command(self, ctx: commands.Context):
+        board = await self.leaderboard.get(ctx.guild.id)
+        top = board.top(10)
+        if not top:
+            return await ctx.send("Ninguém tem dinheiro neste servidor ainda!")
+
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+        lines = [f"{medals.get(position, f'**{position}.**')} <@{user_id}> — {total:,} 🪙"
+                 for position, (user_id, total) in enumerate(top, start=1)]
+        embed = discord.Embed(
+            title="🏆 Ranking de Riqueza",
+            description="\n".join(lines),
+            color=discord.Color.gold()
+        )
+        position = board.rank(str(ctx.author.id))
+        if position is not None:
+            embed.set_footer(text=f"Sua posição: #{position} de {len(board)}")
+        await ctx.send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Economy(bot))
\ No newline at end of file
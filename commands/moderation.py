@@ -1,24 +1,69 @@
+import logging
+import os
+import re
+from datetime import timedelta
+from typing import Dict, List, Literal, Optional
 import discord
 from discord.ext import commands
 from discord import app_commands
-from database.manager import db
+from utils.journal import journal
+from utils.interactions import auto_defer, defer, respond
+from utils.bulk import ProgressMessage, run_bulk
+from utils.cache_policy import policy as cache_policy, recent_members, resolve_members, track_joins
+
+log = logging.getLogger('bot')
+
+# Máximo de alvos por comando em massa
+MASS_ACTION_LIMIT = int(os.environ.get('MASS_ACTION_LIMIT', '500'))
+# Limite do endpoint de ban em massa do Discord
+BULK_BAN_CHUNK = 200
+
+_MASS_ACTIONS = {
+    "ban": {"database": "bans", "by": "banned_by", "emoji": "🔨", "running": "Banindo", "done": "banidos",
+            "permission": "ban_members"},
+    "kick": {"database": "kicks", "by": "kicked_by", "emoji": "👢", "running": "Expulsando", "done": "expulsos",
+             "permission": "kick_members"},
+}
+
+async def _record(database: str, rows: List[Dict]):
+    """Grava a auditoria no journal; se o disco falhar, a ação já feita continua confirmada ao moderador"""
+    try:
+        await journal.append_many(database, rows)
+    except OSError as e:
+        log.error(f'❌ {len(rows)} registros de {database} não puderam ser gravados no journal ({e}): {rows}')
+
+def _parse_ids(text: str) -> List[int]:
+    """IDs e menções (<@123>) na ordem em que aparecem, sem repetição"""
+    return list(dict.fromkeys(int(match) for match in re.findall(r"\d{15,21}", text)))
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
+    # O /purge-raid lê do cache quem entrou desde que a guild ficou disponível
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        if self.bot.intents.members:
+            track_joins(guild)
+    
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        if self.bot.intents.members:
+            track_joins(guild)
+    
     @app_commands.command(name="ban", description="Bane um usuário e registra no banco de dados.")
     @app_commands.describe(user="O usuário a ser banido.", motivo="O motivo do banimento.")
     @app_commands.checks.has_permissions(ban_members=True)
+    @auto_defer()
     async def ban(self, interaction: discord.Interaction, user: discord.Member, motivo: str = "Sem motivo especificado."):
         if user.id == interaction.user.id:
-            await interaction.response.send_message("Você não pode banir a si mesmo!", ephemeral=True)
+            await respond(interaction, "Você não pode banir a si mesmo!", ephemeral=True)
             return
         if user.bot:
-            await interaction.response.send_message("Não é possível banir bots com este comando.", ephemeral=True)
+            await respond(interaction, "Não é possível banir bots com este comando.", ephemeral=True)
             return
         if user.top_role >= interaction.user.top_role and interaction.user.id != interaction.guild.owner_id:
-            await interaction.response.send_message(f"Você não pode banir {user.display_name} pois ele tem um cargo igual ou superior ao seu.", ephemeral=True)
+            await respond(interaction, f"Você não pode banir {user.display_name} pois ele tem um cargo igual ou superior ao seu.", ephemeral=True)
             return
 
         try:
@@ -33,52 +78,223 @@ class Moderation(commands.Cog):
                 "guild_id": str(interaction.guild.id),
                 "timestamp": discord.utils.utcnow().isoformat()
             }
-            await db.save("bans", ban_data)
+            # Registro vai para o journal local; o envio ao banco acontece em segundo plano
+            await _record("bans", [ban_data])
             
-            await interaction.response.send_message(f"🔨 {user.mention} foi banido! Motivo: **{motivo}**", ephemeral=False)
+            await respond(interaction, f"🔨 {user.mention} foi banido! Motivo: **{motivo}**", ephemeral=False)
             
         except discord.Forbidden:
-            await interaction.response.send_message("Eu não tenho permissão para banir este usuário.", ephemeral=True)
+            await respond(interaction, "Eu não tenho permissão para banir este usuário.", ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message(f"Ocorreu um erro ao banir o usuário: `{e}`", ephemeral=True)
+            await respond(interaction, f"Ocorreu um erro ao banir o usuário: `{e}`", ephemeral=True)
 
     @app_commands.command(name="unban", description="Desbane um usuário do servidor.")
     @app_commands.describe(user_id="O ID do usuário a ser desbanido.", motivo="O motivo do desbanimento.")
     @app_commands.checks.has_permissions(ban_members=True)
+    @auto_defer()
     async def unban(self, interaction: discord.Interaction, user_id: str, motivo: str = "Sem motivo especificado."):
         try:
             user = discord.Object(id=int(user_id))
             await interaction.guild.unban(user, reason=motivo)
+            await _record("unbans", [{
+                "user_id": user_id,
+                "unbanned_by_id": str(interaction.user.id),
+                "unbanned_by_name": interaction.user.name,
+                "reason": motivo,
+                "guild_id": str(interaction.guild.id),
+                "timestamp": discord.utils.utcnow().isoformat()
+            }])
             
-            await interaction.response.send_message(f"✅ O usuário com ID `{user_id}` foi desbanido! Motivo: **{motivo}**", ephemeral=False)
+            await respond(interaction, f"✅ O usuário com ID `{user_id}` foi desbanido! Motivo: **{motivo}**", ephemeral=False)
             
         except discord.NotFound:
-            await interaction.response.send_message("Não foi possível encontrar este ID na lista de banidos.", ephemeral=True)
+            await respond(interaction, "Não foi possível encontrar este ID na lista de banidos.", ephemeral=True)
         except discord.Forbidden:
-            await interaction.response.send_message("Eu não tenho permissão para desbanir usuários.", ephemeral=True)
+            await respond(interaction, "Eu não tenho permissão para desbanir usuários.", ephemeral=True)
         except ValueError:
-            await interaction.response.send_message("ID de usuário inválido.", ephemeral=True)
+            await respond(interaction, "ID de usuário inválido.", ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message(f"Ocorreu um erro: `{e}`", ephemeral=True)
+            await respond(interaction, f"Ocorreu um erro: `{e}`", ephemeral=True)
 
     @app_commands.command(name="kick", description="Expulsa um usuário do servidor.")
     @app_commands.describe(user="O usuário a ser expulso.", motivo="O motivo da expulsão.")
     @app_commands.checks.has_permissions(kick_members=True)
+    @auto_defer()
     async def kick(self, interaction: discord.Interaction, user: discord.Member, motivo: str = "Sem motivo especificado."):
         if user.id == interaction.user.id:
-            await interaction.response.send_message("Você não pode expulsar a si mesmo!", ephemeral=True)
+            await respond(interaction, "Você não pode expulsar a si mesmo!", ephemeral=True)
             return
         if user.top_role >= interaction.user.top_role and interaction.user.id != interaction.guild.owner_id:
-            await interaction.response.send_message(f"Você não pode expulsar {user.display_name}.", ephemeral=True)
+            await respond(interaction, f"Você não pode expulsar {user.display_name}.", ephemeral=True)
             return
 
         try:
             await user.kick(reason=motivo)
-            await interaction.response.send_message(f"👢 {user.mention} foi expulso! Motivo: **{motivo}**", ephemeral=False)
+            await _record("kicks", [{
+                "user_id": str(user.id),
+                "user_name": user.name,
+                "kicked_by_id": str(interaction.user.id),
+                "kicked_by_name": interaction.user.name,
+                "reason": motivo,
+                "guild_id": str(interaction.guild.id),
+                "timestamp": discord.utils.utcnow().isoformat()
+            }])
+            await respond(interaction, f"👢 {user.mention} foi expulso! Motivo: **{motivo}**", ephemeral=False)
         except discord.Forbidden:
-            await interaction.response.send_message("Eu não tenho permissão para expulsar este usuário.", ephemeral=True)
+            await respond(interaction, "Eu não tenho permissão para expulsar este usuário.", ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message(f"Ocorreu um erro: `{e}`", ephemeral=True)
+            await respond(interaction, f"Ocorreu um erro: `{e}`", ephemeral=True)
+
+    # 🚨 AÇÕES EM MASSA
+
+    def _skip_reason(self, interaction: discord.Interaction, user_id: int, member: Optional[discord.Member],
+                     action: str) -> Optional[str]:
+        """Motivo para não agir sobre o alvo (mesmas regras do ban/kick individual)"""
+        guild = interaction.guild
+        if user_id == interaction.user.id:
+            return "é você"
+        if user_id in (self.bot.user.id, guild.owner_id):
+            return "não pode ser punido"
+        if member is None:
+            # Fora da guild: ban funciona pelo ID, kick não tem o que fazer
+            return "não está no servidor" if action == "kick" else None
+        if member.top_role >= interaction.user.top_role and interaction.user.id != guild.owner_id:
+            return "cargo igual ou superior ao seu"
+        if member.top_role >= guild.me.top_role:
+            return "cargo igual ou superior ao meu"
+        return None
+
+    async def _bulk_ban(self, guild: discord.Guild, targets: List[int], reason: str, on_progress,
+                        done: List[int], failed: Dict[int, object]):
+        """
+        Usa o endpoint de ban em massa (200 por requisição), preenchendo `done` e
+        `failed` conforme avança. Um bloco recusado pelo endpoint é banido um a um;
+        sem Gerenciar Servidor (403), todo o resto vai um a um.
+        """
+        bulk = True
+        for start in range(0, len(targets), BULK_BAN_CHUNK):
+            chunk = targets[start:start + BULK_BAN_CHUNK]
+            if bulk:
+                try:
+                    result = await guild.bulk_ban([discord.Object(id=user_id) for user_id in chunk], reason=reason)
+                except discord.Forbidden:
+                    bulk = False
+                except (discord.HTTPException, discord.RateLimited) as e:
+                    log.warning(f'⚠️ Ban em massa falhou em {guild.id} ({e}); banindo {len(chunk)} usuários um a um')
+                else:
+                    done.extend(user.id for user in result.banned)
+                    failed.update((user.id, "recusado pelo Discord") for user in result.failed)
+                    await on_progress(len(done) + len(failed), len(targets))
+                    continue
+            offset = len(done) + len(failed)
+            chunk_done, chunk_failed = await run_bulk(
+                chunk, lambda user_id: guild.ban(discord.Object(id=user_id), reason=reason),
+                route=("ban", guild.id), on_progress=lambda count, total: on_progress(offset + count, len(targets)))
+            done.extend(chunk_done)
+            failed.update(chunk_failed)
+
+    async def _mass_action(self, interaction: discord.Interaction, action: str, user_ids: List[int], motivo: str):
+        config = _MASS_ACTIONS[action]
+        if not user_ids:
+            await respond(interaction, "Nenhum usuário válido informado.", ephemeral=True)
+            return
+        if len(user_ids) > MASS_ACTION_LIMIT:
+            await respond(interaction, f"No máximo {MASS_ACTION_LIMIT} usuários por comando.", ephemeral=True)
+            return
+        await defer(interaction)
+
+        guild = interaction.guild
+        # Com chunking sob demanda nem todo membro está no cache: busca os que faltam
+        members = await resolve_members(guild, user_ids, cache=cache_policy.cache_fetched_members)
+        skipped: Dict[int, str] = {}
+        targets = []
+        for user_id in user_ids:
+            reason = self._skip_reason(interaction, user_id, members.get(user_id), action)
+            if reason:
+                skipped[user_id] = reason
+            else:
+                targets.append(user_id)
+
+        progress = ProgressMessage(interaction)
+        running = f"{config['emoji']} {config['running']} {{}}/{len(targets)} usuários..."
+        await progress.update(running.format(0), force=True)
+
+        async def on_progress(count: int, total: int):
+            await progress.update(running.format(count))
+
+        audit_reason = f"{motivo} (por {interaction.user.name} via /{interaction.command.name})"
+        done: List[int] = []
+        failed: Dict[int, object] = {}
+        interrupted = None
+        try:
+            if action == "ban":
+                await self._bulk_ban(guild, targets, audit_reason, on_progress, done, failed)
+            else:
+                kicked, not_kicked = await run_bulk(
+                    targets, lambda user_id: guild.kick(discord.Object(id=user_id), reason=audit_reason),
+                    route=("kick", guild.id), on_progress=on_progress)
+                done.extend(kicked)
+                failed.update(not_kicked)
+        except Exception as e:
+            # Quem já foi punido até aqui continua sendo registrado e aparece no resumo
+            log.error(f'❌ /{interaction.command.name} interrompido em {guild.id}: {e}')
+            interrupted = e
+
+        # Todos os registros de auditoria num único append (e num lote só para o banco)
+        timestamp = discord.utils.utcnow().isoformat()
+        rows = []
+        for user_id in done:
+            member = members.get(user_id)
+            rows.append({
+                "user_id": str(user_id),
+                "user_name": member.name if member else None,
+                f"{config['by']}_id": str(interaction.user.id),
+                f"{config['by']}_name": interaction.user.name,
+                "reason": motivo,
+                "guild_id": str(guild.id),
+                "timestamp": timestamp
+            })
+        if rows:
+            await _record(config["database"], rows)
+
+        lines = [f"{config['emoji']} **{len(done)}** usuários {config['done']}. Motivo: **{motivo}**"]
+        if skipped:
+            lines.append(f"⏭️ {len(skipped)} ignorados: " + ", ".join(f"`{user_id}` ({reason})" for user_id, reason in list(skipped.items())[:10]))
+        if failed:
+            lines.append(f"❌ {len(failed)} falharam: " + ", ".join(f"`{user_id}` ({error})" for user_id, error in list(failed.items())[:10]))
+        if interrupted is not None:
+            lines.append(f"⚠️ Interrompido antes do fim: `{interrupted}`")
+        await progress.update("\n".join(lines)[:2000], force=True)
+
+    @app_commands.command(name="massban", description="Bane vários usuários de uma vez.")
+    @app_commands.describe(usuarios="IDs ou menções separados por espaço.", motivo="O motivo do banimento.")
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def massban(self, interaction: discord.Interaction, usuarios: str, motivo: str = "Sem motivo especificado."):
+        await self._mass_action(interaction, "ban", _parse_ids(usuarios), motivo)
+
+    @app_commands.command(name="masskick", description="Expulsa vários usuários de uma vez.")
+    @app_commands.describe(usuarios="IDs ou menções separados por espaço.", motivo="O motivo da expulsão.")
+    @app_commands.checks.has_permissions(kick_members=True)
+    async def masskick(self, interaction: discord.Interaction, usuarios: str, motivo: str = "Sem motivo especificado."):
+        await self._mass_action(interaction, "kick", _parse_ids(usuarios), motivo)
+
+    @app_commands.command(name="purge-raid", description="Bane ou expulsa todos que entraram nos últimos minutos.")
+    @app_commands.describe(minutos="Janela de entrada, em minutos.", acao="Banir ou expulsar.", motivo="O motivo.")
+    @app_commands.guild_only()
+    async def purge_raid(self, interaction: discord.Interaction, minutos: app_commands.Range[int, 1, 1440],
+                         acao: Literal["ban", "kick"] = "ban", motivo: str = "Raid"):
+        # A permissão exigida depende da ação escolhida
+        if not getattr(interaction.permissions, _MASS_ACTIONS[acao]["permission"]):
+            await respond(interaction, "❌ Você não tem permissão para usar este comando!", ephemeral=True)
+            return
+        cutoff = discord.utils.utcnow() - timedelta(minutes=minutos)
+        await defer(interaction)
+        members = await recent_members(interaction.guild, cutoff, cache=cache_policy.cache_fetched_members)
+        user_ids = [member.id for member in members if not member.bot]
+        if not user_ids:
+            await respond(interaction, f"Ninguém entrou nos últimos {minutos} minutos.", ephemeral=True)
+            return
+        await self._mass_action(interaction, acao, user_ids, motivo)
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
\ No newline at end of file
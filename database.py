@@ -10,15 +10,44 @@ LIMITES POR PLANO:
 
 import os
 import json
-from typing import Any, Optional, List, Dict, Tuple
-from supabase import create_client, Client
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Optional, List, Dict, Tuple
+from utils.metrics import CACHE_REQUESTS, DATABASE_CALL_SECONDS, timed
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 # Initialize Supabase client
 _supabase_url = os.getenv('SUPABASE_URL')
 _supabase_key = os.getenv('SUPABASE_KEY')
 _bot_id = os.getenv('BOT_ID')
-_supabase: Optional[Client] = None
+_supabase: Optional['Client'] = None
 _user_plan: Optional[str] = None
+# 'array': todos os itens em bot_databases.data (padrão)
+# 'rows': um registro por linha em bot_database_rows (veja migrate_to_rows)
+_storage_mode = os.getenv('DATABASE_STORAGE', 'array')
+_ROWS_TABLE = 'bot_database_rows'
+_MIGRATION_CHUNK = 500
+# Índices hash em memória (veja create_index): banco → chave → índice,
+# e a cópia local dos itens de cada banco indexado
+_indexes: Dict[str, Dict[str, '_HashIndex']] = {}
+_index_data: Dict[str, List[Dict]] = {}
+# Versão (updated_at) de que a cópia local de cada banco indexado foi tirada, e quando foi conferida
+_index_versions: Dict[str, Dict] = {}
+# Cache local dos bancos (linhas de bot_databases), validado por updated_at
+_SNAPSHOT_MAX_ENTRIES = int(os.getenv('DATABASE_CACHE_MAX_ENTRIES', '32'))
+_SNAPSHOT_MAX_BYTES = int(os.getenv('DATABASE_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+_SNAPSHOT_TRUST_SECONDS = float(os.getenv('DATABASE_CACHE_TRUST_SECONDS', '5'))
+_snapshots: 'OrderedDict[str, Dict]' = OrderedDict()
+_snapshot_bytes = 0
+_unversioned: set = set()
+# Protege os índices e snapshots quando o módulo é usado por várias threads
+# (ex.: database_async); nunca é mantido durante uma requisição ao Supabase.
+_state_lock = threading.RLock()
 _plan_limits = {
     'free': {'can_use': False, 'max_rows': 0},
     'pro': {'can_use': True, 'max_rows': 100},
@@ -30,11 +59,16 @@ class DatabaseAccessError(Exception):
     """Erro de acesso ao banco de dados devido a restrições de plano."""
     pass
 
-def _get_client() -> Client:
+# Duração de cada função pública (inclui as idas ao Supabase), exposta em /metrics
+_timed = timed(DATABASE_CALL_SECONDS)
+
+def _get_client() -> 'Client':
     global _supabase
     if _supabase is None:
         if not _supabase_url or not _supabase_key:
             raise Exception("SUPABASE_URL e SUPABASE_KEY não configurados")
+        # Import pesado (~0,5s): só no primeiro acesso, não ao carregar as cogs
+        from supabase import create_client
         _supabase = create_client(_supabase_url, _supabase_key)
     return _supabase
 
@@ -75,7 +109,9 @@ def _check_plan_access(operation: str = "usar banco de dados") -> dict:
     Levanta DatabaseAccessError se não permitido.
     """
     plan_name, limits = _get_user_plan()
-    
+    return _plan_access(plan_name, limits, operation)
+
+def _plan_access(plan_name: str, limits: dict, operation: str) -> dict:
     if not limits['can_use']:
         raise DatabaseAccessError(
             f"❌ Plano '{plan_name}' não permite {operation}. "
@@ -84,15 +120,354 @@ def _check_plan_access(operation: str = "usar banco de dados") -> dict:
     
     return limits
 
+def _use_rows() -> bool:
+    return _storage_mode == 'rows'
+
+def _rows_table():
+    return _get_client().table(_ROWS_TABLE)
+
+def _rows_matching(db: Dict, key: str, value: Any, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Linhas ({id, data}) com data[key] == value, em ordem de inserção.
+    O filtro `contains` (jsonb @>) também casa listas e objetos que apenas
+    contêm `value`, então o resultado é conferido aqui por igualdade.
+    """
+    query = _rows_table().select('id', 'data').eq('database_id', db['id']).contains('data', {key: value}).order('id')
+    if limit is not None and not isinstance(value, (dict, list)):
+        # Para valores simples, contém == igual: dá para limitar no servidor
+        query = query.limit(limit)
+    rows = [row for row in (query.execute().data or []) if row['data'].get(key) == value]
+    return rows[:limit] if limit is not None else rows
+
+def _rows_first_id(db: Dict, key: str, value: Any) -> Optional[int]:
+    """Retorna o id da primeira linha (em ordem de inserção) com data[key] == value."""
+    rows = _rows_matching(db, key, value, limit=1)
+    return rows[0]['id'] if rows else None
+
+def _rows_id_at(db: Dict, index: int) -> Optional[int]:
+    """Retorna o id da linha na posição `index` (em ordem de inserção)."""
+    if index < 0:
+        return None
+    response = _rows_table().select('id').eq('database_id', db['id']).order('id').range(index, index).execute()
+    return response.data[0]['id'] if response.data else None
+
+def _rows_all_data(db: Dict) -> List[Dict]:
+    response = _rows_table().select('data').eq('database_id', db['id']).order('id').execute()
+    return [row['data'] for row in (response.data or [])]
+
+def _rows_touch(db: Dict):
+    """Muda a versão (updated_at) do banco após alterar uma linha, para os outros processos verem a mudança."""
+    _update_database(db, {})
+
+def _rows_count(db: Dict) -> int:
+    response = _rows_table().select('id', count='exact').eq('database_id', db['id']).limit(1).execute()
+    return response.count or 0
+
+def _rows_sync_count(db: Dict) -> int:
+    """
+    Recalcula row_count a partir das linhas. Somar ao valor lido antes da
+    escrita perderia inserções/remoções concorrentes de outros processos;
+    recontando, um valor atrasado se corrige na escrita seguinte.
+    """
+    row_count = _rows_count(db)
+    _update_database(db, {'row_count': row_count})
+    return row_count
+
+def _synchronized(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _state_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+class _HashIndex:
+    """Índice em memória valor → posições dos itens de um banco, para uma chave."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.positions: Dict[Any, List[int]] = {}
+
+    @staticmethod
+    def _hashable(value: Any) -> Any:
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            # dicts/listas: indexados pela forma serializada
+            return ('__json__', json.dumps(value, sort_keys=True, default=str))
+
+    def build(self, data: List[Dict]):
+        self.positions = {}
+        for position, item in enumerate(data):
+            self.add(position, item)
+
+    def add(self, position: int, item: Dict):
+        if self.key in item:
+            self.positions.setdefault(self._hashable(item[self.key]), []).append(position)
+
+    def remove(self, position: int, item: Dict):
+        if self.key not in item:
+            return
+        value = self._hashable(item[self.key])
+        positions = self.positions.get(value, [])
+        if position in positions:
+            positions.remove(position)
+        if not positions:
+            self.positions.pop(value, None)
+
+    def lookup(self, value: Any) -> List[int]:
+        return self.positions.get(self._hashable(value), [])
+
+def _get_index(db_name: str, key: str) -> Optional[_HashIndex]:
+    return _indexes.get(db_name, {}).get(key)
+
+@_synchronized
+def _index_refresh(db_name: str, data: Optional[List[Dict]]):
+    """Substitui a cópia local de um banco indexado e reconstrói seus índices (None remove tudo)."""
+    if db_name not in _indexes:
+        return
+    if data is None:
+        _indexes.pop(db_name, None)
+        _index_data.pop(db_name, None)
+        _index_versions.pop(db_name, None)
+        return
+    _index_data[db_name] = data
+    for index in _indexes[db_name].values():
+        index.build(data)
+
+@_synchronized
+def _index_on_add(db_name: str, item: Dict):
+    if db_name not in _indexes:
+        return
+    data = _index_data[db_name]
+    data.append(item)
+    for index in _indexes[db_name].values():
+        index.add(len(data) - 1, item)
+
+@_synchronized
+def _index_on_update(db_name: str, position: int, item: Dict):
+    if db_name not in _indexes:
+        return
+    data = _index_data[db_name]
+    if not 0 <= position < len(data):
+        return
+    for index in _indexes[db_name].values():
+        index.remove(position, data[position])
+        index.add(position, item)
+    data[position] = item
+
+@_synchronized
+def _index_on_delete(db_name: str, position: int):
+    # As posições seguintes mudam, então os índices do banco são reconstruídos
+    if db_name not in _indexes:
+        return
+    data = _index_data[db_name]
+    if 0 <= position < len(data):
+        data.pop(position)
+        _index_refresh(db_name, data)
+
+@_synchronized
+def _index_set_version(db_name: str, updated_at: Optional[str]):
+    if db_name in _indexes:
+        _index_versions[db_name] = {'updated_at': updated_at, 'checked_at': time.monotonic()}
+
+def _index_reload(db: Dict):
+    """Reconstrói os índices de um banco com os dados da versão `db`."""
+    if db['name'] in _indexes:
+        _index_replace(db, _rows_all_data(db) if _use_rows() else list(db.get('data') or []))
+
+@_synchronized
+def _index_replace(db: Dict, data: List[Dict]):
+    _index_refresh(db['name'], data)
+    _index_set_version(db['name'], db.get('updated_at'))
+
+def _index_validate(db_name: str):
+    """
+    Confere a versão do índice com um select só de updated_at (no máximo a cada
+    DATABASE_CACHE_TRUST_SECONDS) e reconstrói o índice se o banco mudou no
+    servidor. Não depende do snapshot: bancos grandes demais para o cache
+    local também são conferidos sem baixar os dados.
+    """
+    fresh, version = _index_fresh(db_name)
+    if fresh:
+        return
+    if version is not None:
+        try:
+            probe = _get_client().table('bot_databases').select('updated_at').eq('bot_id', _bot_id).eq('name', db_name).single().execute()
+            if _index_confirm(version, probe.data):
+                return
+        except Exception:
+            pass
+    db = get_database(db_name)
+    if _index_stale(db_name, db):
+        _index_reload(db)
+
+@_synchronized
+def _index_fresh(db_name: str) -> Tuple[bool, Optional[Dict]]:
+    """(dispensa conferir?, versão do índice)"""
+    if db_name in _unversioned:
+        return True, None
+    version = _index_versions.get(db_name)
+    return version is not None and time.monotonic() - version['checked_at'] <= _SNAPSHOT_TRUST_SECONDS, version
+
+def _index_confirm(version: Dict, probe: Optional[Dict]) -> bool:
+    if probe and probe.get('updated_at') == version['updated_at']:
+        version['checked_at'] = time.monotonic()
+        return True
+    return False
+
+@_synchronized
+def _index_stale(db_name: str, db: Optional[Dict]) -> bool:
+    # get_database só reconstrói ao baixar o banco; um snapshot válido mais novo que o índice também serve
+    version = _index_versions.get(db_name)
+    return db is not None and db_name in _indexes and (version is None or version['updated_at'] != db.get('updated_at'))
+
+@_synchronized
+def _local_position(db_name: str, key: str, value: Any) -> int:
+    """Posição do primeiro item com key == value na cópia local (-1 se ausente ou banco não indexado)."""
+    index = _get_index(db_name, key)
+    if index is not None:
+        positions = index.lookup(value)
+        return min(positions) if positions else -1
+    for i, item in enumerate(_index_data.get(db_name, [])):
+        if item.get(key) == value:
+            return i
+    return -1
+
+def _snapshot_copy(db: Dict) -> Dict:
+    # Cópia rasa: as funções deste módulo alteram a lista `data`, nunca os itens
+    copy = dict(db)
+    if isinstance(copy.get('data'), list):
+        copy['data'] = list(copy['data'])
+    return copy
+
+@_synchronized
+def _snapshot_drop(name: str):
+    global _snapshot_bytes
+    entry = _snapshots.pop(name, None)
+    if entry is not None:
+        _snapshot_bytes -= entry['size']
+
+def _approximate_size(db: Dict, sample: int = 32) -> int:
+    """Tamanho em JSON da linha do banco, estimado por uma amostra espaçada dos itens."""
+    data = db.get('data')
+    if not isinstance(data, list) or len(data) <= sample:
+        return len(json.dumps(db, default=str))
+    picked = data[::len(data) // sample][:sample]
+    rest = len(json.dumps({key: value for key, value in db.items() if key != 'data'}, default=str))
+    return rest + int(len(json.dumps(picked, default=str)) / len(picked) * len(data))
+
+@_synchronized
+def _snapshot_store(db: Optional[Dict]):
+    """Guarda (ou substitui) o snapshot de um banco e despeja os mais frios se passar dos limites."""
+    global _snapshot_bytes
+    if not db or 'name' not in db:
+        return
+    name = db['name']
+    _snapshot_drop(name)
+    # Sem updated_at não há como validar o snapshot depois
+    if not db.get('updated_at'):
+        _unversioned.add(name)
+        return
+    _unversioned.discard(name)
+    size = _approximate_size(db)
+    if size > _SNAPSHOT_MAX_BYTES:
+        return
+    _snapshots[name] = {'db': _snapshot_copy(db), 'size': size, 'checked_at': time.monotonic()}
+    _snapshot_bytes += size
+    while _snapshots and (len(_snapshots) > _SNAPSHOT_MAX_ENTRIES or _snapshot_bytes > _SNAPSHOT_MAX_BYTES):
+        _snapshot_drop(next(iter(_snapshots)))
+
+def _snapshot_check(name: str) -> Optional[Dict]:
+    """
+    Retorna a entrada do snapshot se ainda for válida: sem consulta dentro da
+    janela de confiança, ou após conferir que updated_at no servidor não mudou.
+    """
+    entry, expired = _snapshot_entry(name)
+    if entry is None or not expired:
+        return entry
+    client = _get_client()
+    probe = client.table('bot_databases').select('updated_at').eq('bot_id', _bot_id).eq('name', name).single().execute()
+    return _snapshot_confirm(name, entry, probe.data)
+
+@_synchronized
+def _snapshot_entry(name: str) -> Tuple[Optional[Dict], bool]:
+    """(entrada do snapshot, precisa conferir updated_at no servidor?)"""
+    entry = _snapshots.get(name)
+    if entry is None:
+        return None, False
+    if time.monotonic() - entry['checked_at'] <= _SNAPSHOT_TRUST_SECONDS:
+        _snapshots.move_to_end(name)
+        return entry, False
+    return entry, True
+
+@_synchronized
+def _snapshot_confirm(name: str, entry: Dict, probe: Optional[Dict]) -> Optional[Dict]:
+    if not probe or probe.get('updated_at') != entry['db'].get('updated_at'):
+        _snapshot_drop(name)
+        return None
+    entry['checked_at'] = time.monotonic()
+    if name in _snapshots:
+        _snapshots.move_to_end(name)
+    return entry
+
+def _snapshot_get(name: str) -> Optional[Dict]:
+    entry = _snapshot_check(name)
+    return _snapshot_copy(entry['db']) if entry is not None else None
+
+def _update_database(db: Dict, fields: Dict):
+    """
+    Atualiza a linha do banco em bot_databases e mantém o snapshot local em dia.
+    updated_at vai sempre junto: é a versão que os outros processos conferem,
+    e não dá para depender de um trigger no Supabase para mudá-la.
+    """
+    fields = _versioned(fields)
+    response = _get_client().table('bot_databases').update(fields).eq('id', db['id']).execute()
+    _after_update(db, fields, response.data)
+    return response
+
+def _versioned(fields: Dict) -> Dict:
+    return {**fields, 'updated_at': datetime.now(timezone.utc).isoformat()}
+
+@_synchronized
+def _after_update(db: Dict, fields: Dict, rows: Optional[List[Dict]]):
+    """Leva a linha gravada ao snapshot e a versão nova aos índices do banco."""
+    name = db.get('name')
+    if rows:
+        _snapshot_store(rows[0])
+    else:
+        _snapshot_drop(name)
+    version = _index_versions.get(name)
+    # O índice acompanha a versão nova se a escrita substituiu o array inteiro
+    # (o chamador reconstrói o índice com ele) ou se já estava na versão em que ela se baseou
+    replaced = 'data' in fields and not _use_rows()
+    if rows and (replaced or (version is not None and version['updated_at'] == db.get('updated_at'))):
+        _index_set_version(name, rows[0].get('updated_at'))
+    else:
+        _index_versions.pop(name, None)
+
+@_timed
 def get_database(name: str) -> Optional[Dict]:
     """
     Obtém um banco de dados pelo nome.
     Retorna o objeto do banco ou None se não existir.
+    Usa o snapshot local quando o banco não mudou no servidor.
     """
     try:
         _check_plan_access("visualizar banco de dados")
+        try:
+            cached = _snapshot_get(name)
+        except Exception:
+            cached = None
+        CACHE_REQUESTS.inc(cache="database_snapshot", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
         client = _get_client()
         response = client.table('bot_databases').select('*').eq('bot_id', _bot_id).eq('name', name).single().execute()
+        _snapshot_store(response.data)
+        # O banco mudou fora deste processo: reconstrói os índices com os dados novos
+        if response.data:
+            _index_reload(response.data)
         return response.data
     except DatabaseAccessError as e:
         print(str(e))
@@ -101,6 +476,7 @@ def get_database(name: str) -> Optional[Dict]:
         print(f"Erro ao obter banco de dados: {e}")
         return None
 
+@_timed
 def create_database(name: str) -> Optional[Dict]:
     """
     Cria um novo banco de dados para o bot.
@@ -118,6 +494,8 @@ def create_database(name: str) -> Optional[Dict]:
             'max_rows': max_rows,
             'row_count': 0
         }).execute()
+        if response.data:
+            _snapshot_store(response.data[0])
         return response.data[0] if response.data else None
     except DatabaseAccessError as e:
         print(str(e))
@@ -126,6 +504,7 @@ def create_database(name: str) -> Optional[Dict]:
         print(f"Erro ao criar banco de dados: {e}")
         return None
 
+@_timed
 def get_or_create_database(name: str) -> Optional[Dict]:
     """
     Obtém um banco de dados existente ou cria um novo.
@@ -135,15 +514,23 @@ def get_or_create_database(name: str) -> Optional[Dict]:
         db = create_database(name)
     return db
 
+@_timed
 def get_all_data(db_name: str) -> List[Dict]:
     """
     Obtém todos os dados de um banco de dados.
     """
     db = get_database(db_name)
+    if db and _use_rows():
+        try:
+            return _rows_all_data(db)
+        except Exception as e:
+            print(f"Erro ao obter dados: {e}")
+            return []
     if db and db.get('data'):
         return db['data']
     return []
 
+@_timed
 def add_data(db_name: str, item: Dict) -> bool:
     """
     Adiciona um item ao banco de dados.
@@ -165,14 +552,20 @@ def add_data(db_name: str, item: Dict) -> bool:
             print(f"❌ Limite de {max_rows} registros atingido para plano atual. Faça upgrade para mais espaço.")
             return False
         
+        if _use_rows():
+            _rows_table().insert({'database_id': db['id'], 'bot_id': _bot_id, 'data': item}).execute()
+            _rows_sync_count(db)
+            _index_on_add(db_name, item)
+            return True
+        
         data.append(item)
         
-        client = _get_client()
-        client.table('bot_databases').update({
+        _update_database(db, {
             'data': data,
             'row_count': len(data)
-        }).eq('id', db['id']).execute()
+        })
         
+        _index_refresh(db_name, data)
         return True
     except DatabaseAccessError as e:
         print(str(e))
@@ -181,6 +574,7 @@ def add_data(db_name: str, item: Dict) -> bool:
         print(f"Erro ao adicionar dados: {e}")
         return False
 
+@_timed
 def update_data(db_name: str, index: int, item: Dict) -> bool:
     """
     Atualiza um item no banco de dados pelo índice.
@@ -192,17 +586,26 @@ def update_data(db_name: str, index: int, item: Dict) -> bool:
         if db is None:
             return False
         
+        if _use_rows():
+            row_id = _rows_id_at(db, index)
+            if row_id is None:
+                return False
+            _rows_table().update({'data': item}).eq('id', row_id).execute()
+            _rows_touch(db)
+            _index_on_update(db_name, index, item)
+            return True
+        
         data = db.get('data', [])
         if index < 0 or index >= len(data):
             return False
         
         data[index] = item
         
-        client = _get_client()
-        client.table('bot_databases').update({
+        _update_database(db, {
             'data': data
-        }).eq('id', db['id']).execute()
+        })
         
+        _index_refresh(db_name, data)
         return True
     except DatabaseAccessError as e:
         print(str(e))
@@ -211,6 +614,7 @@ def update_data(db_name: str, index: int, item: Dict) -> bool:
         print(f"Erro ao atualizar dados: {e}")
         return False
 
+@_timed
 def delete_data(db_name: str, index: int) -> bool:
     """
     Remove um item do banco de dados pelo índice.
@@ -222,18 +626,27 @@ def delete_data(db_name: str, index: int) -> bool:
         if db is None:
             return False
         
+        if _use_rows():
+            row_id = _rows_id_at(db, index)
+            if row_id is None:
+                return False
+            _rows_table().delete().eq('id', row_id).execute()
+            _rows_sync_count(db)
+            _index_on_delete(db_name, index)
+            return True
+        
         data = db.get('data', [])
         if index < 0 or index >= len(data):
             return False
         
         data.pop(index)
         
-        client = _get_client()
-        client.table('bot_databases').update({
+        _update_database(db, {
             'data': data,
             'row_count': len(data)
-        }).eq('id', db['id']).execute()
+        })
         
+        _index_refresh(db_name, data)
         return True
     except DatabaseAccessError as e:
         print(str(e))
@@ -242,24 +655,59 @@ def delete_data(db_name: str, index: int) -> bool:
         print(f"Erro ao deletar dados: {e}")
         return False
 
+@_timed
 def find_data(db_name: str, key: str, value: Any) -> List[Dict]:
     """
     Busca itens que correspondem a um critério.
+    O(1) quando existe índice para a chave (veja create_index).
     """
+    index = _get_index(db_name, key)
+    if index is not None:
+        _index_validate(db_name)
+        with _state_lock:
+            data = _index_data[db_name]
+            return [data[position] for position in index.lookup(value)]
+    if _use_rows():
+        db = get_database(db_name)
+        if db is None:
+            return []
+        try:
+            return [row['data'] for row in _rows_matching(db, key, value)]
+        except Exception as e:
+            print(f"Erro ao buscar dados: {e}")
+            return []
     data = get_all_data(db_name)
     return [item for item in data if item.get(key) == value]
 
+@_timed
 def find_index(db_name: str, key: str, value: Any) -> int:
     """
     Encontra o índice do primeiro item que corresponde ao critério.
     Retorna -1 se não encontrado.
     """
+    if _get_index(db_name, key) is not None:
+        _index_validate(db_name)
+        return _local_position(db_name, key, value)
+    if _use_rows():
+        db = get_database(db_name)
+        if db is None:
+            return -1
+        try:
+            row_id = _rows_first_id(db, key, value)
+            if row_id is None:
+                return -1
+            response = _rows_table().select('id', count='exact').eq('database_id', db['id']).lt('id', row_id).limit(1).execute()
+            return response.count or 0
+        except Exception as e:
+            print(f"Erro ao buscar índice: {e}")
+            return -1
     data = get_all_data(db_name)
     for i, item in enumerate(data):
         if item.get(key) == value:
             return i
     return -1
 
+@_timed
 def clear_database(db_name: str) -> bool:
     """
     Limpa todos os dados de um banco de dados.
@@ -271,12 +719,15 @@ def clear_database(db_name: str) -> bool:
         if db is None:
             return False
         
-        client = _get_client()
-        client.table('bot_databases').update({
+        if _use_rows():
+            _rows_table().delete().eq('database_id', db['id']).execute()
+        
+        _update_database(db, {
             'data': [],
             'row_count': 0
-        }).eq('id', db['id']).execute()
+        })
         
+        _index_refresh(db_name, [])
         return True
     except DatabaseAccessError as e:
         print(str(e))
@@ -285,29 +736,71 @@ def clear_database(db_name: str) -> bool:
         print(f"Erro ao limpar banco de dados: {e}")
         return False
 
+@_timed
 def count_data(db_name: str) -> int:
     """
     Conta quantos registros existem no banco de dados.
     """
+    if _use_rows():
+        db = get_database(db_name)
+        return db.get('row_count', 0) if db else 0
     data = get_all_data(db_name)
     return len(data)
 
+@_timed
 def exists(db_name: str, key: str, value: Any) -> bool:
     """
     Verifica se existe um item com a chave/valor especificados.
     """
-    return len(find_data(db_name, key, value)) > 0
+    return find_index(db_name, key, value) >= 0
 
+def _rows_apply_by_key(db_name: str, key: str, value: Any, new_item: Optional[Dict]) -> bool:
+    """
+    Armazenamento por linha: atualiza (new_item) ou deleta (None) o primeiro
+    item com a chave/valor, direto pelo id da linha.
+    """
+    try:
+        _check_plan_access("atualizar dados" if new_item is not None else "deletar dados")
+        
+        db = get_database(db_name)
+        if db is None:
+            return False
+        
+        row_id = _rows_first_id(db, key, value)
+        if row_id is None:
+            return False
+        
+        position = _local_position(db_name, key, value)
+        if new_item is None:
+            _rows_table().delete().eq('id', row_id).execute()
+            _rows_sync_count(db)
+            _index_on_delete(db_name, position)
+        else:
+            _rows_table().update({'data': new_item}).eq('id', row_id).execute()
+            _rows_touch(db)
+            _index_on_update(db_name, position, new_item)
+        return True
+    except DatabaseAccessError as e:
+        print(str(e))
+        return False
+    except Exception as e:
+        print(f"Erro ao alterar dados: {e}")
+        return False
+
+@_timed
 def delete_by_key(db_name: str, key: str, value: Any) -> bool:
     """
     Deleta o primeiro item que corresponde à chave/valor.
     Retorna True se deletou, False se não encontrou.
     """
+    if _use_rows():
+        return _rows_apply_by_key(db_name, key, value, None)
     idx = find_index(db_name, key, value)
     if idx >= 0:
         return delete_data(db_name, idx)
     return False
 
+@_timed
 def delete_all_by_key(db_name: str, key: str, value: Any) -> int:
     """
     Deleta TODOS os itens que correspondem à chave/valor.
@@ -320,17 +813,29 @@ def delete_all_by_key(db_name: str, key: str, value: Any) -> int:
         if db is None:
             return 0
         
+        if _use_rows():
+            row_ids = [row['id'] for row in _rows_matching(db, key, value)]
+            deleted_count = 0
+            for start in range(0, len(row_ids), _MIGRATION_CHUNK):
+                response = _rows_table().delete().in_('id', row_ids[start:start + _MIGRATION_CHUNK]).execute()
+                deleted_count += len(response.data or [])
+            if deleted_count > 0:
+                _rows_sync_count(db)
+                if db_name in _index_data:
+                    _index_refresh(db_name, [item for item in _index_data[db_name] if item.get(key) != value])
+            return deleted_count
+        
         data = db.get('data', [])
         original_count = len(data)
         new_data = [item for item in data if item.get(key) != value]
         deleted_count = original_count - len(new_data)
         
         if deleted_count > 0:
-            client = _get_client()
-            client.table('bot_databases').update({
+            _update_database(db, {
                 'data': new_data,
                 'row_count': len(new_data)
-            }).eq('id', db['id']).execute()
+            })
+            _index_refresh(db_name, new_data)
         
         return deleted_count
     except DatabaseAccessError as e:
@@ -340,25 +845,34 @@ def delete_all_by_key(db_name: str, key: str, value: Any) -> int:
         print(f"Erro ao deletar dados: {e}")
         return 0
 
+@_timed
 def update_by_key(db_name: str, key: str, value: Any, new_item: Dict) -> bool:
     """
     Atualiza o primeiro item que corresponde à chave/valor.
     """
+    if _use_rows():
+        return _rows_apply_by_key(db_name, key, value, new_item)
     idx = find_index(db_name, key, value)
     if idx >= 0:
         return update_data(db_name, idx, new_item)
     return False
 
+@_timed
 def upsert_data(db_name: str, key: str, value: Any, item: Dict) -> bool:
     """
     Atualiza se existir, insere se não existir (upsert).
     """
+    if _use_rows():
+        if _get_index(db_name, key) is not None and find_index(db_name, key, value) < 0:
+            return add_data(db_name, item)
+        return _rows_apply_by_key(db_name, key, value, item) or add_data(db_name, item)
     idx = find_index(db_name, key, value)
     if idx >= 0:
         return update_data(db_name, idx, item)
     else:
         return add_data(db_name, item)
 
+@_timed
 def list_databases() -> List[str]:
     """
     Lista todos os bancos de dados do bot.
@@ -376,6 +890,7 @@ def list_databases() -> List[str]:
         print(f"Erro ao listar bancos de dados: {e}")
         return []
 
+@_timed
 def delete_database(db_name: str) -> bool:
     """
     Deleta completamente um banco de dados.
@@ -387,9 +902,14 @@ def delete_database(db_name: str) -> bool:
         if db is None:
             return False
         
+        if _use_rows():
+            _rows_table().delete().eq('database_id', db['id']).execute()
+        
         client = _get_client()
         client.table('bot_databases').delete().eq('id', db['id']).execute()
+        _snapshot_drop(db_name)
         
+        _index_refresh(db_name, None)
         return True
     except DatabaseAccessError as e:
         print(str(e))
@@ -398,6 +918,7 @@ def delete_database(db_name: str) -> bool:
         print(f"Erro ao deletar banco de dados: {e}")
         return False
 
+@_timed
 def get_plan_info() -> Dict:
     """
     Retorna informações sobre o plano atual e seus limites.
@@ -409,6 +930,101 @@ def get_plan_info() -> Dict:
         'max_rows': limits['max_rows'] if limits['max_rows'] > 0 else 'ilimitado'
     }
 
+@_timed
+def create_index(db_name: str, key: str) -> bool:
+    """
+    Cria um índice hash em memória para `key`. A partir daí find_data,
+    find_index, exists, update_by_key, delete_by_key e upsert_data
+    resolvem a chave em O(1), sem baixar o banco para procurar.
+    O índice é mantido em dia pelas alterações feitas por este processo.
+    """
+    if _get_index(db_name, key) is not None:
+        return True
+    db, data = None, None
+    if db_name not in _indexes:
+        db = get_database(db_name)
+        if db is None:
+            return False
+        data = get_all_data(db_name)
+    with _state_lock:
+        if db_name not in _indexes:
+            _indexes[db_name] = {}
+            _index_data[db_name] = data
+            _index_set_version(db_name, db.get('updated_at') if db else None)
+        index = _HashIndex(key)
+        index.build(_index_data[db_name])
+        _indexes[db_name][key] = index
+    return True
+
+@_timed
+@_synchronized
+def drop_index(db_name: str, key: str) -> bool:
+    """
+    Remove o índice de `key`. Retorna False se ele não existia.
+    """
+    if _get_index(db_name, key) is None:
+        return False
+    del _indexes[db_name][key]
+    if not _indexes[db_name]:
+        _index_refresh(db_name, None)
+    return True
+
+@_timed
+def migrate_to_rows(db_name: str) -> int:
+    """
+    Copia os itens de um banco no formato antigo (array em bot_databases.data)
+    para bot_database_rows, um registro por linha, e esvazia o array.
+    Uma migração interrompida é retomada do primeiro item que ainda não virou linha.
+    Retorna quantos itens foram migrados nesta chamada (0 se já estava migrado).
+    """
+    try:
+        _check_plan_access("migrar banco de dados")
+        
+        db = get_database(db_name)
+        if db is None:
+            return 0
+        
+        data = db.get('data') or []
+        if not data:
+            return 0
+        
+        # Os blocos são inseridos em ordem, cada um de uma vez: se uma migração
+        # anterior foi interrompida, as linhas existentes são o começo do array
+        migrated = _rows_count(db)
+        if migrated:
+            last = _rows_table().select('data').eq('database_id', db['id']).order('id', desc=True).limit(1).execute()
+            if migrated > len(data) or not last.data or last.data[0]['data'] != data[migrated - 1]:
+                print(f"⚠️ As linhas de {db_name} em {_ROWS_TABLE} não correspondem ao array; migração ignorada.")
+                return 0
+            print(f"↪️ Retomando a migração de {db_name} a partir do item {migrated}.")
+        
+        for start in range(migrated, len(data), _MIGRATION_CHUNK):
+            chunk = data[start:start + _MIGRATION_CHUNK]
+            _rows_table().insert([
+                {'database_id': db['id'], 'bot_id': _bot_id, 'data': item} for item in chunk
+            ]).execute()
+        
+        _update_database(db, {
+            'data': [],
+            'row_count': len(data)
+        })
+        
+        return len(data) - migrated
+    except DatabaseAccessError as e:
+        print(str(e))
+        return 0
+    except Exception as e:
+        print(f"Erro ao migrar banco de dados: {e}")
+        return 0
+
+@_timed
+def migrate_all_to_rows() -> Dict[str, int]:
+    """
+    Migra todos os bancos do bot para o armazenamento por linha.
+    Retorna {nome_do_banco: itens_migrados}.
+    """
+    return {name: migrate_to_rows(name) for name in list_databases()}
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 📚 DOCUMENTAÇÃO COMPLETA
@@ -442,6 +1058,47 @@ def get_plan_info() -> Dict:
 #   - delete_database(db_name)          → Deleta banco completo
 #   - get_plan_info()                   → Info do plano atual
 #
+# 🗃️ CACHE LOCAL:
+#   get_database guarda cada banco em memória e só o baixa de novo quando
+#   updated_at muda no servidor (conferido no máximo a cada
+#   DATABASE_CACHE_TRUST_SECONDS). Limites: DATABASE_CACHE_MAX_ENTRIES bancos
+#   e DATABASE_CACHE_MAX_BYTES no total; os bancos menos usados saem primeiro.
+#   Toda escrita deste módulo grava bot_databases.updated_at (no modo por
+#   linha também, mesmo quando só a linha muda); quem escreve em bot_databases
+#   por fora precisa fazer o mesmo.
+#
+# ⚡ ÍNDICES:
+#   - create_index(db_name, key)        → Índice hash em memória para a chave
+#   - drop_index(db_name, key)          → Remove o índice
+#
+#   Antes de cada consulta pelo índice, só updated_at é conferido no servidor
+#   (no máximo a cada DATABASE_CACHE_TRUST_SECONDS); o banco é baixado de novo
+#   apenas se mudou, mesmo quando é grande demais para o cache local.
+#
+# 🧱 ARMAZENAMENTO POR LINHA (DATABASE_STORAGE=rows):
+#   - migrate_to_rows(db_name)          → Converte um banco do formato array
+#   - migrate_all_to_rows()             → Converte todos os bancos do bot
+#
+#   Cada item vira uma linha em bot_database_rows, então inserir, atualizar
+#   ou deletar um item não reenvia mais o banco inteiro. Tabela esperada:
+#
+#     create table bot_database_rows (
+#       id bigserial primary key,
+#       database_id uuid not null references bot_databases(id) on delete cascade,
+#       bot_id uuid not null,
+#       data jsonb not null,
+#       created_at timestamptz not null default now()
+#     );
+#     create index on bot_database_rows (database_id, id);
+#     create index on bot_database_rows using gin (data jsonb_path_ops);
+#
+#   Migração: rode migrate_all_to_rows() uma vez e depois inicie o bot
+#   com DATABASE_STORAGE=rows.
+#
+# ⏱️ VERSÃO ASSÍNCRONA:
+#   Dentro das cogs use database_async: mesmas funções, com await, sem
+#   bloquear o event loop do discord.py (ex.: await database_async.exists(...)).
+#
 # ═══════════════════════════════════════════════════════════════════════════════
 # 💡 EXEMPLOS DE USO
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -463,7 +1120,8 @@ def get_plan_info() -> Dict:
 #     'banned_at': '2024-01-15'
 # })
 #
-# # Verificar se usuário está banido
+# # Verificar se usuário está banido (create_index torna a busca O(1))
+# create_index('banned_users', 'user_id')
 # if exists('banned_users', 'user_id', '123456789'):
 #     print("Usuário está banido!")
 #
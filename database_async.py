@@ -0,0 +1,614 @@
+"""
+Versão assíncrona do módulo database.py, para usar dentro das cogs.
+
+Cada função tem o mesmo nome e os mesmos parâmetros da versão síncrona, mas
+deve ser aguardada com `await`. As consultas usam o cliente assíncrono do
+Supabase (AsyncClient), então o event loop do discord.py continua livre para
+heartbeats e outros comandos enquanto a requisição está em andamento. Só o
+que continua síncrono roda num pool de threads (DATABASE_ASYNC_WORKERS,
+padrão 4): a leitura do plano, uma vez por processo, e as migrações para o
+armazenamento por linha. Escritas no mesmo banco são serializadas para não
+se sobrescreverem; bancos diferentes seguem em paralelo.
+
+O estado local (snapshots, índices, plano) é o mesmo do database.py: as duas
+versões podem ser usadas no mesmo processo.
+
+    from database_async import add_data, exists
+
+    if await exists('banned_users', 'user_id', str(member.id)):
+        ...
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Optional, List, Dict
+
+import database
+from database import DatabaseAccessError, _ROWS_TABLE, _MIGRATION_CHUNK
+from utils.locks import KeyedLock
+from utils.metrics import CACHE_REQUESTS, DATABASE_CALL_SECONDS, timed
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('DATABASE_ASYNC_WORKERS', '4')),
+    thread_name_prefix='database'
+)
+_write_locks = KeyedLock()
+_client: Optional['AsyncClient'] = None
+_client_lock = asyncio.Lock()
+
+_timed = timed(DATABASE_CALL_SECONDS)
+
+async def _run(func, *args) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args))
+
+def _import_client():
+    from supabase import acreate_client
+    return acreate_client
+
+async def _get_client() -> 'AsyncClient':
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                if not database._supabase_url or not database._supabase_key:
+                    raise Exception("SUPABASE_URL e SUPABASE_KEY não configurados")
+                # Import pesado (~0,5s): só no primeiro acesso, e fora do event loop
+                acreate_client = await _run(_import_client)
+                _client = await acreate_client(database._supabase_url, database._supabase_key)
+    return _client
+
+async def _table(name: str):
+    return (await _get_client()).table(name)
+
+async def _check_plan_access(operation: str = "usar banco de dados") -> dict:
+    # O plano fica em cache no database.py; só a primeira leitura vai ao pool de threads
+    if database._user_plan is None:
+        plan_name, limits = await _run(database._get_user_plan)
+    else:
+        plan_name, limits = database._get_user_plan()
+    return database._plan_access(plan_name, limits, operation)
+
+# 🧱 LINHAS E VERSÕES (mesma lógica dos helpers de database.py)
+
+async def _rows_matching(db: Dict, key: str, value: Any, limit: Optional[int] = None) -> List[Dict]:
+    query = (await _table(_ROWS_TABLE)).select('id', 'data').eq('database_id', db['id']).contains('data', {key: value}).order('id')
+    if limit is not None and not isinstance(value, (dict, list)):
+        query = query.limit(limit)
+    rows = [row for row in ((await query.execute()).data or []) if row['data'].get(key) == value]
+    return rows[:limit] if limit is not None else rows
+
+async def _rows_first_id(db: Dict, key: str, value: Any) -> Optional[int]:
+    rows = await _rows_matching(db, key, value, limit=1)
+    return rows[0]['id'] if rows else None
+
+async def _rows_id_at(db: Dict, index: int) -> Optional[int]:
+    if index < 0:
+        return None
+    response = await (await _table(_ROWS_TABLE)).select('id').eq('database_id', db['id']).order('id').range(index, index).execute()
+    return response.data[0]['id'] if response.data else None
+
+async def _rows_all_data(db: Dict) -> List[Dict]:
+    response = await (await _table(_ROWS_TABLE)).select('data').eq('database_id', db['id']).order('id').execute()
+    return [row['data'] for row in (response.data or [])]
+
+async def _rows_count(db: Dict) -> int:
+    response = await (await _table(_ROWS_TABLE)).select('id', count='exact').eq('database_id', db['id']).limit(1).execute()
+    return response.count or 0
+
+async def _rows_sync_count(db: Dict) -> int:
+    row_count = await _rows_count(db)
+    await _update_database(db, {'row_count': row_count})
+    return row_count
+
+async def _update_database(db: Dict, fields: Dict):
+    fields = database._versioned(fields)
+    response = await (await _table('bot_databases')).update(fields).eq('id', db['id']).execute()
+    database._after_update(db, fields, response.data)
+    return response
+
+async def _select_updated_at(name: str) -> Optional[Dict]:
+    query = (await _table('bot_databases')).select('updated_at').eq('bot_id', database._bot_id).eq('name', name)
+    return (await query.single().execute()).data
+
+async def _snapshot_get(name: str) -> Optional[Dict]:
+    entry, expired = database._snapshot_entry(name)
+    if entry is not None and expired:
+        entry = database._snapshot_confirm(name, entry, await _select_updated_at(name))
+    return database._snapshot_copy(entry['db']) if entry is not None else None
+
+async def _index_reload(db: Dict):
+    if db['name'] in database._indexes:
+        data = await _rows_all_data(db) if database._use_rows() else list(db.get('data') or [])
+        database._index_replace(db, data)
+
+async def _index_validate(db_name: str):
+    fresh, version = database._index_fresh(db_name)
+    if fresh:
+        return
+    if version is not None:
+        try:
+            if database._index_confirm(version, await _select_updated_at(db_name)):
+                return
+        except Exception:
+            pass
+    db = await get_database(db_name)
+    if database._index_stale(db_name, db):
+        await _index_reload(db)
+
+async def _write(db_name: str, func, *args) -> Any:
+    # Leitura-modificação-escrita do mesmo banco nunca roda duas vezes ao mesmo tempo
+    async with _write_locks.acquire(db_name):
+        return await func(*args)
+
+# 📊 CRUD BÁSICO
+
+@_timed
+async def add_data(db_name: str, item: Dict) -> bool:
+    return await _write(db_name, _add_data, db_name, item)
+
+async def _add_data(db_name: str, item: Dict) -> bool:
+    try:
+        limits = await _check_plan_access("adicionar dados")
+
+        db = await _get_or_create_database(db_name)
+        if db is None:
+            return False
+
+        data = db.get('data', [])
+        row_count = db.get('row_count', 0)
+        max_rows = limits['max_rows']
+
+        if max_rows > 0 and row_count >= max_rows:
+            print(f"❌ Limite de {max_rows} registros atingido para plano atual. Faça upgrade para mais espaço.")
+            return False
+
+        if database._use_rows():
+            await (await _table(_ROWS_TABLE)).insert({'database_id': db['id'], 'bot_id': database._bot_id, 'data': item}).execute()
+            await _rows_sync_count(db)
+            database._index_on_add(db_name, item)
+            return True
+
+        data.append(item)
+        await _update_database(db, {'data': data, 'row_count': len(data)})
+        database._index_refresh(db_name, data)
+        return True
+    except DatabaseAccessError as e:
+        print(str(e))
+        return False
+    except Exception as e:
+        print(f"Erro ao adicionar dados: {e}")
+        return False
+
+@_timed
+async def get_all_data(db_name: str) -> List[Dict]:
+    db = await get_database(db_name)
+    if db and database._use_rows():
+        try:
+            return await _rows_all_data(db)
+        except Exception as e:
+            print(f"Erro ao obter dados: {e}")
+            return []
+    if db and db.get('data'):
+        return db['data']
+    return []
+
+@_timed
+async def update_data(db_name: str, index: int, item: Dict) -> bool:
+    return await _write(db_name, _update_data, db_name, index, item)
+
+async def _update_data(db_name: str, index: int, item: Dict) -> bool:
+    try:
+        await _check_plan_access("atualizar dados")
+
+        db = await get_database(db_name)
+        if db is None:
+            return False
+
+        if database._use_rows():
+            row_id = await _rows_id_at(db, index)
+            if row_id is None:
+                return False
+            await (await _table(_ROWS_TABLE)).update({'data': item}).eq('id', row_id).execute()
+            await _update_database(db, {})
+            database._index_on_update(db_name, index, item)
+            return True
+
+        data = db.get('data', [])
+        if index < 0 or index >= len(data):
+            return False
+
+        data[index] = item
+        await _update_database(db, {'data': data})
+        database._index_refresh(db_name, data)
+        return True
+    except DatabaseAccessError as e:
+        print(str(e))
+        return False
+    except Exception as e:
+        print(f"Erro ao atualizar dados: {e}")
+        return False
+
+@_timed
+async def delete_data(db_name: str, index: int) -> bool:
+    return await _write(db_name, _delete_data, db_name, index)
+
+async def _delete_data(db_name: str, index: int) -> bool:
+    try:
+        await _check_plan_access("deletar dados")
+
+        db = await get_database(db_name)
+        if db is None:
+            return False
+
+        if database._use_rows():
+            row_id = await _rows_id_at(db, index)
+            if row_id is None:
+                return False
+            await (await _table(_ROWS_TABLE)).delete().eq('id', row_id).execute()
+            await _rows_sync_count(db)
+            database._index_on_delete(db_name, index)
+            return True
+
+        data = db.get('data', [])
+        if index < 0 or index >= len(data):
+            return False
+
+        data.pop(index)
+        await _update_database(db, {'data': data, 'row_count': len(data)})
+        database._index_refresh(db_name, data)
+        return True
+    except DatabaseAccessError as e:
+        print(str(e))
+        return False
+    except Exception as e:
+        print(f"Erro ao deletar dados: {e}")
+        return False
+
+@_timed
+async def clear_database(db_name: str) -> bool:
+    return await _write(db_name, _clear_database, db_name)
+
+async def _clear_database(db_name: str) -> bool:
+    try:
+        await _check_plan_access("limpar banco de dados")
+
+        db = await get_database(db_name)
+        if db is None:
+            return False
+
+        if database._use_rows():
+            await (await _table(_ROWS_TABLE)).delete().eq('database_id', db['id']).execute()
+
+        await _update_database(db, {'data': [], 'row_count': 0})
+        database._index_refresh(db_name, [])
+        return True
+    except DatabaseAccessError as e:
+        print(str(e))
+        return False
+    except Exception as e:
+        print(f"Erro ao limpar banco de dados: {e}")
+        return False
+
+# 🔍 BUSCA
+
+@_timed
+async def find_data(db_name: str, key: str, value: Any) -> List[Dict]:
+    index = database._get_index(db_name, key)
+    if index is not None:
+        await _index_validate(db_name)
+        with database._state_lock:
+            data = database._index_data[db_name]
+            return [data[position] for position in index.lookup(value)]
+    if database._use_rows():
+        db = await get_database(db_name)
+        if db is None:
+            return []
+        try:
+            return [row['data'] for row in await _rows_matching(db, key, value)]
+        except Exception as e:
+            print(f"Erro ao buscar dados: {e}")
+            return []
+    data = await get_all_data(db_name)
+    return [item for item in data if item.get(key) == value]
+
+@_timed
+async def find_index(db_name: str, key: str, value: Any) -> int:
+    if database._get_index(db_name, key) is not None:
+        await _index_validate(db_name)
+        return database._local_position(db_name, key, value)
+    if database._use_rows():
+        db = await get_database(db_name)
+        if db is None:
+            return -1
+        try:
+            row_id = await _rows_first_id(db, key, value)
+            if row_id is None:
+                return -1
+            query = (await _table(_ROWS_TABLE)).select('id', count='exact').eq('database_id', db['id']).lt('id', row_id).limit(1)
+            return (await query.execute()).count or 0
+        except Exception as e:
+            print(f"Erro ao buscar índice: {e}")
+            return -1
+    data = await get_all_data(db_name)
+    for i, item in enumerate(data):
+        if item.get(key) == value:
+            return i
+    return -1
+
+@_timed
+async def exists(db_name: str, key: str, value: Any) -> bool:
+    return await find_index(db_name, key, value) >= 0
+
+@_timed
+async def count_data(db_name: str) -> int:
+    if database._use_rows():
+        db = await get_database(db_name)
+        return db.get('row_count', 0) if db else 0
+    return len(await get_all_data(db_name))
+
+# ✏️ OPERAÇÕES AVANÇADAS
+
+async def _rows_apply_by_key(db_name: str, key: str, value: Any, new_item: Optional[Dict]) -> bool:
+    try:
+        await _check_plan_access("atualizar dados" if new_item is not None else "deletar dados")
+
+        db = await get_database(db_name)
+        if db is None:
+            return False
+
+        row_id = await _rows_first_id(db, key, value)
+        if row_id is None:
+            return False
+
+        position = database._local_position(db_name, key, value)
+        if new_item is None:
+            await (await _table(_ROWS_TABLE)).delete().eq('id', row_id).execute()
+            await _rows_sync_count(db)
+            database._index_on_delete(db_name, position)
+        else:
+            await (await _table(_ROWS_TABLE)).update({'data': new_item}).eq('id', row_id).execute()
+            await _update_database(db, {})
+            database._index_on_update(db_name, position, new_item)
+        return True
+    except DatabaseAccessError as e:
+        print(str(e))
+        return False
+    except Exception as e:
+        print(f"Erro ao alterar dados: {e}")
+        return False
+
+@_timed
+async def delete_by_key(db_name: str, key: str, value: Any) -> bool:
+    return await _write(db_name, _delete_by_key, db_name, key, value)
+
+async def _delete_by_key(db_name: str, key: str, value: Any) -> bool:
+    if database._use_rows():
+        return await _rows_apply_by_key(db_name, key, value, None)
+    idx = await find_index(db_name, key, value)
+    if idx >= 0:
+        return await _delete_data(db_name, idx)
+    return False
+
+@_timed
+async def delete_all_by_key(db_name: str, key: str, value: Any) -> int:
+    return await _write(db_name, _delete_all_by_key, db_name, key, value)
+
+async def _delete_all_by_key(db_name: str, key: str, value: Any) -> int:
+    try:
+        await _check_plan_access("deletar dados")
+
+        db = await get_database(db_name)
+        if db is None:
+            return 0
+
+        if database._use_rows():
+            row_ids = [row['id'] for row in await _rows_matching(db, key, value)]
+            deleted_count = 0
+            for start in range(0, len(row_ids), _MIGRATION_CHUNK):
+                response = await (await _table(_ROWS_TABLE)).delete().in_('id', row_ids[start:start + _MIGRATION_CHUNK]).execute()
+                deleted_count += len(response.data or [])
+            if deleted_count > 0:
+                await _rows_sync_count(db)
+                with database._state_lock:
+                    if db_name in database._index_data:
+                        database._index_refresh(db_name, [item for item in database._index_data[db_name] if item.get(key) != value])
+            return deleted_count
+
+        data = db.get('data', [])
+        new_data = [item for item in data if item.get(key) != value]
+        deleted_count = len(data) - len(new_data)
+
+        if deleted_count > 0:
+            await _update_database(db, {'data': new_data, 'row_count': len(new_data)})
+            database._index_refresh(db_name, new_data)
+
+        return deleted_count
+    except DatabaseAccessError as e:
+        print(str(e))
+        return 0
+    except Exception as e:
+        print(f"Erro ao deletar dados: {e}")
+        return 0
+
+@_timed
+async def update_by_key(db_name: str, key: str, value: Any, new_item: Dict) -> bool:
+    return await _write(db_name, _update_by_key, db_name, key, value, new_item)
+
+async def _update_by_key(db_name: str, key: str, value: Any, new_item: Dict) -> bool:
+    if database._use_rows():
+        return await _rows_apply_by_key(db_name, key, value, new_item)
+    idx = await find_index(db_name, key, value)
+    if idx >= 0:
+        return await _update_data(db_name, idx, new_item)
+    return False
+
+@_timed
+async def upsert_data(db_name: str, key: str, value: Any, item: Dict) -> bool:
+    return await _write(db_name, _upsert_data, db_name, key, value, item)
+
+async def _upsert_data(db_name: str, key: str, value: Any, item: Dict) -> bool:
+    if database._use_rows():
+        if database._get_index(db_name, key) is not None and await find_index(db_name, key, value) < 0:
+            return await _add_data(db_name, item)
+        return await _rows_apply_by_key(db_name, key, value, item) or await _add_data(db_name, item)
+    idx = await find_index(db_name, key, value)
+    if idx >= 0:
+        return await _update_data(db_name, idx, item)
+    return await _add_data(db_name, item)
+
+# ⚡ ÍNDICES
+
+@_timed
+async def create_index(db_name: str, key: str) -> bool:
+    if database._get_index(db_name, key) is not None:
+        return True
+    db, data = None, None
+    if db_name not in database._indexes:
+        db = await get_database(db_name)
+        if db is None:
+            return False
+        data = await get_all_data(db_name)
+    with database._state_lock:
+        if db_name not in database._indexes:
+            database._indexes[db_name] = {}
+            database._index_data[db_name] = data
+            database._index_set_version(db_name, db.get('updated_at') if db else None)
+        index = database._HashIndex(key)
+        index.build(database._index_data[db_name])
+        database._indexes[db_name][key] = index
+    return True
+
+async def drop_index(db_name: str, key: str) -> bool:
+    # Só estado local: nada a esperar
+    return database.drop_index(db_name, key)
+
+# 🗂️ GERENCIAMENTO
+
+@_timed
+async def get_database(name: str) -> Optional[Dict]:
+    try:
+        await _check_plan_access("visualizar banco de dados")
+        try:
+            cached = await _snapshot_get(name)
+        except Exception:
+            cached = None
+        CACHE_REQUESTS.inc(cache="database_snapshot", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+        query = (await _table('bot_databases')).select('*').eq('bot_id', database._bot_id).eq('name', name)
+        response = await query.single().execute()
+        database._snapshot_store(response.data)
+        # O banco mudou fora deste processo: reconstrói os índices com os dados novos
+        if response.data:
+            await _index_reload(response.data)
+        return response.data
+    except DatabaseAccessError as e:
+        print(str(e))
+        return None
+    except Exception as e:
+        print(f"Erro ao obter banco de dados: {e}")
+        return None
+
+@_timed
+async def create_database(name: str) -> Optional[Dict]:
+    return await _write(name, _create_database, name)
+
+async def _create_database(name: str) -> Optional[Dict]:
+    try:
+        limits = await _check_plan_access("criar banco de dados")
+        max_rows = limits['max_rows'] if limits['max_rows'] > 0 else 999999
+
+        response = await (await _table('bot_databases')).insert({
+            'bot_id': database._bot_id,
+            'name': name,
+            'data': [],
+            'max_rows': max_rows,
+            'row_count': 0
+        }).execute()
+        if response.data:
+            database._snapshot_store(response.data[0])
+        return response.data[0] if response.data else None
+    except DatabaseAccessError as e:
+        print(str(e))
+        return None
+    except Exception as e:
+        print(f"Erro ao criar banco de dados: {e}")
+        return None
+
+@_timed
+async def get_or_create_database(name: str) -> Optional[Dict]:
+    return await _write(name, _get_or_create_database, name)
+
+async def _get_or_create_database(name: str) -> Optional[Dict]:
+    # Chamado também por add_data, que já está com a trava do banco
+    db = await get_database(name)
+    if db is None:
+        db = await _create_database(name)
+    return db
+
+@_timed
+async def list_databases() -> List[str]:
+    try:
+        await _check_plan_access("listar bancos de dados")
+        response = await (await _table('bot_databases')).select('name').eq('bot_id', database._bot_id).execute()
+        return [db['name'] for db in (response.data or [])]
+    except DatabaseAccessError as e:
+        print(str(e))
+        return []
+    except Exception as e:
+        print(f"Erro ao listar bancos de dados: {e}")
+        return []
+
+@_timed
+async def delete_database(db_name: str) -> bool:
+    return await _write(db_name, _delete_database, db_name)
+
+async def _delete_database(db_name: str) -> bool:
+    try:
+        await _check_plan_access("deletar banco de dados")
+
+        db = await get_database(db_name)
+        if db is None:
+            return False
+
+        if database._use_rows():
+            await (await _table(_ROWS_TABLE)).delete().eq('database_id', db['id']).execute()
+
+        await (await _table('bot_databases')).delete().eq('id', db['id']).execute()
+        database._snapshot_drop(db_name)
+        database._index_refresh(db_name, None)
+        return True
+    except DatabaseAccessError as e:
+        print(str(e))
+        return False
+    except Exception as e:
+        print(f"Erro ao deletar banco de dados: {e}")
+        return False
+
+async def get_plan_info() -> Dict:
+    if database._user_plan is None:
+        return await _run(database.get_plan_info)
+    return database.get_plan_info()
+
+# 🧱 ARMAZENAMENTO POR LINHA (operação única de manutenção: fica no pool de threads)
+
+async def migrate_to_rows(db_name: str) -> int:
+    async with _write_locks.acquire(db_name):
+        return await _run(database.migrate_to_rows, db_name)
+
+async def migrate_all_to_rows() -> Dict[str, int]:
+    return await _run(database.migrate_all_to_rows)
+
+async def close():
+    """Fecha o cliente assíncrono e espera o pool de threads (chamar no desligamento do bot)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.postgrest.aclose()
+    await asyncio.to_thread(_executor.shutdown)
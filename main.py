@@ -1,11 +1,33 @@
+from utils.startup import extensions, timer # Primeiro: marca o início da inicialização
+import asyncio
 import discord
 import logging
+import math
 import os
+import sys
+import time
 from discord.ext import commands
+from utils.http import pool
+from utils.cooldowns import cooldowns
+from utils.database import db
+from utils.metrics import COMMAND_ERRORS, COMMAND_SECONDS, registry, server as metrics_server
+from utils.resilience import CircuitOpenError
+from utils.journal import journal
+from utils.interactions import BotContext
+from utils.command_sync import syncer
+from utils.cache_policy import cache_report, format_report, policy as cache_policy, register_metrics as register_cache_metrics
 
 """Bot Discord - Criado com Verl.ia"""
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
+# Sharding opcional: SHARD_COUNT (ou BOT_SHARDED=1, com a contagem recomendada pelo Discord)
+# liga o AutoShardedBot; SHARD_IDS e CLUSTER_ID são definidos pelo cluster.py
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT') or 0) or None
+SHARD_IDS = [int(shard) for shard in os.environ.get('SHARD_IDS', '').split(',') if shard.strip()] or None
+CLUSTER_ID = os.environ.get('CLUSTER_ID')
+SHARDED = bool(SHARD_COUNT or SHARD_IDS or os.environ.get('BOT_SHARDED'))
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s | ' + (f'cluster {CLUSTER_ID} | ' if CLUSTER_ID else '') + '%(levelname)s | %(message)s')
 log = logging.getLogger('bot')
 
 intents = discord.Intents.default()
@@ -13,51 +35,139 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
-class Bot(commands.Bot):
+def observe_command(ctx, status: str):
+    """Registra a duração do comando iniciado em on_command"""
+    started = getattr(ctx, 'metrics_started', None)
+    if started is not None and ctx.command is not None:
+        COMMAND_SECONDS.observe(time.perf_counter() - started, command=ctx.command.qualified_name, status=status)
+
+def _latency(value: float):
+    return None if math.isnan(value) or math.isinf(value) else value
+
+class Bot(commands.AutoShardedBot if SHARDED else commands.Bot):
     """Classe Bot."""
     def __init__(self):
-        super().__init__(command_prefix='!', intents=intents, help_command=None)
+        options = {'shard_count': SHARD_COUNT, 'shard_ids': SHARD_IDS} if SHARDED else {}
+        # Cache de membros, chunking e mensagens conforme MEMORY_BUDGET_MB
+        options.update(cache_policy.client_options(intents))
+        super().__init__(command_prefix='!', intents=intents, help_command=None, **options)
+        log.info(cache_policy.describe())
+        register_cache_metrics(self)
+        registry.gauge('discord_gateway_latency_seconds', 'Latência do heartbeat do gateway', lambda: _latency(self.latency))
+        registry.gauge('discord_guilds', 'Servidores em que o bot está', lambda: len(self.guilds))
+        registry.gauge('bot_startup_seconds', 'Duração de cada fase da inicialização',
+                       lambda: {(phase,): seconds for phase, seconds in timer.phases.items()}, labels=('phase',))
+        if SHARDED:
+            registry.gauge('discord_shard_latency_seconds', 'Latência do heartbeat por shard',
+                           lambda: {(str(shard_id),): shard.latency for shard_id, shard in self.shards.items()
+                                   if _latency(shard.latency) is not None},
+                           labels=('shard',))
+    
+    async def get_context(self, origin, *, cls=BotContext):
+        # BotContext serializa as respostas com o defer automático (utils.interactions)
+        return await super().get_context(origin, cls=cls)
     
     async def setup_hook(self):
-        # Carregando as cogs
-        cogs = ['commands.economy', 'commands.moderation', 'commands.utility'] # Adicionado 'commands.economy'
-        for cog in cogs:
-            try:
-                await self.load_extension(cog)
-                log.info(f'✅ {cog} carregado')
-            except Exception as e:
-                log.error(f'❌ Erro em {cog}: {e}')
+        timer.mark("login")
+        # Pool HTTP compartilhado pelos clientes de banco de dados
+        await pool.start()
+        # Cooldowns persistentes (sobrevivem a reinícios)
+        with timer.phase("cooldowns"):
+            cooldowns.start()
+        # Endpoint Prometheus local (METRICS_PORT)
+        with timer.phase("métricas"):
+            await metrics_server.start()
+        # Journal de auditoria: reenvia o que ficou pendente e inicia o flusher
+        with timer.phase("journal"):
+            journal.start()
+
+        # Cogs do commands/manifest.json (as preguiçosas só no primeiro uso)
+        with timer.phase("extensões"):
+            await extensions.load(self)
+        
+        # Uma vez por processo (não a cada reconexão) e só se a árvore de comandos mudou.
+        # Os comandos são globais: com vários clusters, só o cluster 0 sincroniza
+        if CLUSTER_ID in (None, '0'):
+            with timer.phase("sync"):
+                await syncer.sync(self.tree, self.application_id)
+    
+    async def close(self):
+        await super().close()
+        cooldowns.stop()
+        await journal.stop()
+        await db.close()
+        # database_async só é carregado se alguma cog o usa; fecha o cliente e espera o pool de threads
+        database_async = sys.modules.get('database_async')
+        if database_async is not None:
+            await database_async.close()
+        await pool.close()
+        await metrics_server.stop()
+    
+    async def on_command(self, ctx):
+        ctx.metrics_started = time.perf_counter()
+    
+    async def on_command_completion(self, ctx):
+        observe_command(ctx, "ok")
+    
+    async def on_app_command_completion(self, interaction, command):
+        # Comandos híbridos já são medidos por on_command/on_command_completion
+        if getattr(command, 'wrapped', None) is not None:
+            return
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        COMMAND_SECONDS.observe(elapsed, command=command.qualified_name, status="ok")
+    
+    async def on_shard_ready(self, shard_id):
+        log.info(f'🧩 Shard {shard_id} pronto')
+    
+    async def on_shard_disconnect(self, shard_id):
+        log.warning(f'🧩 Shard {shard_id} desconectado')
     
     async def on_ready(self):
         log.info(f'🤖 {self.user} online!')
-        try:
-            await self.tree.sync()
-            log.info('✅ Slash commands sincronizados')
-        except Exception as e:
-            log.error(f'❌ Erro sync: {e}')
+        if not timer.reported:
+            timer.mark("gateway")
+            timer.reported = True
+            log.info(timer.report())
+            log.info(f'🧠 Caches: {format_report(cache_report(self))}')
 
 bot = Bot()
 
 @bot.event
 async def on_command_error(ctx, error):
+    # Comando de uma extensão preguiçosa: carrega e executa de novo
+    if isinstance(error, commands.CommandNotFound) and await extensions.load_lazy(bot, ctx.invoked_with):
+        await bot.process_commands(ctx.message)
+        return
+    observe_command(ctx, "error")
+    COMMAND_ERRORS.inc(command=ctx.command.qualified_name if ctx.command else "", error=type(error).__name__)
+    # Erro levantado dentro do comando (CommandInvokeError / HybridCommandError)
+    original = error
+    while getattr(original, 'original', None) is not None:
+        original = original.original
+    # Erros só interessam a quem usou o comando: via slash, respostas efêmeras
     if isinstance(error, commands.MissingPermissions):
-        await ctx.send('❌ Você não tem permissão para usar este comando!')
+        await ctx.send('❌ Você não tem permissão para usar este comando!', ephemeral=True)
     elif isinstance(error, commands.MissingRequiredArgument):
-        await ctx.send(f'❌ Ops! Você esqueceu de algo. Faltou o argumento: `{error.param.name}`')
+        await ctx.send(f'❌ Ops! Você esqueceu de algo. Faltou o argumento: `{error.param.name}`', ephemeral=True)
     elif isinstance(error, commands.CommandOnCooldown):
         seconds = int(error.retry_after)
         minutes, seconds = divmod(seconds, 60)
         hours, minutes = divmod(minutes, 60)
-        await ctx.send(f"⏳ Este comando está em cooldown para você! Tente novamente em {'%dh %dm %ds' % (hours, minutes, seconds)}.")
+        await ctx.send(f"⏳ Este comando está em cooldown para você! Tente novamente em {'%dh %dm %ds' % (hours, minutes, seconds)}.", ephemeral=True)
     elif isinstance(error, commands.MemberNotFound):
-        await ctx.send("❌ Não consegui encontrar esse membro no servidor.")
+        await ctx.send("❌ Não consegui encontrar esse membro no servidor.", ephemeral=True)
+    elif isinstance(original, CircuitOpenError):
+        await ctx.send("⚠️ O banco de dados está instável no momento. Tente novamente em instantes.", ephemeral=True)
     else:
         log.error(f"❌ Erro global de comando em {ctx.command}: {error}")
-        await ctx.send(f"❌ Ocorreu um erro inesperado: {error}") # Mensagem genérica para outros erros
+        await ctx.send(f"❌ Ocorreu um erro inesperado: {error}", ephemeral=True) # Mensagem genérica para outros erros
 
 if __name__ == '__main__':
     token = os.environ.get('BOT_TOKEN')
     if not token:
         log.error('❌ BOT_TOKEN não configurado! Certifique-se de definir a variável de ambiente.')
     else:
+        timer.mark("imports")
+        # Lê o manifesto antes do login
+        extensions.prepare()
         bot.run(token)
\ No newline at end of file
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import cluster
+from cluster import Cluster, adopt_orphaned_journals, cluster_env, shard_ranges
+
+"""Launcher de clusters: faixas de shards, ambiente, journals órfãos e reinício"""
+
+def test_shard_ranges_cover_every_shard_once():
+    assert shard_ranges(10, 3) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert shard_ranges(2, 4) == [[0], [1]]
+
+def test_cluster_env_separates_local_files_and_metrics_port(monkeypatch):
+    monkeypatch.setenv('AUDIT_JOURNAL_PATH', 'data/audit.jsonl')
+    monkeypatch.setenv('COOLDOWN_STORE_PATH', 'data/cooldowns.json')
+    monkeypatch.setenv('METRICS_PORT', '9091')
+    env = cluster_env(2, [4, 5], 8)
+    assert (env['CLUSTER_ID'], env['SHARD_IDS'], env['SHARD_COUNT']) == ('2', '4,5', '8')
+    assert env['AUDIT_JOURNAL_PATH'] == 'data/audit.2.jsonl'
+    assert env['COOLDOWN_STORE_PATH'] == 'data/cooldowns.2.json'
+    assert env['METRICS_PORT'] == '9093'
+
+    monkeypatch.setenv('METRICS_PORT', '0')
+    assert cluster_env(2, [4, 5], 8)['METRICS_PORT'] == '0'
+
+def entry(audit_id: str) -> str:
+    return json.dumps({"audit_id": audit_id}) + "\n"
+
+def test_orphaned_journals_move_to_the_target_cluster(tmp_path, monkeypatch):
+    monkeypatch.setenv('AUDIT_JOURNAL_PATH', str(tmp_path / 'audit.jsonl'))
+    (tmp_path / 'audit.jsonl').write_text(entry("base"))
+    (tmp_path / 'audit.0.jsonl').write_text(entry("c0"))
+    (tmp_path / 'audit.1.jsonl').write_text(entry("c1"))
+    # Cluster que deixou de existir; a última linha foi cortada por uma queda
+    (tmp_path / 'audit.3.jsonl').write_text(entry("c3") + '{"audit_id": "cort')
+    (tmp_path / 'outro.3.jsonl').write_text(entry("x"))
+
+    moved = adopt_orphaned_journals([0, 1], 0)
+
+    assert moved == 3
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['audit.0.jsonl', 'audit.1.jsonl', 'outro.3.jsonl']
+    lines = (tmp_path / 'audit.0.jsonl').read_text().splitlines()
+    assert lines[:3] == [entry("c0").strip(), entry("base").strip(), entry("c3").strip()]
+    assert lines[3] == '{"audit_id": "cort'
+    assert (tmp_path / 'audit.1.jsonl').read_text() == entry("c1")
+
+def test_nothing_to_adopt_without_the_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv('AUDIT_JOURNAL_PATH', str(tmp_path / 'nada' / 'audit.jsonl'))
+    assert adopt_orphaned_journals([0], 0) == 0
+
+class FakeProcess:
+    pid = 1
+
+    def __init__(self, code: int):
+        self.code = code
+        self.returncode = None
+
+    async def wait(self) -> int:
+        self.returncode = self.code
+        return self.code
+
+def test_cluster_restarts_after_a_crash_and_stops_on_a_clean_exit(monkeypatch):
+    codes = [1, 1, 0]
+    started = []
+
+    async def create_subprocess_exec(*args, env=None):
+        started.append(env['CLUSTER_ID'])
+        return FakeProcess(codes.pop(0))
+
+    delays = []
+
+    async def wait_for(awaitable, timeout):
+        delays.append(timeout)
+        awaitable.close()
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(cluster.asyncio, 'create_subprocess_exec', create_subprocess_exec)
+    monkeypatch.setattr(cluster.asyncio, 'wait_for', wait_for)
+
+    worker = Cluster(1, [2, 3], 4)
+    asyncio.run(worker.run(asyncio.Event()))
+
+    assert started == ['1', '1', '1']
+    assert worker.restarts == 2
+    # Backoff exponencial entre as tentativas
+    assert delays == [1.0, 2.0]
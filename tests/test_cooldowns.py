@@ -0,0 +1,86 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from discord.ext import commands
+from utils.cooldowns import CooldownStore
+
+"""CooldownStore: consulta local, persistência em arquivo e reconstrução a partir de last_*"""
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+def store(tmp_path) -> CooldownStore:
+    cooldowns = CooldownStore(path=str(tmp_path / "cooldowns.json"))
+    cooldowns.register("daily", 100)
+    return cooldowns
+
+def test_trigger_blocks_until_the_cooldown_ends(tmp_path, clock):
+    cooldowns = store(tmp_path)
+    cooldowns.trigger("daily", 1, 2)
+    clock[0] += 40
+    assert cooldowns.retry_after("daily", 1, 2) == 60
+    assert cooldowns.retry_after("daily", 1, 3) == 0
+    with pytest.raises(commands.CommandOnCooldown):
+        cooldowns.check("daily", 1, 2)
+    clock[0] += 60
+    cooldowns.check("daily", 1, 2)
+    assert len(cooldowns) == 0
+
+def test_renewed_cooldown_survives_its_old_heap_entry(tmp_path, clock):
+    cooldowns = store(tmp_path)
+    cooldowns.trigger("daily", 1, 2)
+    clock[0] += 50
+    cooldowns.trigger("daily", 1, 2)
+    clock[0] += 60
+    assert cooldowns.retry_after("daily", 1, 2) == 40
+
+def test_reset_clears_the_cooldown(tmp_path, clock):
+    cooldowns = store(tmp_path)
+    cooldowns.trigger("daily", 1, 2)
+    cooldowns.reset("daily", 1, 2)
+    assert cooldowns.retry_after("daily", 1, 2) == 0
+
+def test_save_and_load_keep_only_active_cooldowns(tmp_path, clock):
+    cooldowns = store(tmp_path)
+    cooldowns.register("work", 10)
+    cooldowns.trigger("daily", 1, 2)
+    cooldowns.trigger("work", 1, 2)
+    cooldowns.save()
+    assert set(json.loads((tmp_path / "cooldowns.json").read_text())) == {"daily:1:2", "work:1:2"}
+    assert not (tmp_path / "cooldowns.json.tmp").exists()
+
+    clock[0] += 30
+    restored = store(tmp_path)
+    restored.load()
+    assert restored.retry_after("daily", 1, 2) == 70
+    assert restored.retry_after("work", 1, 2) == 0
+    assert len(restored) == 1
+
+def test_load_ignores_a_corrupt_file(tmp_path, clock):
+    (tmp_path / "cooldowns.json").write_text("{pela metade")
+    cooldowns = store(tmp_path)
+    cooldowns.load()
+    assert len(cooldowns) == 0
+
+def test_hydrate_rebuilds_the_cooldown_from_last_used(tmp_path, clock):
+    cooldowns = store(tmp_path)
+    last_daily = datetime.fromtimestamp(clock[0] - 30, timezone.utc).replace(tzinfo=None).isoformat()
+    cooldowns.hydrate("daily", 1, 2, last_daily)
+    assert cooldowns.retry_after("daily", 1, 2) == pytest.approx(70)
+
+    expired = (datetime.fromtimestamp(clock[0], timezone.utc) - timedelta(seconds=500)).isoformat()
+    cooldowns.hydrate("daily", 1, 3, expired)
+    cooldowns.hydrate("daily", 1, 4, None)
+    assert cooldowns.retry_after("daily", 1, 3) == 0
+    assert cooldowns.retry_after("daily", 1, 4) == 0
+
+def test_hydrate_never_shortens_an_active_cooldown(tmp_path, clock):
+    cooldowns = store(tmp_path)
+    cooldowns.trigger("daily", 1, 2)
+    older = datetime.fromtimestamp(clock[0] - 50, timezone.utc).isoformat()
+    cooldowns.hydrate("daily", 1, 2, older)
+    assert cooldowns.retry_after("daily", 1, 2) == 100
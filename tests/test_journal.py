@@ -0,0 +1,69 @@
+import asyncio
+import json
+from aiohttp import web
+from tools.webhook_server import WebhookServer
+from utils.http import pool
+from utils.journal import AuditJournal
+from utils.manager import db
+
+"""AuditJournal: reenvio após uma queda sem gravar duplicatas no banco"""
+
+class LostResponseServer(WebhookServer):
+    """Grava o primeiro lote, mas responde 500 como se a resposta tivesse se perdido."""
+
+    lost = False
+
+    def execute(self, payload):
+        result = super().execute(payload)
+        if payload["action"] == "batch" and not self.lost:
+            self.lost = True
+            raise web.HTTPInternalServerError(text="conexão encerrada")
+        return result
+
+def run(server: WebhookServer, journal: AuditJournal, scenario, monkeypatch):
+    async def main():
+        monkeypatch.setattr(db, "webhook_url", await server.start())
+        monkeypatch.setattr(db, "bot_id", "1")
+        journal.start()
+        try:
+            return await scenario()
+        finally:
+            await journal.stop()
+            await pool.close()
+            await server.stop()
+    return asyncio.run(main())
+
+def audit_ids(server: WebhookServer) -> list:
+    return sorted(row["audit_id"] for row in server.tables.get("mod_logs", []))
+
+def test_replayed_records_already_in_the_database_are_not_sent_again(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    entries = [{"database": "mod_logs", "data": {"audit_id": audit_id, "action": "ban"}, "queued_at": "2024-01-01T00:00:00"}
+               for audit_id in ("a", "b")]
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+    server = WebhookServer()
+    # O processo caiu depois de enviar "a" e antes de compactar o journal
+    server.tables["mod_logs"] = [{"id": 1, **entries[0]["data"]}]
+    journal = AuditJournal(path=str(path), flush_interval=3600)
+
+    async def scenario():
+        return await journal.flush()
+
+    assert run(server, journal, scenario, monkeypatch)
+    assert audit_ids(server) == ["a", "b"]
+    assert path.read_text() == ""
+
+def test_a_lost_response_does_not_duplicate_the_records(tmp_path, monkeypatch):
+    server = LostResponseServer()
+    journal = AuditJournal(path=str(tmp_path / "audit.jsonl"), flush_interval=3600)
+
+    async def scenario():
+        rows = await journal.append_many("mod_logs", [{"action": "ban"}, {"action": "kick"}])
+        assert not await journal.flush()
+        assert len(journal) == 2
+        assert await journal.flush()
+        return rows
+
+    rows = run(server, journal, scenario, monkeypatch)
+    assert audit_ids(server) == sorted(row["audit_id"] for row in rows)
+    assert len(journal) == 0
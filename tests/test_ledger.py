@@ -0,0 +1,166 @@
+import asyncio
+import aiohttp
+import pytest
+from aiohttp import web
+from tools.webhook_server import WebhookServer
+from utils.cache import EconomyCache
+from utils.database import db
+from utils.http import pool
+from utils.ledger import Ledger
+
+"""Ledger da economia: flush do cache, compactação e leitura do saldo"""
+
+DEFAULTS = {"wallet": 0, "bank": 0}
+
+class LostResponseServer(WebhookServer):
+    """Grava o primeiro batch, mas responde 500 como se a resposta tivesse se perdido."""
+
+    lost = False
+
+    def execute(self, payload):
+        result = super().execute(payload)
+        if payload["action"] == "batch" and not self.lost:
+            self.lost = True
+            raise web.HTTPInternalServerError(text="conexão encerrada")
+        return result
+
+class PartialBatchServer(WebhookServer):
+    """Aceita o primeiro batch, mas os inserts do usuário 2 falham."""
+
+    failed = False
+
+    def execute(self, payload):
+        if payload["action"] == "batch" and not self.failed:
+            self.failed = True
+            return {"success": True, "results": [
+                {"success": False, "error": "timeout"} if (operation.get("data") or {}).get("user_id") == "2"
+                else self.execute(operation) for operation in payload["operations"]]}
+        return super().execute(payload)
+
+class MarkFailServer(WebhookServer):
+    """Grava os snapshots, mas a primeira marcação de lançamentos como compactados falha."""
+
+    failed = False
+
+    def execute(self, payload):
+        operations = payload.get("operations") or [payload]
+        if not self.failed and operations[0]["database"] == "economy_ledger" and operations[0]["action"] == "update":
+            self.failed = True
+            raise web.HTTPInternalServerError(text="conexão encerrada")
+        return super().execute(payload)
+
+def run(server: WebhookServer, scenario, monkeypatch):
+    async def main():
+        monkeypatch.setattr(db, "url", await server.start())
+        try:
+            return await scenario()
+        finally:
+            await pool.close()
+            await server.stop()
+    return asyncio.run(main())
+
+def ledger_rows(server: WebhookServer) -> list:
+    return server.tables.get("economy_ledger", [])
+
+async def balance(ledger: Ledger, user_id) -> tuple:
+    account = await ledger.load(1, user_id, DEFAULTS)
+    return account["wallet"], account["bank"]
+
+def test_flush_compact_and_load_keep_the_balance(monkeypatch):
+    server = WebhookServer()
+    ledger = Ledger(compact_grace=0)
+    cache = EconomyCache(ledger=ledger)
+
+    async def scenario():
+        cache.add(1, 1, {"wallet": 100}, kind="daily")
+        cache.add(1, 1, {"wallet": -30, "bank": 30}, kind="deposit")
+        cache.add(1, 2, {"wallet": 50}, kind="work")
+        await cache.flush()
+        before = await balance(ledger, 1)
+        folded = await ledger.compact()
+        after = await balance(ledger, 1), await balance(ledger, 2)
+        return before, folded, after, await ledger.compact()
+
+    before, folded, after, again = run(server, scenario, monkeypatch)
+    assert before == (70, 30)
+    assert folded == 3
+    assert after == ((70, 30), (50, 0))
+    assert again == 0
+    assert all(row["compacted"] for row in ledger_rows(server))
+
+def test_an_entry_inserted_out_of_order_is_still_folded(monkeypatch):
+    server = WebhookServer()
+    ledger = Ledger(compact_grace=0.05)
+    entries = [{**Ledger.entry(1, 1, "work", {"wallet": wallet}), "id": id} for id, wallet in ((1, 10), (2, 20), (3, 30))]
+
+    async def scenario():
+        await db.insert_many("economy_ledger", [entries[0], entries[2]])
+        # Ainda dentro do prazo: os ids vistos agora não são dobrados
+        first = await ledger.compact()
+        # O insert do id 2 termina depois de o id 3 já estar visível
+        await db.insert("economy_ledger", entries[1])
+        await asyncio.sleep(0.06)
+        second = await ledger.compact()
+        return first, second, await balance(ledger, 1)
+
+    first, second, account = run(server, scenario, monkeypatch)
+    assert (first, second) == (0, 3)
+    assert account == (60, 0)
+    assert server.tables["economy"][0]["ledger_seq"] == 3
+
+def test_a_compaction_stopped_before_marking_does_not_fold_twice(monkeypatch):
+    server = MarkFailServer()
+    ledger = Ledger(compact_grace=0)
+    cache = EconomyCache(ledger=ledger)
+
+    async def scenario():
+        cache.add(1, 1, {"wallet": 40}, kind="work")
+        cache.add(1, 1, {"wallet": 2}, kind="work")
+        await cache.flush()
+        with pytest.raises(aiohttp.ClientResponseError):
+            await ledger.compact()
+        # Snapshot já gravado com ledger_seq; o lançamento ainda não compactado fica de fora
+        stopped = await balance(ledger, 1)
+        return stopped, await ledger.compact(), await balance(ledger, 1)
+
+    stopped, marked, account = run(server, scenario, monkeypatch)
+    assert stopped == account == (42, 0)
+    assert marked == 2
+    assert all(row["compacted"] for row in ledger_rows(server))
+
+def test_a_retried_flush_does_not_duplicate_entries(monkeypatch):
+    server = LostResponseServer()
+    ledger = Ledger(compact_grace=0)
+    cache = EconomyCache(ledger=ledger)
+
+    async def scenario():
+        cache.add(1, 1, {"wallet": 100}, kind="daily")
+        cache.add(1, 1, {"wallet": 25}, kind="work")
+        await cache.flush()
+        assert len(ledger_rows(server)) == 2
+        await cache.flush()
+        await ledger.compact()
+        return await balance(ledger, 1)
+
+    assert run(server, scenario, monkeypatch) == (125, 0)
+    assert len(ledger_rows(server)) == 2
+    assert not cache._unconfirmed
+
+def test_failed_operations_of_an_accepted_batch_are_requeued(monkeypatch):
+    server = PartialBatchServer()
+    ledger = Ledger(compact_grace=0)
+    cache = EconomyCache(ledger=ledger)
+
+    async def scenario():
+        cache.add(1, 1, {"wallet": 10}, kind="work")
+        cache.add(1, 2, {"wallet": 20}, kind="work")
+        await cache.flush()
+        assert [row["user_id"] for row in ledger_rows(server)] == ["1"]
+        assert ("1", "2") in cache._entries_pending
+        await cache.flush()
+        await ledger.compact()
+        return await balance(ledger, 1), await balance(ledger, 2)
+
+    assert run(server, scenario, monkeypatch) == ((10, 0), (20, 0))
+    assert sorted(row["user_id"] for row in ledger_rows(server)) == ["1", "2"]
+    assert not cache._unconfirmed
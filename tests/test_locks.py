@@ -0,0 +1,46 @@
+import asyncio
+import gc
+from utils.locks import KeyedLock
+
+"""KeyedLock: exclusão por chave, várias chaves sem deadlock e limpeza dos locks"""
+
+def test_same_key_is_serialized_and_other_keys_are_not():
+    locks = KeyedLock()
+    events = []
+
+    async def worker(key, name):
+        async with locks.acquire(key):
+            events.append(f"{name}+")
+            await asyncio.sleep(0.01)
+            events.append(f"{name}-")
+
+    async def main():
+        await asyncio.gather(worker("a", 1), worker("a", 2), worker("b", 3))
+
+    asyncio.run(main())
+    assert events.index("1-") < events.index("2+")
+    assert events.index("3+") < events.index("1-")
+
+def test_opposite_key_orders_do_not_deadlock():
+    locks = KeyedLock()
+
+    async def transfer(*keys):
+        async with locks.acquire(*keys):
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.wait_for(asyncio.gather(*(transfer("a", "b") if i % 2 else transfer("b", "a", "b") for i in range(10))),
+                               timeout=1)
+
+    asyncio.run(main())
+
+def test_unused_locks_are_dropped():
+    locks = KeyedLock()
+
+    async def main():
+        async with locks.acquire(("1", "2"), ("1", "3")):
+            assert len(locks) == 2
+
+    asyncio.run(main())
+    gc.collect()
+    assert len(locks) == 0
@@ -0,0 +1,92 @@
+import asyncio
+import time
+import aiohttp
+import pytest
+from utils.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RetryPolicy
+
+"""RetryPolicy e CircuitBreaker: novas tentativas, prazos e a chamada de teste do meio-aberto"""
+
+def response_error(status: int) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(None, (), status=status, message="erro")
+
+def policy(**options) -> RetryPolicy:
+    return RetryPolicy(**{"attempts": 3, "timeout": 1, "deadline": 2, "base_delay": 0.001, "max_delay": 0.001, **options})
+
+def half_open_breaker(name: str) -> CircuitBreaker:
+    breaker = CircuitBreaker(name, failure_threshold=1, reset_timeout=0.001)
+    breaker.failure()
+    assert breaker.state == OPEN
+    time.sleep(0.002)
+    return breaker
+
+def failing(error: BaseException, calls: list):
+    async def request():
+        calls.append(1)
+        raise error
+    return request
+
+def test_transient_errors_are_retried_for_idempotent_actions():
+    calls = []
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(policy().call(failing(response_error(503), calls), idempotent=True))
+    assert len(calls) == 3
+
+def test_non_idempotent_actions_are_not_retried_after_a_response():
+    calls = []
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(policy().call(failing(response_error(503), calls), idempotent=False))
+    assert len(calls) == 1
+
+def test_a_slow_attempt_times_out():
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(policy(attempts=1, timeout=0.01).call(slow, idempotent=True))
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("teste-abre", failure_threshold=2, reset_timeout=60)
+    calls = []
+    for _ in range(2):
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(policy(attempts=1).call(failing(response_error(500), calls), breaker))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy(attempts=1).call(failing(response_error(500), calls), breaker))
+    assert breaker.state == OPEN
+    assert len(calls) == 2
+
+def test_half_open_probe_is_released_by_an_unexpected_error():
+    breaker = half_open_breaker("teste-inesperado")
+    with pytest.raises(ValueError):
+        asyncio.run(policy().call(failing(ValueError("corpo não é JSON"), []), breaker, idempotent=True))
+    assert breaker.state == OPEN
+    assert not breaker._probing
+
+    time.sleep(0.002)
+
+    async def ok():
+        return "ok"
+
+    assert asyncio.run(policy().call(ok, breaker)) == "ok"
+    assert breaker.state == CLOSED
+
+def test_half_open_probe_is_released_when_cancelled():
+    breaker = half_open_breaker("teste-cancelado")
+
+    async def scenario():
+        task = asyncio.ensure_future(policy().call(lambda: asyncio.sleep(1), breaker))
+        await asyncio.sleep(0.01)
+        assert breaker.state == HALF_OPEN and breaker._probing
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert not breaker._probing
+    breaker.allow()
+
+def test_a_client_error_response_closes_the_breaker():
+    breaker = half_open_breaker("teste-409")
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(policy().call(failing(response_error(409), []), breaker))
+    assert breaker.state == CLOSED
@@ -0,0 +1,79 @@
+import asyncio
+from aiohttp import web
+from tools.webhook_server import WebhookServer
+from utils.database import VerliaDB
+from utils.http import pool
+
+"""Selects simultâneos compartilhados (single-flight) e get_or_create sem duplicatas"""
+
+class SlowSelectServer(WebhookServer):
+    """Só os selects demoram `latency`: uma escrita termina com o select anterior ainda em andamento."""
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.requests.append(payload)
+        if payload["action"] == "select":
+            await asyncio.sleep(self.latency)
+        return web.json_response(self.execute(payload))
+
+def run(scenario, latency: float = 0.1):
+    async def main():
+        server = SlowSelectServer(latency=latency)
+        client = VerliaDB()
+        client.url = await server.start()
+        try:
+            await client.insert("economy", {"guild_id": "1", "user_id": "1", "wallet": 10})
+            server.requests.clear()
+            return server, await scenario(client, server)
+        finally:
+            await pool.close()
+            await server.stop()
+    return asyncio.run(main())
+
+def selects(server: WebhookServer) -> int:
+    return sum(1 for request in server.requests if request["action"] == "select")
+
+def test_identical_concurrent_selects_share_one_request():
+    async def scenario(client, server):
+        return await asyncio.gather(*(client.find("economy", {"guild_id": "1"}) for _ in range(5)))
+
+    server, results = run(scenario)
+    assert selects(server) == 1
+    assert all(rows == results[0] for rows in results)
+    # Cada chamador recebe a própria cópia
+    results[0][0]["wallet"] = 0
+    assert results[1][0]["wallet"] == 10
+
+def test_a_write_keeps_later_reads_from_joining_an_older_select():
+    async def scenario(client, server):
+        before = asyncio.ensure_future(client.find("economy", {"guild_id": "1"}))
+        await asyncio.sleep(0.01)
+        await client.insert("economy", {"guild_id": "1", "user_id": "2", "wallet": 5})
+        after = await client.find("economy", {"guild_id": "1"})
+        await before
+        return after
+
+    server, after = run(scenario)
+    assert selects(server) == 2
+    assert sorted(row["user_id"] for row in after) == ["1", "2"]
+
+def test_writes_to_another_database_keep_the_select_shared():
+    async def scenario(client, server):
+        first = asyncio.ensure_future(client.find("economy", {"guild_id": "1"}))
+        await asyncio.sleep(0.01)
+        await client.insert("bans", {"guild_id": "1"})
+        await asyncio.gather(first, client.find("economy", {"guild_id": "1"}))
+
+    server, _ = run(scenario)
+    assert selects(server) == 1
+
+def test_get_or_create_inserts_a_new_row_once():
+    async def scenario(client, server):
+        filters = {"guild_id": "1", "user_id": "3"}
+        return await asyncio.gather(*(client.get_or_create("economy", filters, {"wallet": 0}) for _ in range(5)))
+
+    server, rows = run(scenario)
+    inserts = [request for request in server.requests if request["action"] == "insert"]
+    assert len(inserts) == 1
+    assert len({row["id"] for row in rows}) == 1
+    assert len([row for row in server.tables["economy"] if row["user_id"] == "3"]) == 1
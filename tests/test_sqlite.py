@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from utils.sqlite import SQLiteDB
+
+"""Backend SQLite: as ações do protocolo do bot-webhook num arquivo local"""
+
+def run(tmp_path, scenario):
+    async def main():
+        client = SQLiteDB(path=str(tmp_path / "verlia.db"))
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+def test_find_filters_orders_and_pages(tmp_path):
+    async def scenario(client):
+        for score, name in ((30, "a"), (10, None), (50, "c")):
+            await client.insert("scores", {"guild_id": "1", "score": score, "name": name})
+        await client.insert("scores", {"guild_id": "2", "score": 99})
+        return (await client.find("scores", {"guild_id": "1"}, limit=2, offset=1, order_by="-score", columns=["score"]),
+                await client.find("scores", {"name": None}, columns=["score"]),
+                await client.count("scores", {"guild_id": "1"}))
+
+    page, unnamed, count = run(tmp_path, scenario)
+    assert page == [{"score": 30}, {"score": 10}]
+    assert unnamed == [{"score": 10}, {"score": 99}]
+    assert count == 3
+
+def test_increment_creates_the_row_from_defaults(tmp_path):
+    async def scenario(client):
+        filters = {"guild_id": "1", "user_id": "2"}
+        created = await client.increment("stats", filters, {"wins": 1}, data={"last": "x"}, defaults={"wins": 0, "losses": 0})
+        updated = await client.increment("stats", filters, {"wins": 2, "losses": 1}, defaults={"wins": 0, "losses": 0})
+        return created, updated, await client.find("stats", filters)
+
+    created, updated, rows = run(tmp_path, scenario)
+    assert {key: created[key] for key in ("guild_id", "user_id", "wins", "losses", "last")} == \
+        {"guild_id": "1", "user_id": "2", "wins": 1, "losses": 0, "last": "x"}
+    assert (updated["wins"], updated["losses"]) == (3, 1)
+    assert len(rows) == 1
+
+def test_increment_without_defaults_leaves_a_missing_row_alone(tmp_path):
+    async def scenario(client):
+        return await client.increment("stats", {"user_id": "2"}, {"wins": 1}), await client.count("stats")
+
+    assert run(tmp_path, scenario) == (None, 0)
+
+def test_a_failing_operation_rolls_back_the_whole_batch(tmp_path):
+    async def scenario(client):
+        await client.insert("scores", {"guild_id": "1", "score": 1})
+        with pytest.raises(ValueError):
+            async with client.batch() as batch:
+                batch.insert("scores", {"guild_id": "1", "score": 2})
+                batch.update("scores", {"guild_id": "1"}, {"score": 3})
+                batch.operations.append(client._operation("explode", "scores"))
+        return await client.find("scores", {"guild_id": "1"}, columns=["score"])
+
+    assert run(tmp_path, scenario) == [{"score": 1}]
+
+def test_batch_returns_one_result_per_operation(tmp_path):
+    async def scenario(client):
+        async with client.batch() as batch:
+            batch.insert("scores", {"guild_id": "1", "score": 1})
+            batch.increment("scores", {"guild_id": "1"}, {"score": 4})
+            batch.delete("scores", {"guild_id": "2"})
+        return batch.results, await client.find("scores", {}, columns=["score"])
+
+    results, rows = run(tmp_path, scenario)
+    assert [result["success"] for result in results] == [True, True, True]
+    assert rows == [{"score": 5}]
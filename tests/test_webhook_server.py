@@ -0,0 +1,115 @@
+import asyncio
+import aiohttp
+import pytest
+from aiohttp import web
+from tools.webhook_server import WebhookServer
+from utils.database import VerliaDB
+from utils.http import pool
+
+"""Consultas do VerliaDB contra o bot-webhook local (tools.webhook_server)"""
+
+class LegacyWebhookServer(WebhookServer):
+    """Webhook antigo, que ainda não conhece as ações "count" e "increment"."""
+
+    def execute(self, payload):
+        if payload.get("action") in ("count", "increment"):
+            raise web.HTTPBadRequest(text=f"Ação desconhecida: {payload['action']}")
+        return super().execute(payload)
+
+class StrictWebhookServer(WebhookServer):
+    """Webhook que recusa com 400 filtros por colunas que não existem."""
+
+    def execute(self, payload):
+        if "invalid" in (payload.get("filters") or {}):
+            raise web.HTTPBadRequest(text="Coluna inexistente: invalid")
+        return super().execute(payload)
+
+def run(server: WebhookServer, scenario):
+    async def main():
+        client = VerliaDB()
+        client.url = await server.start()
+        try:
+            for score in (30, 10, 50, 20, 40):
+                await client.insert("scores", {"guild_id": "1", "score": score})
+            await client.insert("scores", {"guild_id": "2", "score": 99})
+            server.requests.clear()
+            return await scenario(client)
+        finally:
+            await pool.close()
+            await server.stop()
+    return asyncio.run(main())
+
+def test_find_pushes_limit_offset_and_order_to_the_server():
+    server = WebhookServer()
+
+    async def scenario(client):
+        return await client.find("scores", {"guild_id": "1"}, limit=2, offset=1, order_by="-score", columns=["score"])
+
+    rows = run(server, scenario)
+    assert rows == [{"score": 40}, {"score": 30}]
+    assert len(server.requests) == 1
+    request = server.requests[0]
+    assert request["action"] == "select"
+    assert (request["limit"], request["offset"], request["order_by"], request["columns"]) == (2, 1, "-score", ["score"])
+
+def test_find_omits_unused_options():
+    server = WebhookServer()
+
+    async def scenario(client):
+        return await client.find("scores", {"guild_id": "2"})
+
+    rows = run(server, scenario)
+    assert [row["score"] for row in rows] == [99]
+    assert not {"limit", "offset", "order_by", "columns"} & set(server.requests[0])
+
+def test_count_is_answered_by_the_server():
+    server = WebhookServer()
+
+    async def scenario(client):
+        return await client.count("scores", {"guild_id": "1"})
+
+    assert run(server, scenario) == 5
+    assert [request["action"] for request in server.requests] == ["count"]
+
+def test_count_falls_back_to_select_when_the_action_is_unknown():
+    server = LegacyWebhookServer()
+
+    async def scenario(client):
+        first = await client.count("scores", {"guild_id": "1"})
+        second = await client.count("scores", {"guild_id": "2"})
+        return first, second, client._unsupported
+
+    first, second, unsupported = run(server, scenario)
+    assert (first, second) == (5, 1)
+    assert "count" in unsupported
+    # A recusa é lembrada: a segunda contagem vai direto ao select só com a chave primária
+    assert [request["action"] for request in server.requests] == ["count", "select", "select"]
+    assert server.requests[-1]["columns"] == ["id"]
+
+def test_other_bad_requests_do_not_disable_the_action():
+    server = StrictWebhookServer()
+
+    async def scenario(client):
+        with pytest.raises(aiohttp.ClientResponseError) as error:
+            await client.count("scores", {"invalid": True})
+        return error.value, await client.count("scores", {"guild_id": "1"}), client._unsupported
+
+    error, count, unsupported = run(server, scenario)
+    assert error.status == 400
+    assert count == 5
+    assert "count" not in unsupported
+    assert [request["action"] for request in server.requests] == ["count", "count"]
+
+def test_a_rejected_operation_does_not_disable_batch():
+    server = LegacyWebhookServer()
+
+    async def scenario(client):
+        with pytest.raises(aiohttp.ClientResponseError):
+            async with client.batch() as batch:
+                batch.update("scores", {"guild_id": "1"}, {"seen": True})
+                batch.increment("scores", {"guild_id": "2"}, {"score": 1})
+        await client.update_many("scores", [({"guild_id": "1"}, {"seen": True}), ({"guild_id": "2"}, {"seen": True})])
+        return client._unsupported
+
+    assert "batch" not in run(server, scenario)
+    assert [request["action"] for request in server.requests] == ["batch", "batch"]
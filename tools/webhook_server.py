@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import itertools
+import random
+from typing import Dict, List
+from aiohttp import web
+
+"""Servidor local que imita o bot-webhook da Verl.ia (uso: python -m tools.webhook_server).
+
+Guarda as tabelas em memória e registra cada payload recebido em `requests`,
+para conferir o que o cliente envia. Aponte o bot para ele com
+VERLIA_DB_URL=http://127.0.0.1:8787. `latency`/`jitter` (segundos) atrasam cada
+resposta para simular a distância até o Supabase.
+"""
+
+class WebhookServer:
+    """Implementação em memória do protocolo do bot-webhook."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tables: Dict[str, List[Dict]] = {}
+        self.requests: List[Dict] = []
+        self._ids = itertools.count(1)
+        self.app = web.Application()
+        self.app.router.add_post('/database/{bot_id}', self.handle)
+        self._runner = None
+
+    @staticmethod
+    def _matches(row: Dict, filters: Dict) -> bool:
+        return all(row.get(key) == value for key, value in (filters or {}).items())
+
+    def _select(self, payload: Dict) -> List[Dict]:
+        rows = [row for row in self.tables.get(payload["database"], []) if self._matches(row, payload.get("filters"))]
+        order_by = payload.get("order_by")
+        if order_by:
+            field = order_by.lstrip("-")
+            rows.sort(key=lambda row: (row.get(field) is None, row.get(field)), reverse=order_by.startswith("-"))
+        offset = payload.get("offset") or 0
+        limit = payload.get("limit")
+        rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+        columns = payload.get("columns")
+        if columns:
+            rows = [{key: row.get(key) for key in columns} for row in rows]
+        return [dict(row) for row in rows]
+
+    def execute(self, payload: Dict) -> Dict:
+        """Executa uma ação do protocolo e retorna o corpo da resposta"""
+        action = payload.get("action")
+        if action == "batch":
+            return {"success": True, "results": [self.execute(operation) for operation in payload.get("operations", [])]}
+        table = self.tables.setdefault(payload["database"], [])
+        filters = payload.get("filters")
+        if action == "insert":
+            row = dict(payload.get("data") or {})
+            row.setdefault("id", next(self._ids))
+            table.append(row)
+            return {"success": True, "data": [dict(row)]}
+        if action == "select":
+            return {"success": True, "data": self._select(payload)}
+        if action == "count":
+            return {"success": True, "count": sum(1 for row in table if self._matches(row, filters))}
+        if action == "update":
+            updated = []
+            for row in table:
+                if self._matches(row, filters):
+                    row.update(payload.get("data") or {})
+                    updated.append(dict(row))
+            return {"success": True, "data": updated}
+        if action == "increment":
+            rows = [row for row in table if self._matches(row, filters)]
+            if not rows and payload.get("defaults") is not None:
+                row = {**payload["defaults"], **(filters or {}), "id": next(self._ids)}
+                table.append(row)
+                rows = [row]
+            for row in rows:
+                for field, delta in payload.get("deltas", {}).items():
+                    row[field] = (row.get(field) or 0) + delta
+                row.update(payload.get("data") or {})
+            return {"success": True, "data": dict(rows[0]) if rows else None}
+        if action == "delete":
+            kept = [row for row in table if not self._matches(row, filters)]
+            deleted = len(table) - len(kept)
+            table[:] = kept
+            return {"success": True, "deleted": deleted}
+        raise web.HTTPBadRequest(text=f"Ação desconhecida: {action}")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.requests.append(payload)
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        return web.json_response(self.execute(payload))
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Inicia o servidor e retorna a URL base (porta 0 = porta livre)"""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor local do bot-webhook")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0.0, help="Atraso fixo por requisição (ms)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Atraso aleatório extra por requisição (ms)")
+    args = parser.parse_args()
+    server = WebhookServer(latency=args.latency / 1000, jitter=args.jitter / 1000)
+    web.run_app(server.app, host=args.host, port=args.port)
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import discord
+from utils.interactions import settle
+
+"""Ações de moderação em massa: pool de workers com limite de concorrência por rota"""
+
+log = logging.getLogger('bot')
+
+# Quantas requisições de uma mesma rota ficam em voo ao mesmo tempo
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', '4'))
+# Tentativas por alvo quando o Discord devolve rate limit
+BULK_ATTEMPTS = int(os.environ.get('BULK_ATTEMPTS', '3'))
+# Intervalo mínimo entre edições da mensagem de progresso
+PROGRESS_INTERVAL = float(os.environ.get('BULK_PROGRESS_INTERVAL', '2'))
+
+class RouteLimiter:
+    """
+    Pausa compartilhada por rota (ex.: bans de uma guild). O discord.py já
+    espera os buckets sozinho, mas quando um 429 escapa (RateLimited ou
+    HTTPException 429) todos os workers da rota param pelo `retry_after`
+    em vez de cada um descobrir o limite por conta própria.
+    """
+
+    def __init__(self):
+        self._resume_at: Dict[Hashable, float] = {}
+
+    async def wait(self, route: Hashable):
+        delay = self._resume_at.get(route, 0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, route: Hashable, seconds: float):
+        resume_at = time.monotonic() + seconds
+        if resume_at > self._resume_at.get(route, 0):
+            self._resume_at[route] = resume_at
+            log.warning(f'⏳ Rate limit na rota {route}: pausando {seconds:.1f}s')
+
+limiter = RouteLimiter()
+
+def _retry_after(error: Exception) -> Optional[float]:
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        retry_after = getattr(error.response, 'headers', {}).get('Retry-After')
+        return float(retry_after) if retry_after else 1.0
+    return None
+
+async def run_bulk(targets: Sequence, action: Callable[..., Awaitable], route: Hashable,
+                   concurrency: int = None, on_progress: Callable[[int, int], Awaitable] = None
+                   ) -> Tuple[List, Dict]:
+    """
+    Executa `action(alvo)` para cada alvo com no máximo `concurrency` chamadas
+    simultâneas. Retorna (alvos concluídos, {alvo: erro}).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    done: List = []
+    failed: Dict = {}
+    attempts: Dict = {}
+
+    async def worker():
+        while True:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.wait(route)
+            try:
+                await action(target)
+            except (discord.HTTPException, discord.RateLimited) as e:
+                retry_after = _retry_after(e)
+                attempts[target] = attempts.get(target, 0) + 1
+                if retry_after is not None and attempts[target] < BULK_ATTEMPTS:
+                    limiter.pause(route, retry_after)
+                    queue.put_nowait(target)
+                    continue
+                failed[target] = e
+            except Exception as e:
+                failed[target] = e
+            else:
+                done.append(target)
+            if on_progress is not None:
+                await on_progress(len(done) + len(failed), len(targets))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency or BULK_CONCURRENCY, len(targets)))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    return done, failed
+
+class ProgressMessage:
+    """Uma única mensagem (a resposta original da interação) editada com o progresso"""
+
+    def __init__(self, interaction: discord.Interaction, interval: float = None):
+        self.interaction = interaction
+        self.interval = interval or PROGRESS_INTERVAL
+        self._last_edit = 0.0
+
+    async def update(self, content: str, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_edit < self.interval:
+            return
+        self._last_edit = now
+        try:
+            await self.interaction.edit_original_response(content=content)
+            settle(self.interaction)
+        except discord.HTTPException as e:
+            log.error(f'❌ Não foi possível atualizar o progresso da interação {self.interaction.id}: {e}')
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from utils.database import db
+from utils.ledger import Ledger
+from utils.metrics import CACHE_REQUESTS
+
+"""Cache write-back das contas de economia"""
+
+log = logging.getLogger('bot')
+
+Key = Tuple[str, str]
+
+class EconomyCache:
+    """
+    Cache LRU/TTL por (guild_id, user_id) que grava as alterações no banco em
+    lotes: movimentações de saldo viram lançamentos no ledger e os demais campos
+    (ex.: last_daily) são atualizados direto no snapshot.
+    """
+
+    def __init__(self, database: str = "economy", max_entries: int = None, ttl: float = None, flush_interval: float = None,
+                 on_change: Callable[[str, str, Dict], None] = None, ledger: Ledger = None):
+        self.database = database
+        self.ledger = ledger or Ledger(database)
+        # Chamado com (guild_id, user_id, conta) sempre que uma conta em cache muda
+        self.on_change = on_change
+        self.max_entries = max_entries or int(os.environ.get('ECONOMY_CACHE_MAX_ENTRIES', '5000'))
+        self.ttl = ttl or float(os.environ.get('ECONOMY_CACHE_TTL', '300'))
+        self.flush_interval = flush_interval or float(os.environ.get('ECONOMY_FLUSH_INTERVAL', '10'))
+        self._entries: "OrderedDict[Key, Tuple[float, Dict]]" = OrderedDict()
+        # Alterações ainda não gravadas: somas (deltas) e valores absolutos por conta.
+        # Contas com alterações pendentes ou em gravação não expiram nem são despejadas,
+        # para que uma releitura do banco nunca perca nem duplique um delta.
+        self._deltas: Dict[Key, Dict[str, int]] = {}
+        self._data: Dict[Key, Dict] = {}
+        # Lançamentos ainda não gravados no ledger (a soma deles é o que está em _deltas)
+        self._entries_pending: Dict[Key, List[Dict]] = {}
+        # entry_id de lançamentos de um flush que falhou: parte deles pode ter sido gravada
+        self._unconfirmed: Set[str] = set()
+        self._flushing: Set[Key] = set()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(guild_id, user_id) -> Key:
+        return str(guild_id), str(user_id)
+
+    def _pinned(self, key: Key) -> bool:
+        return key in self._deltas or key in self._data or key in self._flushing
+
+    def get(self, guild_id, user_id) -> Optional[Dict]:
+        """Retorna a conta em cache ou None se ausente/expirada"""
+        key = self._key(guild_id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            CACHE_REQUESTS.inc(cache=self.database, result="miss")
+            return None
+        loaded_at, row = entry
+        if time.monotonic() - loaded_at > self.ttl and not self._pinned(key):
+            del self._entries[key]
+            CACHE_REQUESTS.inc(cache=self.database, result="expired")
+            return None
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(cache=self.database, result="hit")
+        return row
+
+    def put(self, guild_id, user_id, row: Dict) -> Dict:
+        """Guarda uma conta lida do banco, aplicando alterações ainda pendentes"""
+        key = self._key(guild_id, user_id)
+        for field, delta in self._deltas.get(key, {}).items():
+            row[field] = (row.get(field) or 0) + delta
+        row.update(self._data.get(key, {}))
+        self._entries[key] = (time.monotonic(), row)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._evict()
+        if self.on_change is not None:
+            self.on_change(*key, row)
+        return row
+
+    def accounts(self, guild_id) -> Iterator[Tuple[str, Dict]]:
+        """Itera (user_id, conta) das contas em cache de uma guild"""
+        guild_id = str(guild_id)
+        for (guild, user_id), (_, row) in list(self._entries.items()):
+            if guild == guild_id:
+                yield user_id, row
+
+    def _evict(self):
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_entries:
+                break
+            if not self._pinned(key):
+                del self._entries[key]
+
+    def add(self, guild_id, user_id, deltas: Dict[str, int], data: Dict = None, kind: str = "adjust", counterparty_id=None):
+        """Soma deltas (e grava valores absolutos) localmente e agenda o lançamento no ledger"""
+        key = self._key(guild_id, user_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            row = entry[1]
+            for field, delta in deltas.items():
+                row[field] = (row.get(field) or 0) + delta
+            row.update(data or {})
+            if self.on_change is not None:
+                self.on_change(*key, row)
+        pending = self._deltas.setdefault(key, {})
+        for field, delta in deltas.items():
+            pending[field] = pending.get(field, 0) + delta
+        if data:
+            self._data.setdefault(key, {}).update(data)
+        if any(deltas.values()):
+            self._entries_pending.setdefault(key, []).append(self.ledger.entry(guild_id, user_id, kind, deltas, counterparty_id))
+
+    async def flush(self, *accounts: Tuple):
+        """Grava em um único lote as contas alteradas (todas, ou só os pares (guild_id, user_id) indicados)"""
+        async with self._flush_lock:
+            keys = [self._key(*account) for account in accounts] if accounts else list(set(self._deltas) | set(self._data))
+            pending = {key: (self._deltas.pop(key, {}), self._data.pop(key, {}), self._entries_pending.pop(key, []))
+                       for key in keys}
+            pending = {key: changes for key, changes in pending.items() if changes[1] or changes[2]}
+            if not pending:
+                return
+            self._flushing = set(pending)
+            # Conta e lançamento de cada operação do lote (None no update do snapshot)
+            operations: List[Tuple[Key, Optional[Dict]]] = []
+            try:
+                await self._drop_saved(pending)
+                # Só appends e updates: nenhuma leitura do saldo antes de gravar
+                async with db.batch() as batch:
+                    for key, (_, data, entries) in pending.items():
+                        for entry in entries:
+                            batch.insert(self.ledger.ledger_database, entry)
+                            operations.append((key, entry))
+                        if data:
+                            batch.update(self.database, {"guild_id": key[0], "user_id": key[1]}, data)
+                            operations.append((key, None))
+            except Exception as e:
+                log.error(f'❌ Erro ao gravar {len(pending)} contas em {self.database}: {e}')
+                for key, (_, data, entries) in pending.items():
+                    self._requeue(key, data, entries)
+            else:
+                # Batch aceito: só as operações que falharam (ou ficaram sem resultado) voltam para a fila
+                failed: Dict[Key, Tuple[Dict, List[Dict]]] = {}
+                saved = set()
+                for index, (key, entry) in enumerate(operations):
+                    result = batch.results[index] if index < len(batch.results) else None
+                    if result is not None and not result.get("error"):
+                        if entry is not None:
+                            saved.add(entry["entry_id"])
+                        continue
+                    data, entries = failed.setdefault(key, ({}, []))
+                    if entry is None:
+                        data.update(pending[key][1])
+                    else:
+                        entries.append(entry)
+                if failed:
+                    log.error(f'❌ {len(failed)} contas não foram gravadas em {self.database}; ficam para o próximo flush')
+                for key, (data, entries) in failed.items():
+                    self._requeue(key, data, entries)
+                self._unconfirmed -= saved
+            finally:
+                self._flushing = set()
+
+    def _requeue(self, key: Key, data: Dict, entries: List[Dict]):
+        """Devolve à fila o que não foi gravado, somando aos deltas e sem sobrescrever valores alterados durante o flush"""
+        self.ledger.apply(self._deltas.setdefault(key, {}), entries)
+        fields = self._data.setdefault(key, {})
+        for field, value in data.items():
+            fields.setdefault(field, value)
+        self._entries_pending[key] = entries + self._entries_pending.get(key, [])
+        # Parte deles pode ter sido gravada: o próximo flush confere antes de reenviar
+        self._unconfirmed.update(entry["entry_id"] for entry in entries)
+
+    async def _drop_saved(self, pending: Dict[Key, Tuple[Dict, Dict, List[Dict]]]):
+        """Tira do lote os lançamentos reenviados que o flush anterior chegou a gravar"""
+        unconfirmed = [entry for _, _, entries in pending.values() for entry in entries
+                       if entry["entry_id"] in self._unconfirmed]
+        if not unconfirmed:
+            return
+        found = await asyncio.gather(*(db.find_one(self.ledger.ledger_database, {"entry_id": entry["entry_id"]}, columns=["id"])
+                                       for entry in unconfirmed))
+        saved = {entry["entry_id"] for entry, row in zip(unconfirmed, found) if row is not None}
+        for _, _, entries in pending.values():
+            entries[:] = [entry for entry in entries if entry["entry_id"] not in saved]
+        self._unconfirmed -= saved
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f'❌ Erro no flush do cache de {self.database}: {e}')
+
+    def start(self):
+        """Inicia o flush periódico em segundo plano"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Para o flush periódico e grava o que estiver pendente"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
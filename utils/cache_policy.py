@@ -0,0 +1,212 @@
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import discord
+from utils.metrics import registry
+
+"""Política de cache do gateway derivada de um orçamento de memória (MEMORY_BUDGET_MB)"""
+
+log = logging.getLogger('bot')
+
+# Mesmo valor do memory_mb do fly.toml
+MEMORY_BUDGET_MB = int(os.environ.get('MEMORY_BUDGET_MB', '256'))
+# Por quanto tempo um cache_report serve às métricas (os gauges de um scrape leem o mesmo)
+CACHE_REPORT_TTL = float(os.environ.get('CACHE_REPORT_TTL', '5'))
+
+def _env_flag(name: str) -> Optional[bool]:
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes', 'sim')
+
+class CachePolicy:
+    """
+    Escolhe o cache de membros, o chunking e o cache de mensagens conforme o
+    orçamento:
+
+    - até 511 MB ("mínimo"): só membros que entram depois do login (o /purge-raid
+      precisa deles), sem voz, sem chunking e sem cache de mensagens;
+    - 512 a 1023 MB ("moderado"): cache de membros padrão dos intents, chunking
+      sob demanda e 500 mensagens;
+    - 1024 MB ou mais ("completo"): chunking de todas as guilds no login e 1000 mensagens.
+
+    CACHE_CHUNK_AT_STARTUP e CACHE_MAX_MESSAGES sobrescrevem a escolha.
+    """
+
+    def __init__(self, budget_mb: int = None):
+        self.budget_mb = budget_mb or MEMORY_BUDGET_MB
+        if self.budget_mb >= 1024:
+            self.tier = "completo"
+            self.chunk_at_startup, self.max_messages = True, 1000
+        elif self.budget_mb >= 512:
+            self.tier = "moderado"
+            self.chunk_at_startup, self.max_messages = False, 500
+        else:
+            self.tier = "mínimo"
+            self.chunk_at_startup, self.max_messages = False, None
+
+        chunk_at_startup = _env_flag('CACHE_CHUNK_AT_STARTUP')
+        if chunk_at_startup is not None:
+            self.chunk_at_startup = chunk_at_startup
+        max_messages = os.environ.get('CACHE_MAX_MESSAGES')
+        if max_messages:
+            self.max_messages = int(max_messages) or None
+
+    @property
+    def cache_fetched_members(self) -> bool:
+        """Membros buscados sob demanda entram no cache fora do orçamento mínimo"""
+        return self.tier != "mínimo"
+
+    def member_cache_flags(self, intents: discord.Intents) -> discord.MemberCacheFlags:
+        if self.tier != "mínimo":
+            return discord.MemberCacheFlags.from_intents(intents)
+        flags = discord.MemberCacheFlags.none()
+        flags.joined = intents.members
+        return flags
+
+    def client_options(self, intents: discord.Intents) -> Dict:
+        return {
+            "member_cache_flags": self.member_cache_flags(intents),
+            "chunk_guilds_at_startup": self.chunk_at_startup,
+            "max_messages": self.max_messages,
+        }
+
+    def describe(self) -> str:
+        return (f"🧠 Cache {self.tier} para {self.budget_mb} MB: chunking "
+                f"{'no login' if self.chunk_at_startup else 'sob demanda'}, "
+                f"{self.max_messages or 0} mensagens em cache")
+
+policy = CachePolicy()
+
+# 📏 USO DE MEMÓRIA
+
+_PRIMITIVES = (str, bytes, int, float, tuple, list, dict, set, frozenset)
+
+def _approximate_size(obj) -> int:
+    """Tamanho do objeto mais o dos seus atributos simples (objetos compartilhados ficam de fora)"""
+    size = sys.getsizeof(obj)
+    names = {name for cls in type(obj).__mro__ for name in getattr(cls, '__slots__', ())}
+    values = [getattr(obj, name, None) for name in names]
+    if hasattr(obj, '__dict__'):
+        values.extend(vars(obj).values())
+    for value in values:
+        if isinstance(value, _PRIMITIVES):
+            size += sys.getsizeof(value)
+            if isinstance(value, (tuple, list, set, frozenset)):
+                size += sum(sys.getsizeof(item) for item in value if isinstance(item, (str, int)))
+            elif isinstance(value, dict):
+                size += sum(sys.getsizeof(item) for item in value.values() if isinstance(item, _PRIMITIVES))
+    return size
+
+def estimate(items: Sequence, sample: int = 32) -> int:
+    """Estimativa em bytes a partir de uma amostra espaçada dos itens"""
+    if not items:
+        return 0
+    picked = items[::max(1, len(items) // sample)][:sample]
+    return int(sum(_approximate_size(item) for item in picked) / len(picked) * len(items))
+
+def cache_report(bot) -> Dict[str, Tuple[int, int]]:
+    """(entradas, bytes estimados) de cada cache em memória"""
+    guilds = list(bot.guilds)
+    caches: Dict[str, List] = {
+        "guilds": guilds,
+        "members": [member for guild in guilds for member in guild.members],
+        "users": list(bot.users),
+        "channels": [channel for guild in guilds for channel in guild.channels],
+        "roles": [role for guild in guilds for role in guild.roles],
+        "emojis": list(bot.emojis),
+        "messages": list(bot.cached_messages),
+    }
+    economy = bot.get_cog("Economy")
+    if economy is not None:
+        caches["economy"] = [row for _, row in economy.cache._entries.values()]
+    return {name: (len(items), estimate(items)) for name, items in caches.items()}
+
+def register_metrics(bot):
+    last: Dict = {"at": None, "report": {}}
+
+    def report() -> Dict[str, Tuple[int, int]]:
+        # Percorrer os caches custa caro: uma vez por scrape, não uma por gauge
+        now = time.monotonic()
+        if last["at"] is None or now - last["at"] >= CACHE_REPORT_TTL:
+            last["report"], last["at"] = cache_report(bot), now
+        return last["report"]
+
+    registry.gauge('bot_memory_budget_bytes', 'Orçamento de memória declarado (MEMORY_BUDGET_MB)',
+                   lambda: MEMORY_BUDGET_MB * 1024 * 1024)
+    registry.gauge('bot_cache_entries', 'Entradas em cada cache em memória',
+                   lambda: {(name,): entries for name, (entries, _) in report().items()}, labels=('cache',))
+    registry.gauge('bot_cache_bytes', 'Memória estimada de cada cache',
+                   lambda: {(name,): size for name, (_, size) in report().items()}, labels=('cache',))
+
+def format_report(report: Dict[str, Tuple[int, int]]) -> str:
+    return " | ".join(f"{name} {entries} (~{size / 1024 / 1024:.1f} MB)" for name, (entries, size) in report.items())
+
+# 👥 MEMBROS SOB DEMANDA
+
+async def resolve_members(guild: discord.Guild, user_ids: Sequence[int], cache: bool = False) -> Dict[int, discord.Member]:
+    """
+    Membros da guild para os IDs dados: o que está no cache e, para o resto,
+    uma consulta pelo gateway a cada 100 IDs (quem não é membro fica de fora).
+    """
+    members = {}
+    missing = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member is not None:
+            members[user_id] = member
+        else:
+            missing.append(user_id)
+    for start in range(0, len(missing), 100):
+        try:
+            found = await guild.query_members(user_ids=missing[start:start + 100], limit=100, cache=cache)
+        except (discord.ClientException, discord.HTTPException, TimeoutError) as e:
+            # Sem o intent de membros (ou gateway lento): só o fetch via REST, um a um
+            log.warning(f'⚠️ Consulta de membros pelo gateway falhou em {guild.id}: {e}')
+            found = []
+            for user_id in missing[start:start + 100]:
+                member = await fetch_member(guild, user_id)
+                if member is not None:
+                    found.append(member)
+        members.update((member.id, member) for member in found)
+    return members
+
+async def fetch_member(guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+    """Membro do cache ou, se não estiver lá, buscado na API (None se não for membro)"""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+
+async def guild_members(guild: discord.Guild, cache: bool = False) -> List[discord.Member]:
+    """Todos os membros; sem chunking no login, baixa a lista na hora"""
+    if guild.chunked:
+        return list(guild.members)
+    return await guild.chunk(cache=cache)
+
+# Desde quando cada guild tem no cache todos os membros que entraram (GUILD_CREATE do login ou da volta de uma queda)
+_joins_cached_since: Dict[int, datetime] = {}
+
+def track_joins(guild: discord.Guild):
+    """Chamado em on_guild_available/on_guild_join quando o intent de membros está ligado"""
+    _joins_cached_since[guild.id] = discord.utils.utcnow()
+
+async def recent_members(guild: discord.Guild, cutoff: datetime, cache: bool = False) -> List[discord.Member]:
+    """
+    Membros que entraram depois de `cutoff`. Quem entra com o bot conectado
+    fica no cache (flag joined, ligada em todos os orçamentos), então basta
+    filtrar guild.members; a lista só é baixada se o cache começou depois de
+    `cutoff` (bot reiniciado ou reconectado) ou sem o intent de membros.
+    """
+    since = _joins_cached_since.get(guild.id)
+    if guild.chunked or (since is not None and since <= cutoff):
+        members = guild.members
+    else:
+        members = await guild_members(guild, cache=cache)
+    return [member for member in members if member.joined_at is not None and member.joined_at >= cutoff]
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+import discord
+from discord import app_commands
+from utils.database import db
+
+"""Sincronização dos slash commands só quando a árvore de comandos muda"""
+
+log = logging.getLogger('bot')
+
+# auto: sincroniza se o hash mudou | force: sempre | off: nunca
+COMMAND_SYNC = os.environ.get('COMMAND_SYNC', 'auto').lower()
+# Guilds de desenvolvimento: recebem os comandos na hora e a sincronização global é pulada
+DEV_GUILD_IDS = [int(guild) for guild in os.environ.get('DEV_GUILD_IDS', '').split(',') if guild.strip()]
+
+def tree_fingerprint(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Hash estável do payload que o tree.sync enviaria para o escopo (global ou guild)"""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+                     key=lambda command: (command.get("type", 1), command["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class CommandSyncer:
+    """
+    Guarda o último hash sincronizado por aplicação e escopo no banco
+    (COMMAND_TREE_DATABASE, padrão "command_tree"): o disco da máquina é
+    recriado a cada deploy, então um arquivo local faria todo deploy sincronizar.
+    """
+
+    def __init__(self, database: str = None):
+        self.database = database or os.environ.get('COMMAND_TREE_DATABASE', 'command_tree')
+
+    async def _load(self, key: str) -> Optional[Dict]:
+        try:
+            return await db.find_one(self.database, {"key": key})
+        except Exception as e:
+            # Sem o hash guardado, o escopo é sincronizado (o que é sempre seguro)
+            log.warning(f'⚠️ Não foi possível ler o hash dos slash commands ({key}): {e}')
+            return None
+
+    async def _save(self, key: str, fingerprint: str, row: Optional[Dict]):
+        try:
+            if row is None:
+                await db.insert(self.database, {"key": key, "fingerprint": fingerprint})
+            else:
+                await db.update(self.database, {"key": key}, {"fingerprint": fingerprint})
+        except Exception as e:
+            log.error(f'❌ Não foi possível gravar o hash dos slash commands ({key}): {e}')
+
+    async def sync(self, tree: app_commands.CommandTree, application_id: int,
+                   guild_ids: List[int] = None, mode: str = None) -> List[str]:
+        """Sincroniza os escopos cujo hash mudou; retorna os escopos sincronizados"""
+        mode = mode or COMMAND_SYNC
+        if mode == 'off':
+            return []
+        guild_ids = DEV_GUILD_IDS if guild_ids is None else guild_ids
+        scopes = []
+        for guild_id in guild_ids:
+            guild = discord.Object(id=guild_id)
+            tree.copy_global_to(guild=guild)
+            scopes.append((f"guild:{guild_id}", guild))
+        if not scopes:
+            scopes.append(("global", None))
+
+        synced = []
+        for scope, guild in scopes:
+            key = f"{application_id}:{scope}"
+            fingerprint = tree_fingerprint(tree, guild)
+            row = await self._load(key)
+            if mode != 'force' and row is not None and row.get("fingerprint") == fingerprint:
+                log.info(f'⏭️ Slash commands ({scope}) sem mudanças, sync pulado')
+                continue
+            try:
+                commands = await tree.sync(guild=guild)
+            except discord.HTTPException as e:
+                log.error(f'❌ Erro sync ({scope}): {e}')
+                continue
+            await self._save(key, fingerprint, row)
+            synced.append(scope)
+            log.info(f'✅ {len(commands)} slash commands sincronizados ({scope})')
+        return synced
+
+syncer = CommandSyncer()
@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from discord.ext import commands
+
+"""Cooldowns persistentes por (comando, guild, usuário)"""
+
+log = logging.getLogger('bot')
+
+class CooldownStore:
+    """Cooldowns em memória (dict + heap de expiração) gravados periodicamente em um arquivo JSON.
+
+    A consulta nunca acessa a rede. Entradas vencidas saem do heap sozinhas, então a
+    memória fica limitada aos cooldowns ativos. Se o arquivo se perder (ex.: disco
+    efêmero num redeploy), `hydrate` reconstrói o cooldown a partir dos campos last_*
+    da conta na primeira vez que ela é lida do banco.
+    """
+
+    def __init__(self, path: str = None, save_interval: float = None):
+        self.path = path or os.environ.get('COOLDOWN_STORE_PATH', 'data/cooldowns.json')
+        self.save_interval = save_interval or float(os.environ.get('COOLDOWN_SAVE_INTERVAL', '30'))
+        self._durations: Dict[str, float] = {}
+        # Chave "comando:guild_id:user_id" -> fim do cooldown (epoch, sobrevive a reinícios)
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(command: str, guild_id, user_id) -> str:
+        return f"{command}:{guild_id}:{user_id}"
+
+    def register(self, command: str, seconds: float):
+        """Define a duração do cooldown de um comando"""
+        self._durations[command] = seconds
+
+    def _set(self, key: str, expires_at: float):
+        self._expires[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        self._dirty = True
+
+    def _prune(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            # Ignora entradas antigas do heap de chaves que foram renovadas
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+                self._dirty = True
+
+    def retry_after(self, command: str, guild_id, user_id) -> float:
+        """Segundos restantes de cooldown (0 se o usuário pode usar o comando)"""
+        now = time.time()
+        self._prune(now)
+        expires_at = self._expires.get(self._key(command, guild_id, user_id))
+        return max(0.0, expires_at - now) if expires_at else 0.0
+
+    def check(self, command: str, guild_id, user_id):
+        """Levanta CommandOnCooldown se o usuário ainda estiver em cooldown"""
+        retry_after = self.retry_after(command, guild_id, user_id)
+        if retry_after > 0:
+            per = self._durations[command]
+            raise commands.CommandOnCooldown(commands.Cooldown(1, per), retry_after, commands.BucketType.member)
+
+    def trigger(self, command: str, guild_id, user_id):
+        """Inicia o cooldown do comando para o usuário"""
+        expires_at = time.time() + self._durations[command]
+        self._set(self._key(command, guild_id, user_id), expires_at)
+
+    def hydrate(self, command: str, guild_id, user_id, last_used: Optional[str]):
+        """Recupera o cooldown a partir do horário (ISO, UTC) salvo na conta"""
+        if not last_used:
+            return
+        last = datetime.fromisoformat(last_used)
+        if last.tzinfo is None:
+            last = last.replace(tzinfo=timezone.utc)
+        expires_at = last.timestamp() + self._durations[command]
+        key = self._key(command, guild_id, user_id)
+        if expires_at > time.time() and expires_at > self._expires.get(key, 0):
+            self._set(key, expires_at)
+
+    def reset(self, command: str, guild_id, user_id):
+        if self._expires.pop(self._key(command, guild_id, user_id), None) is not None:
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def load(self):
+        """Carrega os cooldowns ainda ativos do arquivo"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.error(f'❌ Erro ao ler cooldowns de {self.path}: {e}')
+            return
+        now = time.time()
+        for key, expires_at in saved.items():
+            if expires_at > now:
+                self._set(key, expires_at)
+        self._dirty = False
+        log.info(f'⏰ {len(self._expires)} cooldowns restaurados')
+
+    def save(self):
+        """Grava os cooldowns ativos (arquivo temporário + rename, nunca deixa o JSON pela metade)"""
+        if not self._dirty:
+            return
+        self._prune(time.time())
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self._expires, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError as e:
+            log.error(f'❌ Erro ao gravar cooldowns em {self.path}: {e}')
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            self.save()
+
+    def start(self):
+        """Carrega o arquivo e inicia a gravação periódica"""
+        if self._task is None or self._task.done():
+            self.load()
+            self._task = asyncio.create_task(self._save_loop())
+
+    def stop(self):
+        """Para a gravação periódica e grava o estado atual"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.save()
+
+cooldowns = CooldownStore()
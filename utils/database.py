@@ -1,55 +1,258 @@
 import aiohttp
+import asyncio
+import json
 import os
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from utils.http import pool, raise_for_status, unknown_action
+from utils.locks import KeyedLock
+from utils.metrics import CACHE_REQUESTS, DB_REQUEST_SECONDS
+from utils.resilience import CircuitBreaker, RetryPolicy
 
 """Verl.ia Database - Conexão com banco de dados real"""
 
+class Batch:
+    """Acumula operações de escrita para enviá-las em uma única requisição."""
+
+    def __init__(self, client: "VerliaDB"):
+        self._client = client
+        self.operations: List[Dict] = []
+        self.results: List[Dict] = []
+
+    def insert(self, database: str, data: Dict):
+        self.operations.append(self._client._operation("insert", database, data=data))
+
+    def update(self, database: str, filters: Dict, data: Dict):
+        self.operations.append(self._client._operation("update", database, data=data, filters=filters))
+
+    def delete(self, database: str, filters: Dict):
+        self.operations.append(self._client._operation("delete", database, filters=filters))
+
+    def increment(self, database: str, filters: Dict, deltas: Dict, data: Dict = None, defaults: Dict = None):
+        self.operations.append(self._client._increment_operation(database, filters, deltas, data, defaults))
+
+    async def execute(self) -> List[Dict]:
+        """Envia as operações acumuladas e retorna um resultado por operação"""
+        operations, self.operations = self.operations, []
+        self.results = await self._client._execute_batch(operations)
+        return self.results
+
+    async def __aenter__(self) -> "Batch":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.execute()
+
+# Ações que podem ser repetidas sem efeito duplicado
+IDEMPOTENT_ACTIONS = {"select", "count", "update", "delete"}
+
 class VerliaDB:
-   """Classe VerliaDB."""
+    """Classe VerliaDB."""
     """Cliente para o banco de dados da Verl.ia"""
     
     def __init__(self):
-        self.url = "https://amqhmgatgweklzvcfdiy.supabase.co/functions/v1/bot-webhook"
+        self.url = os.environ.get('VERLIA_DB_URL', "https://amqhmgatgweklzvcfdiy.supabase.co/functions/v1/bot-webhook")
         self.bot_id = os.environ.get('BOT_ID', '149de6c3-6a87-44de-ab5f-4b960c7714fe')
+        # Ações que o backend recusou (ex.: "count" em versões antigas do webhook)
+        self._unsupported = set()
+        self.retry = RetryPolicy()
+        self.breaker = CircuitBreaker("webhook")
+        # Selects em andamento por banco, compartilhados por chamadas idênticas (single-flight)
+        self._inflight: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._creating: Dict[str, asyncio.Future] = {}
+        # Leitura + escrita do fallback de increment, por linha
+        self._row_locks = KeyedLock()
+    
+    @staticmethod
+    def _row_key(database: str, filters: Dict) -> str:
+        return json.dumps([database, filters], sort_keys=True, default=str)
+    
+    def _invalidate_reads(self, action: str, database: Optional[str], operations: List[Dict] = None):
+        """Uma escrita impede que leituras posteriores reaproveitem selects iniciados antes dela"""
+        if action in ("select", "count"):
+            return
+        for operation in operations or [{"database": database}]:
+            self._inflight.pop(operation.get("database"), None)
     
-    async def _request(self, action: str, database: str, data: Dict = None, filters: Dict = None) -> Dict:
-        """Faz requisição ao banco de dados"""
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "action": action,
-                "database": database,
-                "bot_id": self.bot_id,
-                "data": data or {},
-                "filters": filters or {}
-            }
+    async def _request(self, action: str, database: str, data: Dict = None, filters: Dict = None, **options) -> Dict:
+        """Faz requisição ao banco de dados (com prazo, novas tentativas e circuit breaker)"""
+        self._invalidate_reads(action, database, options.get("operations"))
+        payload = {
+            "action": action,
+            "database": database,
+            "bot_id": self.bot_id,
+            "data": data or {},
+            "filters": filters or {}
+        }
+        # limit / offset / order_by / columns só são enviados quando usados
+        payload.update({key: value for key, value in options.items() if value is not None})
+        return await self.retry.call(lambda: self._send(payload), self.breaker,
+                                     idempotent=action in IDEMPOTENT_ACTIONS, backend="webhook", action=action)
+    
+    async def _send(self, payload: Dict) -> Dict:
+        """Uma tentativa de POST ao webhook"""
+        session = await pool.session()
+        with DB_REQUEST_SECONDS.time(backend="webhook", action=payload["action"]):
             async with session.post(
                 f"{self.url}/database/{self.bot_id}",
                 json=payload
             ) as response:
-                response.raise_for_status() # Levanta um erro para respostas HTTP ruins
+                await raise_for_status(response) # O corpo do erro diz se a ação é desconhecida
                 return await response.json()
     
+    @staticmethod
+    def _operation(action: str, database: str, data: Dict = None, filters: Dict = None) -> Dict:
+        """Monta uma operação de escrita, com os mesmos carimbos de data de insert/update"""
+        if action == "insert" and "created_at" not in data:
+            data["created_at"] = datetime.utcnow().isoformat()
+        elif action == "update":
+            data["updated_at"] = datetime.utcnow().isoformat()
+        return {"action": action, "database": database, "data": data or {}, "filters": filters or {}}
+    
+    def _increment_operation(self, database: str, filters: Dict, deltas: Dict, data: Dict = None, defaults: Dict = None) -> Dict:
+        operation = self._operation("update", database, data=dict(data or {}), filters=filters)
+        operation.update(action="increment", deltas=deltas, defaults=defaults)
+        return operation
+    
+    async def _execute_one(self, operation: Dict) -> Dict:
+        """Executa uma operação isolada (usado quando o backend não aceita "batch")"""
+        if operation["action"] == "increment":
+            row = await self.increment(operation["database"], operation["filters"], operation["deltas"],
+                                       operation["data"], operation.get("defaults"))
+            return {"success": True, "data": row}
+        return await self._request(**operation)
+    
+    async def _execute_batch(self, operations: List[Dict]) -> List[Dict]:
+        """Executa várias operações em um POST; sem suporte a "batch", em requisições paralelas"""
+        if not operations:
+            return []
+        if len(operations) > 1:
+            result = await self._optional_request("batch", None, operations=operations)
+            if result is not None:
+                # O batch foi aceito: repetir as operações uma a uma duplicaria os inserts
+                return result.get("results", [])
+        return list(await asyncio.gather(*(self._execute_one(operation) for operation in operations)))
+    
+    def batch(self) -> Batch:
+        """Agrupa escritas: `async with db.batch() as batch: batch.update(...)`"""
+        return Batch(self)
+    
     async def insert(self, database: str, data: Dict) -> Dict:
         """Insere um registro no banco"""
-        if "created_at" not in data:
-            data["created_at"] = datetime.utcnow().isoformat()
-        return await self._request("insert", database, data=data)
+        return await self._request(**self._operation("insert", database, data=data))
+    
+    async def insert_many(self, database: str, rows: List[Dict]) -> List[Dict]:
+        """Insere vários registros em uma única requisição"""
+        return await self._execute_batch([self._operation("insert", database, data=row) for row in rows])
+    
+    async def _optional_request(self, action: str, database: str, **kwargs) -> Optional[Dict]:
+        """Tenta uma ação opcional do protocolo; retorna None se o backend não a suportar"""
+        if action in self._unsupported:
+            return None
+        try:
+            return await self._request(action, database, **kwargs)
+        except aiohttp.ClientResponseError as e:
+            if not unknown_action(e.status, e.message, action):
+                raise
+            self._unsupported.add(action)
+            return None
+    
+    async def find(self, database: str, filters: Dict = None, limit: int = None, offset: int = None,
+                   order_by: str = None, columns: List[str] = None) -> List[Dict]:
+        """
+        Busca registros no banco (order_by aceita "campo" ou "-campo" para ordem decrescente).
+        Buscas idênticas simultâneas compartilham a mesma requisição.
+        """
+        key = json.dumps([filters, limit, offset, order_by, columns], sort_keys=True, default=str)
+        inflight = self._inflight.setdefault(database, {})
+        task = inflight.get(key)
+        CACHE_REQUESTS.inc(cache="select_inflight", result="miss" if task is None else "hit")
+        if task is None:
+            task = asyncio.ensure_future(self._request("select", database, filters=filters, limit=limit, offset=offset,
+                                                       order_by=order_by, columns=columns))
+            inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(inflight, key, done))
+        result = await asyncio.shield(task)
+        # Cada chamador recebe suas próprias cópias (os registros costumam ser alterados depois)
+        return [dict(row) for row in result.get("data", [])]
     
-    async def find(self, database: str, filters: Dict = None) -> List[Dict]:
-        """Busca registros no banco"""
-        result = await self._request("select", database, filters=filters)
-        return result.get("data", [])
+    @staticmethod
+    def _forget(tasks: Dict[str, asyncio.Future], key: str, task: asyncio.Future):
+        if tasks.get(key) is task:
+            del tasks[key]
+        if not task.cancelled():
+            task.exception() # Marca a exceção como lida mesmo se todos os chamadores desistiram
     
-    async def find_one(self, database: str, filters: Dict) -> Optional[Dict]:
+    async def find_one(self, database: str, filters: Dict, columns: List[str] = None) -> Optional[Dict]:
         """Busca um único registro"""
-        results = await self.find(database, filters)
+        results = await self.find(database, filters, limit=1, columns=columns)
         return results[0] if results else None
     
+    async def get_or_create(self, database: str, filters: Dict, defaults: Dict) -> Dict:
+        """
+        Retorna o registro que casa com `filters` ou insere `{**defaults, **filters}`.
+        Chamadas simultâneas para os mesmos filtros fazem uma única busca/inserção,
+        então duas corridas pelo mesmo usuário novo não criam registros duplicados.
+        """
+        key = json.dumps([database, filters], sort_keys=True, default=str)
+        task = self._creating.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._get_or_create(database, filters, defaults))
+            self._creating[key] = task
+            task.add_done_callback(lambda done: self._forget(self._creating, key, done))
+        return dict(await asyncio.shield(task))
+    
+    async def _get_or_create(self, database: str, filters: Dict, defaults: Dict) -> Dict:
+        row = await self.find_one(database, filters)
+        if row is not None:
+            return row
+        row = {**defaults, **filters}
+        result = await self.insert(database, row)
+        inserted = (result or {}).get("data")
+        return dict(inserted[0]) if inserted else row
+    
     async def update(self, database: str, filters: Dict, data: Dict) -> Dict:
         """Atualiza registros no banco"""
-        data["updated_at"] = datetime.utcnow().isoformat()
-        return await self._request("update", database, data=data, filters=filters)
+        return await self._request(**self._operation("update", database, data=data, filters=filters))
+    
+    async def update_many(self, database: str, updates: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Aplica vários pares (filtros, dados) em uma única requisição"""
+        return await self._execute_batch([self._operation("update", database, data=data, filters=filters)
+                                          for filters, data in updates])
+    
+    async def increment(self, database: str, filters: Dict, deltas: Dict, data: Dict = None,
+                        defaults: Dict = None) -> Optional[Dict]:
+        """
+        Soma `deltas` aos campos numéricos, gravando `data` na mesma operação.
+        Com `defaults`, cria o registro se não existir. Retorna o registro atualizado.
+
+        Só é atômico entre processos quando o backend tem a ação "increment"
+        (ou no SQLite). No fallback de leitura + escrita, as somas são
+        serializadas apenas dentro deste processo: outro processo alterando a
+        mesma linha ao mesmo tempo pode perder uma delas.
+        """
+        operation = self._increment_operation(database, filters, deltas, data, defaults)
+        result = await self._optional_request("increment", database, data=operation["data"], filters=filters,
+                                              deltas=deltas, defaults=defaults)
+        if result is not None:
+            return result.get("data")
+        async with self._row_locks.acquire(self._row_key(database, filters)):
+            row = await self.find_one(database, filters)
+            if row is None:
+                if defaults is None:
+                    return None
+                row = {**defaults, **filters}
+                for field, delta in deltas.items():
+                    row[field] = (row.get(field) or 0) + delta
+                row.update(operation["data"])
+                await self.insert(database, row)
+                return row
+            values = {field: (row.get(field) or 0) + delta for field, delta in deltas.items()}
+            values.update(operation["data"])
+            await self.update(database, filters, values)
+            row.update(values)
+            return row
     
     async def delete(self, database: str, filters: Dict) -> Dict:
         """Deleta registros do banco"""
@@ -57,8 +260,26 @@ class VerliaDB:
     
     async def count(self, database: str, filters: Dict = None) -> int:
         """Conta registros no banco"""
-        results = await self.find(database, filters)
+        result = await self._optional_request("count", database, filters=filters)
+        if result is not None and "count" in result:
+            return result["count"]
+        # Backend sem contagem no servidor: baixa só a chave primária das linhas
+        results = await self.find(database, filters, columns=["id"])
         return len(results)
+    
+    async def close(self):
+        """Libera recursos do backend (o pool HTTP é compartilhado e fechado em main.py)"""
+        pass
+
+def create_db() -> VerliaDB:
+    """Cria o backend escolhido em DATABASE_BACKEND: "webhook" (padrão) ou "sqlite" """
+    backend = os.environ.get('DATABASE_BACKEND', 'webhook').lower()
+    if backend == 'sqlite':
+        from utils.sqlite import SQLiteDB
+        return SQLiteDB()
+    if backend != 'webhook':
+        raise ValueError(f"DATABASE_BACKEND desconhecido: {backend}")
+    return VerliaDB()
 
 # Instância global do banco de dados
-db = VerliaDB()
\ No newline at end of file
+db = create_db()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import aiohttp
+import os
+from typing import Optional
+
+"""Transporte HTTP compartilhado - pool de conexões para os webhooks da Verl.ia"""
+
+class HTTPPool:
+    """Sessão aiohttp única, com keep-alive e cache de DNS, reutilizada por todos os clientes."""
+
+    def __init__(self):
+        self.limit = int(os.environ.get('HTTP_POOL_LIMIT', '20'))
+        self.limit_per_host = int(os.environ.get('HTTP_POOL_LIMIT_PER_HOST', '10'))
+        self.keepalive_timeout = float(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', '60'))
+        self.dns_cache_ttl = int(os.environ.get('HTTP_DNS_CACHE_TTL', '300'))
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Cria a sessão (se ainda não existir) e a retorna"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Retorna a sessão ativa, criando-a sob demanda (ex.: fora do bot)"""
+        return await self.start()
+
+    async def close(self):
+        """Fecha a sessão e todas as conexões do pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+# Pool global, iniciado em Bot.setup_hook e fechado em Bot.close
+pool = HTTPPool()
+
+# Trechos do corpo de erro com que o webhook recusa uma ação que não conhece
+UNKNOWN_ACTION_MARKERS = ("ação desconhecida", "acao desconhecida", "unknown action", "unsupported action")
+
+async def raise_for_status(response: aiohttp.ClientResponse):
+    """Como response.raise_for_status(), mas com o corpo da resposta na mensagem do erro"""
+    if response.status >= 400:
+        raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status,
+                                          message=await response.text() or response.reason or "",
+                                          headers=response.headers)
+
+def unknown_action(status: Optional[int], message: Optional[str], action: str) -> bool:
+    """
+    Só a recusa explícita da ação (501, ou 400/404 dizendo que `action` é
+    desconhecida) conta como falta de suporte; um 400 por filtros ou dados
+    inválidos continua sendo um erro. Exigir o nome da ação evita que um
+    "batch" seja desativado porque uma das operações dentro dele foi recusada.
+    """
+    if status == 501:
+        return True
+    message = (message or "").lower()
+    return status in (400, 404) and action in message and any(marker in message for marker in UNKNOWN_ACTION_MARKERS)
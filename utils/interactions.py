@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import time
+from functools import wraps
+from typing import Dict, Optional
+import discord
+from discord.ext import commands
+from utils.locks import KeyedLock
+
+"""Respostas de interação seguras e defer automático para comandos lentos"""
+
+log = logging.getLogger('bot')
+
+# O Discord dá 3 s para a primeira resposta; passando disto o comando é adiado (defer)
+DEFER_AFTER = float(os.environ.get('INTERACTION_DEFER_AFTER', '1.5'))
+
+# Serializa defer e respostas de uma mesma interação (evita "InteractionResponded")
+_locks = KeyedLock()
+# Duração observada de cada comando (média móvel), para adiar logo de cara os lentos
+_observed: Dict[str, float] = {}
+
+def interaction_lock(interaction: discord.Interaction):
+    return _locks.acquire(interaction.id)
+
+# Em interaction.extras: a resposta original ainda é o "pensando..." público de um defer
+_PLACEHOLDER = "public_placeholder"
+
+async def _reply_channel(interaction: discord.Interaction, ephemeral: bool):
+    """
+    Prepara o próximo followup. Depois de um defer público, o primeiro followup
+    substitui o "pensando..." e herda a visibilidade dele; para uma mensagem
+    privada (ex.: erro de cooldown) o placeholder é apagado antes, e o followup
+    vira uma mensagem nova, efêmera de verdade.
+    """
+    if not interaction.extras.pop(_PLACEHOLDER, False) or not ephemeral:
+        return
+    try:
+        await interaction.delete_original_response()
+    except discord.HTTPException as e:
+        log.error(f'❌ Não foi possível apagar a resposta adiada da interação {interaction.id}: {e}')
+
+def settle(interaction: discord.Interaction):
+    """Marca que a resposta original deixou de ser o placeholder (ex.: foi editada com conteúdo)"""
+    interaction.extras.pop(_PLACEHOLDER, None)
+
+async def respond(interaction: discord.Interaction, content: Optional[str] = None, **kwargs):
+    """Responde à interação; se ela já foi respondida ou adiada, envia um followup"""
+    async with interaction_lock(interaction):
+        if interaction.response.is_done():
+            await _reply_channel(interaction, kwargs.get("ephemeral", False))
+            return await interaction.followup.send(content, **kwargs)
+        return await interaction.response.send_message(content, **kwargs)
+
+async def defer(interaction: discord.Interaction, ephemeral: bool = False):
+    """Adia a resposta (mostra "pensando...") se nada foi enviado ainda"""
+    async with interaction_lock(interaction):
+        if interaction.response.is_done():
+            return
+        try:
+            await interaction.response.defer(thinking=True, ephemeral=ephemeral)
+        except discord.HTTPException as e:
+            log.error(f'❌ Não foi possível adiar a interação {interaction.id}: {e}')
+            return
+        if not ephemeral:
+            interaction.extras[_PLACEHOLDER] = True
+
+class BotContext(commands.Context):
+    """Context cujo send respeita o lock da interação (comandos híbridos via slash)."""
+
+    async def send(self, *args, **kwargs):
+        if self.interaction is None:
+            return await super().send(*args, **kwargs)
+        async with interaction_lock(self.interaction):
+            if self.interaction.response.is_done():
+                await _reply_channel(self.interaction, kwargs.get("ephemeral", False))
+            return await super().send(*args, **kwargs)
+
+def _find_interaction(args) -> Optional[discord.Interaction]:
+    for arg in args:
+        if isinstance(arg, discord.Interaction):
+            return arg
+        if isinstance(arg, commands.Context):
+            return arg.interaction
+    return None
+
+def auto_defer(threshold: float = None, ephemeral: bool = False):
+    """
+    Decorator (logo acima do `async def`) para comandos de barra/híbridos: roda o
+    comando e, se ele ainda não respondeu após `threshold` segundos, adia a
+    interação para as respostas seguintes virarem followups. Comandos que
+    costumam passar do limite são adiados imediatamente.
+    """
+    def decorator(func):
+        name = func.__qualname__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            interaction = _find_interaction(args)
+            if interaction is None:
+                return await func(*args, **kwargs)
+            limit = threshold or DEFER_AFTER
+            started = time.perf_counter()
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            try:
+                if _observed.get(name, 0) > limit:
+                    await defer(interaction, ephemeral)
+                else:
+                    done, _ = await asyncio.wait({task}, timeout=limit)
+                    if not done:
+                        await defer(interaction, ephemeral)
+                return await task
+            finally:
+                if not task.done():
+                    task.cancel()
+                elapsed = time.perf_counter() - started
+                _observed[name] = elapsed if name not in _observed else 0.8 * _observed[name] + 0.2 * elapsed
+        return wrapper
+    return decorator
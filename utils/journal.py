@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from utils.manager import db
+from utils.metrics import registry
+
+"""Journal local (append-only) dos registros de auditoria da moderação"""
+
+log = logging.getLogger('bot')
+
+class AuditJournal:
+    """
+    Grava cada registro de auditoria em um arquivo JSONL (com fsync) antes de
+    responder ao comando, e um flusher em segundo plano envia os registros ao
+    banco em lotes, tentando de novo com backoff até conseguir. O que sobrar no
+    arquivo ao desligar é reenviado na próxima inicialização, então nada se perde.
+    Cada registro leva um `audit_id`. Os que podem ter chegado ao banco sem
+    confirmação (reenfileirados na inicialização, ou cujo envio falhou) são
+    procurados por ele antes de serem reenviados, para não gravar duplicatas.
+    """
+
+    def __init__(self, path: str = None, flush_interval: float = None, batch_size: int = None):
+        self.path = path or os.environ.get('AUDIT_JOURNAL_PATH', 'data/audit.jsonl')
+        self.flush_interval = flush_interval or float(os.environ.get('AUDIT_FLUSH_INTERVAL', '2'))
+        self.batch_size = batch_size or int(os.environ.get('AUDIT_BATCH_SIZE', '100'))
+        self.max_backoff = float(os.environ.get('AUDIT_MAX_BACKOFF', '60'))
+        self._pending: List[Dict] = []
+        # audit_ids que podem já estar no banco: conferidos antes do reenvio
+        self._unconfirmed: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        # Escritas no arquivo (fsync em uma thread) e compactações não se intercalam
+        self._file_lock = asyncio.Lock()
+        self._failures = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _write(self, entries: List[Dict]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _persist(self, entries: List[Dict]):
+        # O fsync roda fora do event loop; o registro só entra na fila depois de gravado
+        async with self._file_lock:
+            await asyncio.to_thread(self._write, entries)
+            self._pending.extend(entries)
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def append(self, database: str, data: Dict) -> Dict:
+        """Grava o registro no journal e agenda o envio; retorna o registro com audit_id"""
+        data = {"audit_id": uuid.uuid4().hex, **data}
+        await self._persist([{"database": database, "data": data, "queued_at": datetime.utcnow().isoformat()}])
+        return data
+
+    async def append_many(self, database: str, rows: List[Dict]) -> List[Dict]:
+        """Como append, mas com um único fsync para todos os registros"""
+        queued_at = datetime.utcnow().isoformat()
+        entries = [{"database": database, "data": {"audit_id": uuid.uuid4().hex, **row}, "queued_at": queued_at}
+                   for row in rows]
+        await self._persist(entries)
+        return [entry["data"] for entry in entries]
+
+    def _replay(self):
+        """Recarrega os registros que ainda não chegaram ao banco"""
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        seen = set()
+        for number, line in enumerate(lines, start=1):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Linha cortada por uma queda no meio da escrita
+                log.error(f'❌ Linha {number} inválida no journal {self.path}, ignorada')
+                continue
+            # O launcher de clusters pode ter juntado uma cópia do mesmo registro (ver cluster.py)
+            audit_id = entry.get("data", {}).get("audit_id")
+            if audit_id is not None and audit_id in seen:
+                continue
+            seen.add(audit_id)
+            self._pending.append(entry)
+            # O processo pode ter caído depois do envio e antes de compactar o journal
+            if audit_id is not None:
+                self._unconfirmed.add(audit_id)
+        if self._pending:
+            log.info(f'📒 {len(self._pending)} registros de auditoria pendentes reenfileirados')
+
+    def _compact(self, entries: List[Dict]):
+        """Reescreve o journal só com o que ainda está pendente"""
+        tmp = f"{self.path}.tmp"
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(tmp, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    async def _drop_saved(self, entries: List[Dict]) -> Tuple[Set[str], Set[str]]:
+        """Procura no banco os registros não confirmados; retorna (já gravados, sem resposta)"""
+        unconfirmed = [entry for entry in entries if entry["data"].get("audit_id") in self._unconfirmed]
+        if not unconfirmed:
+            return set(), set()
+        found = await asyncio.gather(*(db.get(entry["database"], {"audit_id": entry["data"]["audit_id"]})
+                                       for entry in unconfirmed))
+        saved, unknown = set(), set()
+        for entry, result in zip(unconfirmed, found):
+            audit_id = entry["data"]["audit_id"]
+            if result.get("error"):
+                unknown.add(audit_id)
+            elif result.get("data"):
+                saved.add(audit_id)
+        if saved:
+            log.info(f'📒 {len(saved)} registros de auditoria já estavam no banco e não serão reenviados')
+        return saved, unknown
+
+    async def flush(self) -> bool:
+        """Envia um lote por banco; retorna False se algum envio falhou"""
+        async with self._lock:
+            batch = self._pending[:self.batch_size]
+            if not batch:
+                return True
+            # Sem saber se um registro já foi gravado, ele fica para a próxima tentativa
+            saved, unknown = await self._drop_saved(batch)
+            sent = [entry for entry in batch if entry["data"].get("audit_id") in saved]
+            groups: Dict[str, List[Dict]] = {}
+            for entry in batch:
+                if entry["data"].get("audit_id") not in saved | unknown:
+                    groups.setdefault(entry["database"], []).append(entry)
+            for database, entries in groups.items():
+                result = await db.save_many(database, [entry["data"] for entry in entries])
+                if result.get("error"):
+                    # Com inserts individuais, os que deram certo saem da fila e não são reenviados
+                    results = result.get("results") or [result] * len(entries)
+                    failed = [entry for entry, outcome in zip(entries, results) if outcome.get("error")]
+                    log.error(f'❌ Falha ao gravar {len(failed)} registros em {database}: {result["error"]}')
+                    # A resposta pode ter se perdido depois de o insert já ter sido feito
+                    self._unconfirmed.update(entry["data"]["audit_id"] for entry in failed)
+                    sent.extend(entry for entry, outcome in zip(entries, results) if not outcome.get("error"))
+                    continue
+                sent.extend(entries)
+            if sent:
+                sent_ids = {entry["data"]["audit_id"] for entry in sent}
+                self._unconfirmed -= sent_ids
+                self._pending = [entry for entry in self._pending if entry["data"].get("audit_id") not in sent_ids]
+                async with self._file_lock:
+                    await asyncio.to_thread(self._compact, list(self._pending))
+            return len(sent) == len(batch)
+
+    async def _drain(self):
+        while self._pending and await self.flush():
+            pass
+        if self._pending:
+            raise RuntimeError("banco indisponível")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                ok = await self.flush()
+            except Exception as e:
+                log.error(f'❌ Erro no flush do journal de auditoria: {e}')
+                ok = False
+            if ok:
+                self._failures = 0
+                if len(self._pending) >= self.batch_size:
+                    self._wakeup.set()
+            else:
+                # Backoff exponencial com jitter enquanto o banco estiver falhando
+                self._failures += 1
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.flush_interval * 2 ** self._failures)))
+
+    def start(self):
+        """Reenfileira o que ficou no journal e inicia o flusher"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._pending = []
+            self._unconfirmed = set()
+            self._replay()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self, timeout: float = 5):
+        """Para o flusher após uma última tentativa; o que não for enviado fica no journal"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except Exception as e:
+            log.error(f'❌ {len(self._pending)} registros de auditoria ficam no journal para a próxima inicialização: {e}')
+
+journal = AuditJournal()
+
+registry.gauge('bot_audit_pending', 'Registros de auditoria ainda não gravados no banco', lambda: len(journal))
@@ -0,0 +1,104 @@
+import asyncio
+import os
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from utils.database import db
+
+"""Ranking de economia por guild, mantido incrementalmente em memória"""
+
+# Rankings mantidos em memória; as guilds consultadas há mais tempo são descartadas
+# e recarregadas do banco na próxima consulta
+LEADERBOARD_MAX_GUILDS = int(os.environ.get('LEADERBOARD_MAX_GUILDS', '1000'))
+
+class GuildLeaderboard:
+    """
+    Lista ordenada por (total decrescente, user_id) dos usuários de uma guild.
+    A posição é achada por busca binária, mas inserir e remover deslocam a
+    lista: cada atualização custa O(n), um memmove que continua barato para
+    o tamanho de uma guild.
+    """
+
+    def __init__(self):
+        self._order: List[Tuple[int, str]] = []
+        self._totals: Dict[str, int] = {}
+
+    def update(self, user_id: str, total: int):
+        """Reposiciona o usuário com o novo total"""
+        old = self._totals.get(user_id)
+        if old == total:
+            return
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, user_id))]
+        self._totals[user_id] = total
+        insort(self._order, (-total, user_id))
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        return [(user_id, -negative) for negative, user_id in self._order[:n]]
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """Posição (1 = primeiro) do usuário, ou None se ele não tem conta"""
+        total = self._totals.get(user_id)
+        if total is None:
+            return None
+        return bisect_left(self._order, (-total, user_id)) + 1
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+class Leaderboard:
+    """
+    Rankings por guild, reconstruídos do banco só na primeira consulta de cada
+    guild. No máximo `max_guilds` ficam em memória (LRU).
+    """
+
+    def __init__(self, database: str = "economy", overlay: Callable[[str], Iterable[Tuple[str, Dict]]] = None,
+                 rows: Callable[[str], Awaitable[List[Dict]]] = None, max_guilds: int = None):
+        self.database = database
+        # Contas mais recentes que o banco (ex.: cache write-back com deltas ainda não gravados)
+        self.overlay = overlay
+        # Saldos da guild (ex.: snapshot + ledger); por padrão, as linhas de `database`
+        self.rows = rows
+        self.max_guilds = max_guilds or LEADERBOARD_MAX_GUILDS
+        self._guilds: "OrderedDict[str, GuildLeaderboard]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def total(row: Dict) -> int:
+        return (row.get("wallet") or 0) + (row.get("bank") or 0)
+
+    def update(self, guild_id, user_id, row: Dict):
+        """Aplica uma alteração de conta; guilds ainda não carregadas são ignoradas"""
+        board = self._guilds.get(str(guild_id))
+        if board is not None:
+            board.update(str(user_id), self.total(row))
+
+    async def _load(self, guild_id: str) -> GuildLeaderboard:
+        if self.rows is not None:
+            rows = await self.rows(guild_id)
+        else:
+            rows = await db.find(self.database, {"guild_id": guild_id}, columns=["user_id", "wallet", "bank"])
+        board = GuildLeaderboard()
+        for row in rows:
+            board.update(str(row["user_id"]), self.total(row))
+        if self.overlay is not None:
+            for user_id, row in self.overlay(guild_id):
+                board.update(user_id, self.total(row))
+        self._guilds[guild_id] = board
+        while len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+        return board
+
+    async def get(self, guild_id) -> GuildLeaderboard:
+        """Ranking da guild, carregando-o uma única vez mesmo com consultas simultâneas"""
+        guild_id = str(guild_id)
+        board = self._guilds.get(guild_id)
+        if board is not None:
+            self._guilds.move_to_end(guild_id)
+            return board
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(guild_id))
+            self._loading[guild_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(task)
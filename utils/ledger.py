@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from utils.database import db
+from utils.locks import KeyedLock
+
+"""Ledger da economia: lançamentos append-only dobrados periodicamente nos snapshots de saldo"""
+
+log = logging.getLogger('bot')
+
+# Campos de saldo movimentados pelos lançamentos
+BALANCE_FIELDS = ("wallet", "bank")
+
+class Ledger:
+    """
+    Cada comando da economia grava lançamentos ({entry_id, kind, wallet, bank, ...})
+    em `ledger_database`, sem ler nada antes; a linha da conta em `database` é
+    só um snapshot, com `ledger_seq` = id do último lançamento dobrado nele. O
+    saldo de uma conta é o snapshot mais os lançamentos de id maior que
+    `ledger_seq` (sem repetir entry_id).
+
+    O backend não tem transações: o compactador grava o saldo absoluto e o
+    `ledger_seq` numa única escrita e só depois marca os lançamentos como
+    compactados (o histórico continua lá). Se parar no meio, a rodada seguinte
+    pula o que já foi dobrado. Roda só no cluster 0, para dois processos não
+    dobrarem os mesmos lançamentos.
+
+    Os ids são dados no insert, mas um insert ainda em andamento pode aparecer
+    depois de um id maior. Por isso o compactador só dobra lançamentos até um id
+    que ele mesmo viu há pelo menos `compact_grace` segundos: todo id menor já
+    tinha sido dado naquele momento, e o insert dele já terminou.
+    """
+
+    def __init__(self, database: str = "economy", ledger_database: str = "economy_ledger",
+                 compact_interval: float = None, compact_batch: int = None, compact_grace: float = None):
+        self.database = database
+        self.ledger_database = ledger_database
+        self.compact_interval = compact_interval or float(os.environ.get('LEDGER_COMPACT_INTERVAL', '300'))
+        self.compact_batch = compact_batch or int(os.environ.get('LEDGER_COMPACT_BATCH', '500'))
+        # Bem acima do prazo de uma requisição ao banco (DATABASE_DEADLINE)
+        self.compact_grace = compact_grace if compact_grace is not None else float(os.environ.get('LEDGER_COMPACT_GRACE', '60'))
+        # (instante, maior id) de cada leitura do compactador, e o id até onde já é seguro dobrar
+        self._observed: Deque[Tuple[float, int]] = deque()
+        self._safe_seq = 0
+        # Leitura de snapshot + cauda e compactação de uma mesma conta não se intercalam
+        self.locks = KeyedLock()
+        self._compacting = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def entry(guild_id, user_id, kind: str, deltas: Dict[str, int], counterparty_id=None) -> Dict:
+        """Lançamento pronto para o append"""
+        return {
+            # Gerado aqui: um lançamento reenviado após uma falha é reconhecido pelo entry_id
+            "entry_id": uuid.uuid4().hex,
+            "guild_id": str(guild_id),
+            "user_id": str(user_id),
+            "kind": kind,
+            **{field: deltas.get(field, 0) for field in BALANCE_FIELDS},
+            "counterparty_id": str(counterparty_id) if counterparty_id is not None else None,
+            "created_at": datetime.utcnow().isoformat(),
+            "compacted": False
+        }
+
+    @staticmethod
+    def apply(row: Dict, entries: Iterable[Dict]) -> Dict:
+        """Soma os lançamentos ao snapshot (in-place)"""
+        for entry in entries:
+            for field in BALANCE_FIELDS:
+                row[field] = (row.get(field) or 0) + (entry.get(field) or 0)
+        return row
+
+    @staticmethod
+    def tail(snapshot: Dict, entries: Iterable[Dict]) -> List[Dict]:
+        """Lançamentos ainda não dobrados no snapshot, sem entry_id repetido"""
+        folded = snapshot.get("ledger_seq") or 0
+        seen = set()
+        pending = []
+        for entry in entries:
+            if entry.get("id") is not None and entry["id"] <= folded:
+                continue
+            entry_id = entry.get("entry_id")
+            if entry_id is not None:
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+            pending.append(entry)
+        return pending
+
+    async def load(self, guild_id, user_id, defaults: Dict) -> Dict:
+        """Saldo atual da conta (snapshot + cauda do ledger), criando o snapshot se não existir"""
+        filters = {"user_id": str(user_id), "guild_id": str(guild_id)}
+        async with self.locks.acquire((filters["guild_id"], filters["user_id"])):
+            # Cauda antes do snapshot: um lançamento marcado como compactado no meio já está no snapshot lido depois
+            tail = await db.find(self.ledger_database, {**filters, "compacted": False}, order_by="id")
+            snapshot = await db.get_or_create(self.database, filters, defaults)
+        return self.apply(dict(snapshot), self.tail(snapshot, tail))
+
+    async def balances(self, guild_id) -> List[Dict]:
+        """Saldos (user_id, wallet, bank) de todas as contas da guild"""
+        guild_id = str(guild_id)
+        # Sem compactação no meio: senão um lançamento poderia contar duas vezes ou nenhuma
+        async with self._compacting:
+            tail = await db.find(self.ledger_database, {"guild_id": guild_id, "compacted": False},
+                                 columns=["id", "entry_id", "user_id", *BALANCE_FIELDS], order_by="id")
+            rows = await db.find(self.database, {"guild_id": guild_id}, columns=["user_id", "ledger_seq", *BALANCE_FIELDS])
+        accounts = {str(row["user_id"]): row for row in rows}
+        entries: Dict[str, List[Dict]] = {}
+        for entry in tail:
+            entries.setdefault(str(entry["user_id"]), []).append(entry)
+        for user_id, account_entries in entries.items():
+            account = accounts.setdefault(user_id, {"user_id": user_id})
+            self.apply(account, self.tail(account, account_entries))
+        for account in accounts.values():
+            account.pop("ledger_seq", None)
+        return list(accounts.values())
+
+    def _observe(self, seq: int) -> int:
+        """Registra o maior id visto agora; retorna o maior id visto há pelo menos `compact_grace` segundos"""
+        now = time.monotonic()
+        self._observed.append((now, seq))
+        while self._observed and now - self._observed[0][0] >= self.compact_grace:
+            self._safe_seq = max(self._safe_seq, self._observed.popleft()[1])
+        return self._safe_seq
+
+    async def compact(self) -> int:
+        """Dobra até `compact_batch` lançamentos nos snapshots; retorna quantos foram marcados como compactados"""
+        async with self._compacting:
+            entries = await db.find(self.ledger_database, {"compacted": False}, limit=self.compact_batch, order_by="id")
+            if not entries:
+                return 0
+            # Os mais novos esperam a próxima rodada: pode haver um id menor ainda sendo gravado
+            safe = self._observe(max(entry["id"] for entry in entries))
+            entries = [entry for entry in entries if entry["id"] <= safe]
+            if not entries:
+                return 0
+            accounts: Dict[tuple, List[Dict]] = {}
+            for entry in entries:
+                accounts.setdefault((str(entry["guild_id"]), str(entry["user_id"])), []).append(entry)
+            async with self.locks.acquire(*accounts):
+                filters = [{"guild_id": guild_id, "user_id": user_id} for guild_id, user_id in accounts]
+                snapshots = await asyncio.gather(*(
+                    db.get_or_create(self.database, account, {field: 0 for field in BALANCE_FIELDS}) for account in filters))
+                # Saldo absoluto + ledger_seq numa escrita por conta: repetir a rodada não soma de novo
+                updates = []
+                for account, snapshot, account_entries in zip(filters, snapshots, accounts.values()):
+                    balances = self.apply({field: snapshot.get(field) or 0 for field in BALANCE_FIELDS},
+                                          self.tail(snapshot, account_entries))
+                    folded = max(snapshot.get("ledger_seq") or 0, *(entry["id"] for entry in account_entries))
+                    updates.append((account, {**balances, "ledger_seq": folded}))
+                results = await db.update_many(self.database, updates)
+                # Só marca os lançamentos das contas cujo snapshot foi gravado
+                marked = await db.update_many(self.ledger_database, [
+                    ({"id": entry["id"]}, {"compacted": True})
+                    for account_entries, result in zip(accounts.values(), results) if not (result or {}).get("error")
+                    for entry in account_entries])
+            return sum(1 for result in marked if not (result or {}).get("error"))
+
+    async def _compact_loop(self):
+        while True:
+            await asyncio.sleep(self.compact_interval)
+            try:
+                folded = 0
+                while True:
+                    count = await self.compact()
+                    folded += count
+                    # Nada marcado (ou lote incompleto): o resto fica para a próxima rodada
+                    if count < self.compact_batch:
+                        break
+                if folded:
+                    log.info(f'📚 {folded} lançamentos de {self.ledger_database} compactados')
+            except Exception as e:
+                log.error(f'❌ Erro ao compactar {self.ledger_database}: {e}')
+
+    def start(self):
+        """Inicia o compactador em segundo plano (só no cluster 0)"""
+        if os.environ.get('CLUSTER_ID') not in (None, '', '0'):
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._compact_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,38 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+"""Locks assíncronos por chave (ex.: por conta de economia)"""
+
+class KeyedLock:
+    """Registro de asyncio.Lock por chave; locks sem uso são descartados automaticamente."""
+
+    def __init__(self):
+        # Só quem está segurando ou esperando o lock mantém referência a ele;
+        # quando todos terminam, a entrada some do dicionário sozinha.
+        self._locks: "weakref.WeakValueDictionary[Hashable, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _get(self, key: Hashable) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    @asynccontextmanager
+    async def acquire(self, *keys: Hashable):
+        """Trava todas as chaves indicadas, sempre na mesma ordem para evitar deadlock"""
+        locks = [self._get(key) for key in sorted(set(keys))]
+        acquired = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def __len__(self) -> int:
+        return len(self._locks)
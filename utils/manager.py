@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import aiohttp
+from utils.http import pool, raise_for_status, unknown_action
+from utils.metrics import DB_REQUEST_SECONDS
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+log = logging.getLogger('bot')
+
+class VerliaDB:
+    """Gerenciador de banco de dados Verl.ia"""
+    
+    def __init__(self):
+        self.webhook_url = os.environ.get('DATABASE_WEBHOOK_URL')
+        self.bot_id = os.environ.get('BOT_ID')
+        self.retry = RetryPolicy()
+        self.breaker = CircuitBreaker("manager")
+        # Ações que o webhook recusou como desconhecidas (ex.: "batch")
+        self._unsupported = set()
+    
+    async def _post(self, payload: dict, erro: str):
+        """Envia o payload ao webhook usando o pool HTTP compartilhado"""
+        if not self.webhook_url or not self.bot_id:
+            print("❌ Erro: DATABASE_WEBHOOK_URL ou BOT_ID não configurados.")
+            return {"error": "Configuração do banco de dados incompleta."}
+        payload["bot_id"] = self.bot_id
+        try:
+            return await self.retry.call(lambda: self._send(payload), self.breaker,
+                                         idempotent=payload["action"] in ("select", "delete"),
+                                         backend="manager", action=payload["action"])
+        except CircuitOpenError as e:
+            return {"error": str(e)}
+        except aiohttp.ClientResponseError as e:
+            log.error(f"❌ Erro ao {erro} no DB: {e.status} {e.message}")
+            return {"error": e.message, "status": e.status}
+        except (aiohttp.ClientError, TimeoutError) as e:
+            log.error(f"❌ Erro ao {erro} no DB: {type(e).__name__} {e}")
+            return {"error": f"{type(e).__name__}: {e}"}
+    
+    async def _send(self, payload: dict):
+        """Uma tentativa de POST ao webhook"""
+        session = await pool.session()
+        with DB_REQUEST_SECONDS.time(backend="manager", action=payload["action"]):
+            async with session.post(f"{self.webhook_url}/database/{self.bot_id}", json=payload) as resp:
+                await raise_for_status(resp)
+                return await resp.json()
+    
+    async def save(self, database_name: str, data: dict):
+        """Salva dados no banco do Verl.ia"""
+        payload = {
+            "action": "insert",
+            "database": database_name,
+            "data": data
+        }
+        return await self._post(payload, "salvar")
+    
+    async def save_many(self, database_name: str, rows: list):
+        """
+        Salva vários registros em uma única requisição. Sem "batch" no webhook,
+        faz um insert por registro; se algum falhar, `results` traz o resultado
+        de cada registro (na ordem de `rows`) para reenviar só os que falharam.
+        """
+        if "batch" not in self._unsupported:
+            payload = {
+                "action": "batch",
+                "operations": [{"action": "insert", "database": database_name, "data": row} for row in rows]
+            }
+            result = await self._post(payload, "salvar em lote")
+            if not unknown_action(result.get("status"), result.get("error"), "batch"):
+                return result
+            self._unsupported.add("batch")
+        results = await asyncio.gather(*(self.save(database_name, row) for row in rows))
+        errors = [r for r in results if r.get("error")]
+        if errors:
+            return {"error": errors[0]["error"], "results": results}
+        return {"success": True, "results": results}
+    
+    async def get(self, database_name: str, filters: dict = None):
+        """Busca dados do banco"""
+        payload = {
+            "action": "select",
+            "database": database_name,
+            "filters": filters or {}
+        }
+        return await self._post(payload, "buscar")
+    
+    async def delete(self, database_name: str, filters: dict):
+        """Remove dados do banco"""
+        payload = {
+            "action": "delete",
+            "database": database_name,
+            "filters": filters
+        }
+        return await self._post(payload, "deletar")
+
+db = VerliaDB()
@@ -0,0 +1,222 @@
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+"""Métricas do processo no formato texto do Prometheus (GET /metrics)"""
+
+log = logging.getLogger('bot')
+
+# Limites (segundos) pensados para latências de rede/Discord: de 1 ms a 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        # Atualizado também pelas threads de database_async
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in list(self._values.items())]
+
+class Gauge(_Metric):
+    """
+    Valor lido na hora da coleta, por uma função sem argumentos. Com `labels`,
+    a função retorna um dict {(valores dos labels): valor}.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Callable, kind: str = "gauge", labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.function = function
+        # "counter" para totais acumulados lidos de fora (ex.: tempo de CPU)
+        self.kind = kind
+
+    def _samples(self) -> List[str]:
+        try:
+            value = self.function()
+        except Exception:
+            value = None
+        if value is None:
+            return []
+        if not self.label_names:
+            return [f"{self.name} {value}"]
+        return [f"{self.name}{_labels(self.label_names, key)} {sample}" for key, sample in value.items()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de labels: [contagem por faixa..., +Inf], soma
+        self._values: Dict[Tuple, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede o bloco; o label `status` vira "ok" ou "error" conforme o bloco termina"""
+        start = time.perf_counter()
+        status = "error"
+        try:
+            yield
+            status = "ok"
+        finally:
+            self.observe(time.perf_counter() - start, status=status, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total[0]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name: str, documentation: str, function: Callable, kind: str = "gauge", labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, function, kind, labels))
+
+    def render(self) -> str:
+        return "\n".join(line for metric in list(self._metrics.values()) for line in metric.render()) + "\n"
+
+registry = Registry()
+
+# 📊 MÉTRICAS DO BOT
+
+COMMAND_SECONDS = registry.histogram('bot_command_seconds', 'Duração dos comandos', ('command', 'status'))
+COMMAND_ERRORS = registry.counter('bot_command_errors_total', 'Erros de comandos por tipo', ('command', 'error'))
+DB_REQUEST_SECONDS = registry.histogram('bot_db_request_seconds', 'Ida e volta de cada requisição ao banco',
+                                        ('backend', 'action', 'status'))
+DATABASE_CALL_SECONDS = registry.histogram('bot_database_call_seconds', 'Duração das funções de database.py e database_async',
+                                           ('function', 'status'))
+CACHE_REQUESTS = registry.counter('bot_cache_requests_total', 'Consultas aos caches locais', ('cache', 'result'))
+
+def timed(histogram: Histogram, **labels):
+    """Decorator que mede uma função (síncrona ou corrotina); o label `function` recebe o nome dela"""
+    def decorator(func):
+        function_labels = {"function": func.__name__, **labels}
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**function_labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**function_labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _resident_memory() -> Optional[float]:
+    # Linux (Fly.io): segunda coluna de /proc/self/statm, em páginas
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+registry.gauge('process_resident_memory_bytes', 'Memória residente do processo', _resident_memory)
+registry.gauge('process_cpu_seconds_total', 'Tempo de CPU (usuário + sistema) do processo', time.process_time, kind="counter")
+
+# 🌐 ENDPOINT
+
+class MetricsServer:
+    """Servidor HTTP mínimo que expõe /metrics (METRICS_HOST:METRICS_PORT, padrão 127.0.0.1:9091; porta 0 desliga)."""
+
+    def __init__(self, host: str = None, port: int = None):
+        self.host = host or os.environ.get('METRICS_HOST', '127.0.0.1')
+        self.port = port if port is not None else int(os.environ.get('METRICS_PORT', '9091') or 0)
+        self._runner = None
+
+    async def _handle(self, request):
+        from aiohttp import web
+        return web.Response(body=registry.render().encode(),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    async def start(self):
+        if not self.port or self._runner is not None:
+            return
+        # aiohttp.web só é importado se o endpoint estiver ligado
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            log.error(f'❌ Erro ao abrir o endpoint de métricas na porta {self.port}: {e}')
+            await self.stop()
+            return
+        log.info(f'📊 Métricas em http://{self.host}:{self.port}/metrics')
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+server = MetricsServer()
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import aiohttp
+from utils.metrics import registry
+
+"""Prazos, novas tentativas e circuit breaker para os clientes de banco de dados"""
+
+log = logging.getLogger('bot')
+
+T = TypeVar('T')
+
+# Respostas que indicam backend sobrecarregado/instável (vale tentar de novo)
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """O backend está degradado e o circuit breaker recusou a chamada sem tentar."""
+    pass
+
+_breakers: Dict[str, "CircuitBreaker"] = {}
+
+RETRIES = registry.counter('bot_db_retries_total', 'Novas tentativas de requisições ao banco', ('backend', 'action'))
+REJECTIONS = registry.counter('bot_circuit_rejections_total', 'Chamadas recusadas com o circuito aberto', ('breaker',))
+TRANSITIONS = registry.counter('bot_circuit_transitions_total', 'Mudanças de estado do circuit breaker', ('breaker', 'state'))
+registry.gauge('bot_circuit_state', 'Estado do circuit breaker (0 fechado, 1 meio-aberto, 2 aberto)',
+               lambda: {(name,): _STATE_VALUES[breaker.state] for name, breaker in _breakers.items()}, labels=('breaker',))
+
+class CircuitBreaker:
+    """
+    Abre após `failure_threshold` falhas seguidas e recusa chamadas por
+    `reset_timeout` segundos; depois deixa passar uma única chamada de teste
+    (meio-aberto) e fecha de novo se ela der certo.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.environ.get('DATABASE_BREAKER_THRESHOLD', '5'))
+        self.reset_timeout = reset_timeout or float(os.environ.get('DATABASE_BREAKER_RESET', '30'))
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        _breakers[name] = self
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            TRANSITIONS.inc(breaker=self.name, state=state)
+            if state == OPEN:
+                log.error(f'🔌 Circuito {self.name} aberto após {self.failures} falhas seguidas')
+            elif state == CLOSED:
+                log.info(f'🔌 Circuito {self.name} fechado')
+
+    def allow(self):
+        """Levanta CircuitOpenError se a chamada não deve nem ser tentada"""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+            REJECTIONS.inc(breaker=self.name)
+            raise CircuitOpenError(f"Banco de dados indisponível ({self.name}); tente novamente em instantes")
+        if self.state == HALF_OPEN:
+            self._probing = True
+
+    def cancelled(self):
+        # A chamada de teste foi cancelada pelo chamador: libera outra
+        self._probing = False
+
+    def success(self):
+        self.failures = 0
+        self._probing = False
+        self._set_state(CLOSED)
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+def is_transient(error: BaseException) -> bool:
+    """Timeout, falha de conexão ou resposta 5xx/429: o backend pode se recuperar"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in TRANSIENT_STATUS
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """Espera exponencial com jitter completo (0 até base * 2^tentativa)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class RetryPolicy:
+    """Prazo por tentativa, prazo total e número de tentativas (variáveis DATABASE_*)."""
+
+    def __init__(self, attempts: int = None, timeout: float = None, deadline: float = None,
+                 base_delay: float = None, max_delay: float = None):
+        self.attempts = attempts or int(os.environ.get('DATABASE_RETRY_ATTEMPTS', '3'))
+        self.timeout = timeout or float(os.environ.get('DATABASE_TIMEOUT', '5'))
+        self.deadline = deadline or float(os.environ.get('DATABASE_DEADLINE', '12'))
+        self.base_delay = base_delay or float(os.environ.get('DATABASE_RETRY_BASE_DELAY', '0.2'))
+        self.max_delay = max_delay or float(os.environ.get('DATABASE_RETRY_MAX_DELAY', '2'))
+
+    async def call(self, request: Callable[[], Awaitable[T]], breaker: Optional[CircuitBreaker] = None,
+                   idempotent: bool = False, **labels) -> T:
+        """
+        Executa `request` dentro do prazo, tentando de novo falhas transitórias.
+        Ações não idempotentes só são repetidas se a conexão nem chegou a abrir
+        (a requisição certamente não foi processada).
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.allow()
+            remaining = deadline - time.monotonic()
+            try:
+                result = await asyncio.wait_for(request(), timeout=min(self.timeout, remaining))
+            except asyncio.CancelledError:
+                if breaker is not None:
+                    breaker.cancelled()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    if breaker is not None:
+                        if isinstance(e, aiohttp.ClientResponseError):
+                            # O backend respondeu (ex.: 409, 400): está saudável
+                            breaker.success()
+                        else:
+                            # Resposta inesperada (ex.: corpo que não é JSON): conta como falha,
+                            # o que também libera a chamada de teste do meio-aberto
+                            breaker.failure()
+                    raise
+                if breaker is not None:
+                    breaker.failure()
+                attempt += 1
+                delay = backoff(attempt, self.base_delay, self.max_delay)
+                retryable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+                if not retryable or attempt >= self.attempts or time.monotonic() + delay >= deadline:
+                    raise
+                RETRIES.inc(**labels)
+                await asyncio.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.success()
+            return result
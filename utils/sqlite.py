@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+from utils.database import VerliaDB
+from utils.metrics import DB_REQUEST_SECONDS
+
+"""Backend SQLite local (DATABASE_BACKEND=sqlite) com a mesma interface do VerliaDB"""
+
+# Campos com coluna própria; os demais ficam no JSON da coluna `data`
+_COLUMNS = ("id", "guild_id", "user_id")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    database TEXT NOT NULL,
+    guild_id TEXT,
+    user_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_account ON records (database, guild_id, user_id);
+CREATE INDEX IF NOT EXISTS records_user ON records (database, user_id);
+"""
+
+class SQLiteDB(VerliaDB):
+    """
+    VerliaDB que executa as ações do protocolo do bot-webhook num arquivo SQLite
+    em modo WAL, sem rede. Toda a E/S roda em uma única thread dedicada, então o
+    event loop não bloqueia e as escritas ficam naturalmente serializadas; cada
+    requisição (e cada lote inteiro) é uma transação.
+    """
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or os.environ.get('SQLITE_PATH', 'data/verlia.db')
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _request(self, action: str, database: str, data: Dict = None, filters: Dict = None, **options) -> Dict:
+        """Executa a ação localmente, com o mesmo formato de resposta do webhook"""
+        self._invalidate_reads(action, database, options.get("operations"))
+        payload = {"action": action, "database": database, "data": data or {}, "filters": filters or {}}
+        payload.update({key: value for key, value in options.items() if value is not None})
+        loop = asyncio.get_running_loop()
+        with DB_REQUEST_SECONDS.time(backend="sqlite", action=action):
+            return await loop.run_in_executor(self._executor, partial(self._transaction, payload))
+
+    async def close(self):
+        """Fecha a conexão e a thread do SQLite"""
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, _close)
+        self._executor.shutdown(wait=False)
+
+    def _transaction(self, payload: Dict) -> Dict:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = self._apply(conn, payload)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    # 🔧 CONVERSÃO
+
+    @staticmethod
+    def _field(field: str) -> Tuple[str, List[Any]]:
+        """Expressão SQL (e parâmetros) que lê um campo do registro"""
+        if field in _COLUMNS:
+            return field, []
+        return "json_extract(data, ?)", [f'$."{field}"']
+
+    def _where(self, database: str, filters: Dict) -> Tuple[str, List[Any]]:
+        clauses, params = ["database = ?"], [database]
+        for key, value in (filters or {}).items():
+            expression, expression_params = self._field(key)
+            params.extend(expression_params)
+            if value is None:
+                clauses.append(f"{expression} IS NULL")
+            else:
+                clauses.append(f"{expression} = ?")
+                params.append(json.dumps(value) if isinstance(value, (dict, list)) else value)
+        return " AND ".join(clauses), params
+
+    @staticmethod
+    def _row(record: Tuple) -> Dict:
+        row_id, data = record
+        row = json.loads(data)
+        row["id"] = row_id
+        return row
+
+    def _rows(self, conn: sqlite3.Connection, database: str, filters: Dict, suffix: str = "",
+              suffix_params: List[Any] = ()) -> List[Dict]:
+        where, params = self._where(database, filters)
+        cursor = conn.execute(f"SELECT id, data FROM records WHERE {where}{suffix}", params + list(suffix_params))
+        return [self._row(record) for record in cursor]
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, row: Dict):
+        data = {key: value for key, value in row.items() if key != "id"}
+        conn.execute("UPDATE records SET guild_id = ?, user_id = ?, data = ? WHERE id = ?",
+                     (row.get("guild_id"), row.get("user_id"), json.dumps(data), row["id"]))
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, database: str, row: Dict) -> Dict:
+        row = dict(row)
+        data = {key: value for key, value in row.items() if key != "id"}
+        cursor = conn.execute("INSERT INTO records (id, database, guild_id, user_id, data) VALUES (?, ?, ?, ?, ?)",
+                              (row.get("id"), database, row.get("guild_id"), row.get("user_id"), json.dumps(data)))
+        row["id"] = cursor.lastrowid
+        return row
+
+    # ⚙️ AÇÕES DO PROTOCOLO
+
+    def _apply(self, conn: sqlite3.Connection, payload: Dict) -> Dict:
+        action = payload["action"]
+        if action == "batch":
+            return {"success": True, "results": [self._apply(conn, operation) for operation in payload.get("operations", [])]}
+        database, filters = payload["database"], payload.get("filters")
+        if action == "insert":
+            return {"success": True, "data": [self._insert(conn, database, payload.get("data") or {})]}
+        if action == "select":
+            return {"success": True, "data": self._select(conn, payload)}
+        if action == "count":
+            where, params = self._where(database, filters)
+            return {"success": True, "count": conn.execute(f"SELECT COUNT(*) FROM records WHERE {where}", params).fetchone()[0]}
+        if action == "update":
+            rows = self._rows(conn, database, filters)
+            for row in rows:
+                row.update(payload.get("data") or {})
+                self._write(conn, row)
+            return {"success": True, "data": rows}
+        if action == "increment":
+            rows = self._rows(conn, database, filters)
+            if not rows and payload.get("defaults") is not None:
+                rows = [self._insert(conn, database, {**payload["defaults"], **(filters or {})})]
+            for row in rows:
+                for field, delta in payload.get("deltas", {}).items():
+                    row[field] = (row.get(field) or 0) + delta
+                row.update(payload.get("data") or {})
+                self._write(conn, row)
+            return {"success": True, "data": rows[0] if rows else None}
+        if action == "delete":
+            where, params = self._where(database, filters)
+            return {"success": True, "deleted": conn.execute(f"DELETE FROM records WHERE {where}", params).rowcount}
+        raise ValueError(f"Ação desconhecida: {action}")
+
+    def _select(self, conn: sqlite3.Connection, payload: Dict) -> List[Dict]:
+        suffix, params = "", []
+        order_by = payload.get("order_by")
+        if order_by:
+            expression, expression_params = self._field(order_by.lstrip("-"))
+            direction = "DESC" if order_by.startswith("-") else "ASC"
+            suffix += f" ORDER BY {expression} IS NULL {direction}, {expression} {direction}"
+            params += expression_params * 2
+        limit, offset = payload.get("limit"), payload.get("offset")
+        if limit is not None or offset:
+            suffix += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset or 0]
+        rows = self._rows(conn, payload["database"], payload.get("filters"), suffix, params)
+        columns = payload.get("columns")
+        if columns:
+            rows = [{key: row.get(key) for key in columns} for row in rows]
+        return rows
@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+"""Pipeline de inicialização: manifesto de extensões e tempos por fase"""
+
+log = logging.getLogger('bot')
+
+# Primeiro import do main.py: marca o início do processo
+_STARTED = time.perf_counter()
+
+MANIFEST_PATH = os.environ.get('EXTENSIONS_MANIFEST',
+                               os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'commands', 'manifest.json'))
+
+class StartupTimer:
+    """Acumula o tempo de cada fase da inicialização para um relatório único no on_ready."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._last = _STARTED
+        self.reported = False
+
+    def mark(self, name: str):
+        """Fecha a fase `name` com o tempo desde a marca anterior"""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0) + now - self._last
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        self.mark("outros")
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    def total(self) -> float:
+        return self._last - _STARTED
+
+    def report(self) -> str:
+        phases = " | ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items() if seconds >= 0.0005)
+        return f"⏱️ Inicialização em {self.total():.2f}s: {phases}"
+
+timer = StartupTimer()
+
+def load_manifest(path: str = None) -> List[Dict]:
+    """
+    Extensões declaradas em commands/manifest.json. Cada entrada tem `name` e,
+    opcionalmente, `lazy: true` com a lista `commands` de comandos de prefixo
+    que a carregam no primeiro uso (extensões com slash commands precisam ser
+    carregadas já na inicialização para entrar na árvore sincronizada; por isso
+    imports pesados, como o supabase em database.py, ficam para o primeiro uso).
+    """
+    with open(path or MANIFEST_PATH) as f:
+        return json.load(f)["extensions"]
+
+class ExtensionLoader:
+    """Carrega as extensões do manifesto; as preguiçosas só no primeiro comando."""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.extensions: List[Dict] = []
+        self._lazy: Dict[str, str] = {}
+        self._prepared = False
+
+    def prepare(self):
+        """Lê o manifesto (chamado antes do bot.run, para um manifesto inválido falhar antes do login)"""
+        if not self._prepared:
+            self.extensions = load_manifest(self.path)
+            self._prepared = True
+
+    async def load(self, bot):
+        self.prepare()
+        eager = []
+        for extension in self.extensions:
+            if extension.get("lazy"):
+                for command in extension.get("commands", []):
+                    self._lazy[command] = extension["name"]
+            else:
+                eager.append(extension["name"])
+        # Import e setup rodam no event loop: uma extensão por vez, na ordem do manifesto
+        for name in eager:
+            try:
+                await bot.load_extension(name)
+            except Exception as e:
+                log.error(f'❌ Erro em {name}: {e}')
+            else:
+                log.info(f'✅ {name} carregado')
+        if self._lazy:
+            log.info(f'💤 {len(set(self._lazy.values()))} extensões carregam no primeiro uso')
+
+    async def load_lazy(self, bot, command: str) -> bool:
+        """Carrega a extensão preguiçosa dona de `command`; True se algo foi carregado"""
+        name = self._lazy.pop(command, None)
+        if name is None or name in bot.extensions:
+            return False
+        for other in [key for key, value in self._lazy.items() if value == name]:
+            del self._lazy[other]
+        try:
+            await bot.load_extension(name)
+        except Exception as e:
+            log.error(f'❌ Erro em {name}: {e}')
+            return False
+        log.info(f'✅ {name} carregado sob demanda')
+        return True
+
+extensions = ExtensionLoader()